@@ -0,0 +1,84 @@
+'''
+Time and memory of price alignment: ``pd.concat(...).dropna()`` followed by
+``pct_change`` against :class:`support.alignment.PricePanel`.
+
+Synthetic baskets have a share of stocks listed part way through the
+history, so the common dates are only a fraction of the calendar. The
+harness reports wall time, the peak of traced memory and the dates each
+method keeps. Run from the repository root:
+
+    python -m benchmarks.bench_alignment --assets 100 500 --years 5 20
+'''
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from support.alignment import COMMON, PAIRWISE
+from support.priceData import TRADING_DAYS, PortfolioData, align_prices
+from support.synthetic import SyntheticPrices
+
+
+def frames(num_assets, years, late_share, seed):
+    '''
+    Close frames where ``late_share`` of the stocks start within the first
+    half of the calendar.
+    '''
+    generator = SyntheticPrices(years * TRADING_DAYS, seed=seed)
+    rng = np.random.default_rng(seed)
+    out = []
+    for ticker in generator.tickers(num_assets):
+        frame = generator.close(ticker).to_frame()
+        if rng.random() < late_share:
+            frame = frame.iloc[int(rng.integers(1, generator.num_days // 2)):]
+        out.append(frame)
+    return out
+
+
+def legacy(closes):
+    # the pipeline before the price panel
+    df = pd.concat(closes, axis=1).dropna()
+    returns = df.pct_change(1).dropna().to_numpy(dtype=float)
+    cov = np.cov(returns, rowvar=False)
+    return len(df.index), cov
+
+
+def panel(closes, alignment):
+    # what prepare_portfolio_data does once the prices have arrived
+    data = PortfolioData(align_prices(closes, alignment), alignment=alignment)
+    return len(data.prices.index), data.cov
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    dates, _ = fn(*args)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assets', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--years', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--late-share', type=float, default=0.1, help='share of stocks listed late')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    methods = [('concat+dropna', legacy, ()), ('panel common', panel, (COMMON,)),
+               ('panel pairwise', panel, (PAIRWISE,))]
+    print('%8s %6s %16s %10s %10s %8s' % ('assets', 'years', 'method', 'seconds', 'peak MB', 'dates'))
+    for num_assets in args.assets:
+        for years in args.years:
+            closes = frames(num_assets, years, args.late_share, args.seed)
+            for name, fn, extra in methods:
+                elapsed, peak, dates = measure(fn, closes, *extra)
+                print('%8d %6d %16s %10.3f %10.1f %8d' % (num_assets, years, name, elapsed, peak / 1e6, dates))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Throughput of the process-pool batch optimiser across pool sizes.
+
+Random baskets are drawn from a synthetic universe whose covariance lives
+in shared memory. Run from the repository root:
+
+    python -m benchmarks.bench_batch_pool --universe 500 --baskets 500 --basket-size 30
+'''
+import argparse
+import os
+
+import numpy as np
+
+from support.batchPool import optimize_baskets
+
+
+def synthetic_universe(num_stocks, num_days, rng):
+    market = rng.normal(0, 0.01, size=(num_days, 1))
+    betas = rng.uniform(0.2, 1.5, size=num_stocks)
+    returns = 0.0004 + market * betas + rng.normal(0, 0.015, size=(num_days, num_stocks))
+    labels = ['S%04d' % i for i in range(num_stocks)]
+    return np.cov(returns, rowvar=False), returns.mean(axis=0), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--universe', type=int, default=500)
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--baskets', type=int, default=500)
+    parser.add_argument('--basket-size', type=int, default=30)
+    parser.add_argument('--processes', type=int, nargs='+')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cov, mean_returns, labels = synthetic_universe(args.universe, args.days, rng)
+    baskets = {'basket-%d' % i: list(rng.choice(labels, size=args.basket_size, replace=False))
+               for i in range(args.baskets)}
+
+    cpus = os.cpu_count() or 1
+    processes = args.processes or sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    baseline = None
+    print('%10s %10s %14s %10s' % ('processes', 'seconds', 'portfolios/s', 'speed-up'))
+    for pool_size in processes:
+        report = optimize_baskets(cov, mean_returns, labels, baskets, processes=pool_size)
+        baseline = baseline or report.throughput
+        print('%10d %10.3f %14.1f %10.2f' % (pool_size, report.elapsed, report.throughput,
+                                             report.throughput / baseline))
+        if report.errors:
+            print('  %d baskets failed, first: %s' % (len(report.errors), next(iter(report.errors.values()))))
+
+
+if __name__ == '__main__':
+    main()
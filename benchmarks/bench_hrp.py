@@ -0,0 +1,61 @@
+'''
+Hierarchical risk parity against the minimum variance solvers.
+
+Covariances of synthetic baskets are estimated on the first half of the
+days. Each allocation is timed, and then judged both in sample and out of
+sample on the second half, which is where HRP is meant to earn its keep. The
+SLSQP baseline is only run up to ``--slsqp-max`` assets; it takes minutes
+beyond a few hundred. Run from the repository root:
+
+    python -m benchmarks.bench_hrp --assets 100 1000 4000
+'''
+import argparse
+import time
+
+import numpy as np
+
+from support.hierarchical import hrp_weights
+from support.optimizer import min_risk_weights
+from support.priceData import TRADING_DAYS
+from support.synthetic import SyntheticPrices
+
+
+def log_returns(num_assets, days, seed):
+    generator = SyntheticPrices(days, seed=seed)
+    return np.column_stack([np.expm1(generator.log_returns(ticker)) for ticker in generator.tickers(num_assets)])
+
+
+def annual_risk(cov, weights):
+    return float(np.sqrt(weights @ cov @ weights * TRADING_DAYS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assets', type=int, nargs='+', default=[100, 1000, 4000])
+    parser.add_argument('--days', type=int, default=2500, help='days simulated, half for estimation')
+    parser.add_argument('--slsqp-max', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    methods = [('hrp', hrp_weights), ('qp', lambda cov: min_risk_weights(cov, method='qp')),
+               ('slsqp', lambda cov: min_risk_weights(cov, method='slsqp'))]
+    print('%8s %8s %10s %10s %10s %8s %8s' % ('assets', 'method', 'seconds', 'risk in', 'risk out', 'held',
+                                              'max w'))
+    for num_assets in args.assets:
+        returns = log_returns(num_assets, args.days, args.seed)
+        half = len(returns) // 2
+        cov_in = np.cov(returns[:half], rowvar=False)
+        cov_out = np.cov(returns[half:], rowvar=False)
+        for name, solve in methods:
+            if name == 'slsqp' and num_assets > args.slsqp_max:
+                continue
+            started = time.perf_counter()
+            weights = solve(cov_in)['x']
+            elapsed = time.perf_counter() - started
+            print('%8d %8s %10.3f %10.4f %10.4f %8d %8.3f' % (
+                num_assets, name, elapsed, annual_risk(cov_in, weights), annual_risk(cov_out, weights),
+                int(np.sum(weights > 1e-6)), weights.max()))
+
+
+if __name__ == '__main__':
+    main()
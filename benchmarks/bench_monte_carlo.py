@@ -0,0 +1,64 @@
+'''
+Time and memory of the Monte Carlo risk engine.
+
+Simulates VaR/CVaR scenarios and drawdown paths of the minimum variance
+portfolio of synthetic baskets, recording wall time and the peak of traced
+memory, then times the minimum CVaR linear program. Run from the repository
+root:
+
+    python -m benchmarks.bench_monte_carlo --scenarios 10000 100000 1000000 --assets 10 100
+'''
+import argparse
+import time
+import tracemalloc
+
+from support.monteCarlo import min_cvar_weights, simulate_risk
+from support.optimizer import min_risk_weights
+from support.priceData import PortfolioData
+from support.synthetic import SyntheticPrices
+
+
+def basket(num_assets, num_days, seed):
+    generator = SyntheticPrices(num_days, seed=seed)
+    return PortfolioData(generator.frame(generator.tickers(num_assets)))
+
+
+def run(scenario_counts, asset_counts, cvar_scenarios, days, seed):
+    print('%8s %10s %10s %10s %10s %10s' % ('assets', 'scenarios', 'seconds', 'peak MB', 'VaR', 'CVaR'))
+    for num_assets in asset_counts:
+        data = basket(num_assets, days, seed)
+        weights = min_risk_weights(data.cov)['x']
+        for scenarios in scenario_counts:
+            tracemalloc.start()
+            started = time.perf_counter()
+            report = simulate_risk(data.cov, weights, data.mean_returns, scenarios=scenarios, seed=seed)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('%8d %10d %10.3f %10.1f %10.5f %10.5f' % (num_assets, scenarios, elapsed, peak / 1e6,
+                                                            report.var, report.cvar))
+
+    print()
+    print('%8s %10s %10s %10s' % ('assets', 'scenarios', 'LP secs', 'CVaR'))
+    for num_assets in asset_counts:
+        data = basket(num_assets, days, seed)
+        for scenarios in cvar_scenarios:
+            started = time.perf_counter()
+            results = min_cvar_weights(data.cov, data.mean_returns, scenarios=scenarios, seed=seed)
+            print('%8d %10d %10.3f %10.5f' % (num_assets, scenarios, time.perf_counter() - started,
+                                              results['cvar']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--cvar-scenarios', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.scenarios, args.assets, args.cvar_scenarios, args.days, args.seed)
+
+
+if __name__ == '__main__':
+    main()
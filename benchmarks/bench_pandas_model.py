@@ -0,0 +1,125 @@
+'''
+Scroll a large result table through the table model.
+
+Builds a price-history-like frame (1M cells by default), then pages through
+it the way a QTableView does: one data() call per visible cell plus the row
+headers of the viewport, fetching more rows when the view reaches the end.
+The same scroll is replayed after sorting on a column. The row-at-a-time
+model this replaced is timed alongside for comparison. Run from the
+repository root:
+
+    python -m benchmarks.bench_pandas_model --rows 100000 --columns 10
+
+Set QT_QPA_PLATFORM=offscreen on machines without a display.
+'''
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from PyQt5 import QtCore
+
+from support.pandasModel import PandasModel
+
+
+class RowLookupModel(QtCore.QAbstractTableModel):
+    '''
+    The previous model: header lists rebuilt and iloc per painted cell.
+    '''
+
+    def __init__(self, df, parent=None):
+        QtCore.QAbstractTableModel.__init__(self, parent=parent)
+        self._df = df
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal:
+            return self._df.columns.tolist()[section]
+        return self._df.index.tolist()[section]
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        return QtCore.QVariant(str(self._df.iloc[index.row(), index.column()]))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return len(self._df.index)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self._df.columns)
+
+    def sort(self, column, order):
+        colname = self._df.columns.tolist()[column]
+        self.layoutAboutToBeChanged.emit()
+        self._df.sort_values(colname, ascending=order == QtCore.Qt.AscendingOrder, inplace=True)
+        self._df.reset_index(inplace=True, drop=True)
+        self.layoutChanged.emit()
+
+
+def price_frame(rows, columns, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('1990-01-01', periods=rows, freq='h')
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(rows, columns)), axis=0))
+    return pd.DataFrame(prices, index=index, columns=['STOCK%d-close' % col for col in range(columns)])
+
+
+def scroll(model, pages, visible_rows, repaints):
+    '''
+    Visit ``pages`` evenly spaced viewports, painting each ``repaints`` times.
+    '''
+    while model.canFetchMore(QtCore.QModelIndex()):  # as the view does on reaching the last row
+        model.fetchMore(QtCore.QModelIndex())
+    total = model.rowCount()
+    columns = model.columnCount()
+    cells = 0
+    for top in np.linspace(0, max(total - visible_rows, 0), pages).astype(int):
+        for _ in range(repaints):
+            for row in range(top, min(top + visible_rows, total)):
+                model.headerData(row, QtCore.Qt.Vertical)
+                for col in range(columns):
+                    model.data(model.index(row, col))
+                    cells += 1
+    return cells
+
+
+def run(rows, columns, pages, visible_rows, repaints, seed, legacy):
+    frame = price_frame(rows, columns, seed)
+    print('%d x %d frame, %d cells; %d viewports of %d rows, painted %d times'
+          % (rows, columns, rows * columns, pages, visible_rows, repaints))
+    print('%14s %10s %10s %10s %12s' % ('model', 'build', 'scroll', 'sorted', 'us/cell'))
+    models = [('PandasModel', PandasModel)]
+    if legacy:
+        models.append(('row lookup', RowLookupModel))
+    for name, model_class in models:
+        started = time.perf_counter()
+        model = model_class(frame.copy())
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cells = scroll(model, pages, visible_rows, repaints)
+        scrolled = time.perf_counter() - started
+
+        started = time.perf_counter()
+        model.sort(0, QtCore.Qt.DescendingOrder)
+        cells += scroll(model, pages, visible_rows, repaints)
+        sorted_scroll = time.perf_counter() - started
+
+        print('%14s %10.4f %10.4f %10.4f %12.2f' % (name, built, scrolled, sorted_scroll,
+                                                    1e6 * (scrolled + sorted_scroll) / cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=50, help='viewports visited per scroll')
+    parser.add_argument('--visible-rows', type=int, default=40)
+    parser.add_argument('--repaints', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-legacy', dest='legacy', action='store_false',
+                        help='skip the previous model, which is slow on large frames')
+    args = parser.parse_args()
+
+    QtCore.QCoreApplication([])
+    run(args.rows, args.columns, args.pages, args.visible_rows, args.repaints, args.seed, args.legacy)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+'''
+End-to-end benchmark of the Calculate pipeline on synthetic prices.
+
+Every case feeds :class:`support.synthetic.SyntheticPrices` through the path
+the window's ``optimizedWeights`` takes: a fresh price cache, the engine and
+the result store. The first run of a case is cold (the cache is empty), the
+repeats are warm. For each case the harness records end-to-end latency,
+per-stage timings and counters from :mod:`support.instrumentation`
+(objective evaluations, solver iterations, bytes fetched) and the peak of
+traced memory.
+
+Results are compared with a saved baseline, so regressions show up without
+network access. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline                    # compare with the baseline
+    python -m benchmarks.bench_pipeline --save-baseline    # record a new one
+    python -m benchmarks.bench_pipeline --assets 10 100 --years 1 5
+
+The exit status is 1 when a case got slower than ``--tolerance`` times its
+baseline, used more memory by that factor, or needed more solver work.
+'''
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from support.engine import optimize
+from support.instrumentation import RunStats, recording
+from support.priceCache import PriceCache
+from support.priceData import TRADING_DAYS
+from support.resultStore import ResultStore
+from support.synthetic import SyntheticPrices
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_pipeline.json')
+MIN_SLOWDOWN = 0.01  # seconds; smaller differences are noise whatever the ratio
+
+
+def case_name(num_assets, years):
+    return '%dx%dy' % (num_assets, years)
+
+
+def calculate(codes, generator, cache, store, method):
+    '''
+    One Calculate press: what ``optimizedWeights`` does, minus the window.
+    '''
+    stats = RunStats()
+    with recording(stats):
+        result = optimize(codes, generator.start, generator.end, fetch=cache.get, method=method,
+                          allow_partial=True)
+        store.save(result)
+    return stats
+
+
+def run_case(num_assets, years, repeat, method, seed):
+    generator = SyntheticPrices(years * TRADING_DAYS, seed=seed)
+    codes = generator.codes(num_assets)
+    workdir = tempfile.mkdtemp()
+    try:
+        cache = PriceCache(os.path.join(workdir, 'cache'), fetch=generator)
+        store = ResultStore(os.path.join(workdir, 'runs'))
+
+        cold = calculate(codes, generator, cache, store, method)
+        warm = [calculate(codes, generator, cache, store, method) for _ in range(max(repeat - 1, 1))]
+
+        tracemalloc.start()
+        calculate(codes, generator, cache, store, method)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stages = {name: statistics.median(stats.stages.get(name, {'seconds': 0.0})['seconds'] for stats in warm)
+              for name in warm[0].stages}
+    return {
+        'assets': num_assets,
+        'years': years,
+        'days': years * TRADING_DAYS,
+        'cold_seconds': cold.elapsed,
+        'warm_seconds': statistics.median(stats.elapsed for stats in warm),
+        'cold_stages': {name: entry['seconds'] for name, entry in cold.stages.items()},
+        'warm_stages': stages,
+        'counters': dict(warm[0].counters),
+        'peak_bytes': peak_bytes,
+    }
+
+
+def compare(results, baseline, tolerance):
+    '''
+    Lines describing every regression against ``baseline``.
+    '''
+    problems = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for key in ('cold_seconds', 'warm_seconds'):
+            if result[key] > tolerance * old[key] and result[key] - old[key] > MIN_SLOWDOWN:
+                problems.append('%s %s: %.4fs, baseline %.4fs' % (name, key, result[key], old[key]))
+        if result['peak_bytes'] > tolerance * old['peak_bytes']:
+            problems.append('%s peak memory: %.1f MB, baseline %.1f MB'
+                            % (name, result['peak_bytes'] / 1e6, old['peak_bytes'] / 1e6))
+        for key in ('objective_evaluations', 'solver_iterations'):
+            if result['counters'].get(key, 0) > old['counters'].get(key, 0):
+                problems.append('%s %s: %d, baseline %d' % (name, key, result['counters'].get(key, 0),
+                                                            old['counters'].get(key, 0)))
+    return problems
+
+
+def print_table(results, baseline):
+    print('%10s %10s %10s %8s %9s %9s %9s %6s %6s %9s' % (
+        'case', 'cold s', 'warm s', 'vs base', 'fetch s', 'align s', 'solve s', 'iters', 'evals', 'peak MB'))
+    for name, result in results.items():
+        old = baseline.get(name)
+        ratio = '%.2fx' % (result['warm_seconds'] / old['warm_seconds']) if old else '-'
+        stages = result['warm_stages']
+        print('%10s %10.4f %10.4f %8s %9.4f %9.4f %9.4f %6d %6d %9.1f' % (
+            name, result['cold_seconds'], result['warm_seconds'], ratio,
+            stages.get('fetch', 0.0), stages.get('align', 0.0), stages.get('optimize', 0.0),
+            result['counters'].get('solver_iterations', 0), result['counters'].get('objective_evaluations', 0),
+            result['peak_bytes'] / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the first one cold')
+    parser.add_argument('--solver', default='qp')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown factor')
+    args = parser.parse_args()
+
+    try:
+        with open(args.baseline) as fh:
+            saved = json.load(fh)
+    except (OSError, ValueError):
+        saved = {}
+    baseline = saved.get('results', {}) if saved.get('solver', args.solver) == args.solver else {}
+
+    run_case(2, 1, 1, args.solver, args.seed)  # first-call costs (lazy imports, caches) out of the way
+    results = {}
+    for num_assets in args.assets:
+        for years in args.years:
+            results[case_name(num_assets, years)] = run_case(num_assets, years, args.repeat, args.solver, args.seed)
+            print('.', end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as fh:
+            json.dump({'solver': args.solver, 'seed': args.seed, 'created': time.strftime('%Y-%m-%d'),
+                       'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'results': results}, fh, indent=1, sort_keys=True)
+        print('baseline saved to %s' % args.baseline)
+        return 0
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print('REGRESSION ' + problem)
+    if not baseline:
+        print('no baseline at %s, run with --save-baseline to record one' % args.baseline)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
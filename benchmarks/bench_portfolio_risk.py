@@ -0,0 +1,71 @@
+'''
+Scoring many portfolios: the vectorised batch API against a loop over
+weight vectors.
+
+Random long-only weightings of a synthetic basket are scored for risk,
+expected return and Sharpe ratio. The batch path is
+:func:`support.portfolioStats.score_portfolios`. The loop calls the
+per-vector objective and a dot product for each row, as the code did before
+the batch API existed. The loop is only timed up to ``--loop-max``
+portfolios. Run from the repository root:
+
+    python -m benchmarks.bench_portfolio_risk --portfolios 1000 100000 1000000 --assets 100
+'''
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from support.portfolioStats import random_weights, score_portfolios
+from support.priceData import TRADING_DAYS, PortfolioData, make_risk_objective
+from support.synthetic import SyntheticPrices
+
+
+def loop_scores(cov, mean_returns, weights):
+    port_risk = make_risk_objective(cov)
+    risks = np.empty(len(weights))
+    returns = np.empty(len(weights))
+    for i, row in enumerate(weights):
+        risks[i] = port_risk(row)
+        returns[i] = ((1 + np.dot(row, mean_returns)) ** TRADING_DAYS) - 1
+    return risks, returns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--portfolios', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--loop-max', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('%8s %10s %10s %10s %12s %10s %10s' % ('assets', 'portfolios', 'batch s', 'peak MB', 'per second',
+                                                 'loop s', 'speed-up'))
+    for num_assets in args.assets:
+        generator = SyntheticPrices(args.days, seed=args.seed)
+        data = PortfolioData(generator.frame(generator.tickers(num_assets)))
+        for count in args.portfolios:
+            weights = random_weights(count, num_assets, args.seed)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            scores = score_portfolios(data.cov, data.mean_returns, weights)
+            batch = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            loop, speed_up = float('nan'), '-'
+            if count <= args.loop_max:
+                started = time.perf_counter()
+                risks, returns = loop_scores(data.cov, data.mean_returns, weights)
+                loop = time.perf_counter() - started
+                speed_up = '%.0fx' % (loop / batch)
+                assert np.allclose(risks, scores.risks) and np.allclose(returns, scores.returns)
+            print('%8d %10d %10.4f %10.1f %12.0f %10.3f %10s' % (num_assets, count, batch, peak / 1e6,
+                                                                count / batch, loop, speed_up))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Save and reload an optimisation result: result store against Excel.
+
+Optimises a synthetic basket once, then times writing it to a
+:class:`support.resultStore.ResultStore` and loading it back, against
+writing the Stock-Risk workbook and reading its sheets back with
+``pd.read_excel``. Run from the repository root:
+
+    python -m benchmarks.bench_result_store --stocks 5 20 100 --days 1250
+'''
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from support.engine import optimize_data
+from support.priceData import PortfolioData
+from support.resultStore import ResultStore
+
+
+def synthetic_result(num_stocks, num_days, rng):
+    index = pd.bdate_range('2015-01-01', periods=num_days, name='Date')
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(num_days, num_stocks)), axis=0))
+    frame = pd.DataFrame(prices, index=index, columns=['STOCK%d.BO-close' % i for i in range(num_stocks)])
+    return optimize_data(PortfolioData(frame))
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(sizes, num_days, repeat, seed):
+    rng = np.random.default_rng(seed)
+    directory = tempfile.mkdtemp()
+    store = ResultStore(os.path.join(directory, 'runs'))
+    workbook = os.path.join(directory, 'Stock-Risk.xlsx')
+
+    print('%8s %8s %12s %12s %12s %12s' % ('stocks', 'days', 'store save', 'store load', 'xlsx write',
+                                            'xlsx read'))
+    for num_stocks in sizes:
+        result = synthetic_result(num_stocks, num_days, rng)
+        run_id = store.save(result)
+        save = best_of(repeat, lambda: store.save(result, run_id=run_id))
+        load = best_of(repeat, lambda: store.load(run_id))
+        write = best_of(repeat, lambda: result.to_excel(workbook))
+        read = best_of(repeat, lambda: pd.read_excel(workbook, sheet_name=None, index_col=0))
+        print('%8d %8d %12.5f %12.5f %12.5f %12.5f' % (num_stocks, num_days, save, load, write, read))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stocks', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.stocks, args.days, args.repeat, args.seed)
+
+
+if __name__ == '__main__':
+    main()
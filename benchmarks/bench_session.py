@@ -0,0 +1,89 @@
+'''
+Latency of what-if basket changes against a full recalculation.
+
+For each basket size a :class:`support.basketSession.BasketSession` is
+seeded from a Calculate on synthetic prices, then stocks are added and
+removed one at a time. Each change is timed against what the window did
+before sessions existed: aligning the whole basket again and solving from
+scratch. Prices come from memory, so the times are computation only. Run
+from the repository root:
+
+    python -m benchmarks.bench_session --assets 10 50 100 --changes 50
+'''
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from support.basketSession import BasketSession
+from support.engine import optimize
+from support.synthetic import SyntheticPrices
+
+
+class MemoryPrices(object):
+    '''
+    Synthetic closes generated once, like a warm price cache.
+    '''
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.frames = {}
+
+    def __call__(self, ticker, start_date, end_date):
+        if ticker not in self.frames:
+            self.frames[ticker] = self.generator(ticker, start_date, end_date)
+        return self.frames[ticker]
+
+
+def milliseconds(times):
+    times = sorted(times)
+    return 1000 * statistics.median(times), 1000 * times[int(0.95 * (len(times) - 1))]
+
+
+def run_case(num_assets, changes, days, seed):
+    generator = SyntheticPrices(days, seed=seed)
+    fetch = MemoryPrices(generator)
+    codes = generator.codes(num_assets + changes)
+    basket, spare = codes[:num_assets], codes[num_assets:]
+    for code in codes:
+        fetch(code + '.BO', generator.start, generator.end)
+
+    result = optimize(basket, generator.start, generator.end, fetch=fetch)
+    session = BasketSession.from_data(result.data, result.weights.to_numpy(), generator.start, generator.end,
+                                      fetch=fetch)
+    rng = np.random.default_rng(seed)
+
+    add_times, remove_times, full_times, worst_gap = [], [], [], 0.0
+    for code in spare:
+        add_times.append(session.add(code).elapsed)
+        leaving = session.codes()[int(rng.integers(len(session)))]
+        state = session.remove(leaving)
+        remove_times.append(state.elapsed)
+
+        started = time.perf_counter()
+        full = optimize(session.codes(), generator.start, generator.end, fetch=fetch)
+        full_times.append(time.perf_counter() - started)
+        worst_gap = max(worst_gap, abs(full.risk - state.risk))
+    return add_times, remove_times, full_times, worst_gap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--changes', type=int, default=50, help='stocks added and removed per basket')
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('%8s %12s %12s %12s %12s %12s %12s %10s' % ('assets', 'add ms', 'add p95', 'remove ms', 'remove p95',
+                                                       'full ms', 'full p95', 'risk gap'))
+    for num_assets in args.assets:
+        add_times, remove_times, full_times, gap = run_case(num_assets, args.changes, args.days, args.seed)
+        print('%8d %12.2f %12.2f %12.2f %12.2f %12.2f %12.2f %10.1e' % (
+            (num_assets,) + milliseconds(add_times) + milliseconds(remove_times) + milliseconds(full_times)
+            + (gap,)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''
+Compare the minimum variance backends on random covariance matrices.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_solvers --sizes 10 50 200 500 --repeat 3
+'''
+import argparse
+import time
+
+import numpy as np
+
+from support.optimizer import SOLVERS, min_risk_weights
+
+
+def random_covariance(num_stocks, rng, num_days=None):
+    '''
+    Sample covariance of one-factor daily returns, which like real equity
+    data gives a minimum variance portfolio holding only part of the names.
+    '''
+    num_days = num_days or 3 * num_stocks
+    market = rng.normal(0, 0.01, size=(num_days, 1))
+    betas = rng.uniform(0.2, 1.5, size=num_stocks)
+    returns = market * betas + rng.normal(0, 0.015, size=(num_days, num_stocks))
+    return np.cov(returns, rowvar=False)
+
+
+def run(sizes, repeat, seed):
+    rng = np.random.default_rng(seed)
+    print('%8s %8s %12s %12s %10s' % ('assets', 'solver', 'seconds', 'risk', 'held'))
+    for num_stocks in sizes:
+        for trial in range(repeat):
+            cov = random_covariance(num_stocks, rng)
+            for method in SOLVERS:
+                started = time.perf_counter()
+                results = min_risk_weights(cov, method=method)
+                elapsed = time.perf_counter() - started
+                held = int(np.sum(results['x'] > 1e-6))
+                print('%8d %8s %12.5f %12.8f %10d' % (num_stocks, results['method'], elapsed,
+                                                      results['fun'], held))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200, 500])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.seed)
+
+
+if __name__ == '__main__':
+    main()
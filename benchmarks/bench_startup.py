@@ -0,0 +1,74 @@
+'''
+Time from interpreter start to the first paint of the main window.
+
+Each run starts a fresh interpreter in code/, like launching the app, and
+reports the time until the window receives its first paint event plus which
+heavy modules were imported by then. Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --cold   # recompile the universe each run
+
+Set QT_QPA_PLATFORM=offscreen on machines without a display.
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPILED_UNIVERSE = os.path.join(ROOT, 'cache', 'Equity.universe')
+HEAVY_MODULES = ('pandas', 'scipy.optimize', 'yfinance')
+
+PROBE = r'''
+import sys, time
+started = time.perf_counter()
+from PyQt5 import QtCore, QtWidgets
+app = QtWidgets.QApplication(sys.argv)
+from stock_risk_calculation import TickerSelection
+
+
+class FirstPaint(QtCore.QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint and not hasattr(self, 'elapsed'):
+            self.elapsed = time.perf_counter() - started
+            QtCore.QTimer.singleShot(0, app.quit)
+        return False
+
+
+window = TickerSelection()
+probe = FirstPaint()
+window.installEventFilter(probe)
+window.show()
+app.exec_()
+print('%%.6f' %% probe.elapsed)
+print(','.join(name for name in %r if name in sys.modules))
+''' % (HEAVY_MODULES,)
+
+
+def run_once(cold):
+    if cold and os.path.exists(COMPILED_UNIVERSE):
+        os.remove(COMPILED_UNIVERSE)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=os.path.join(ROOT, 'code'), env=env,
+                            stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    elapsed, loaded = output.splitlines()[-2:]
+    return float(elapsed), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--cold', action='store_true', help='delete the compiled universe before each run')
+    args = parser.parse_args()
+
+    timings = []
+    for run in range(args.runs):
+        elapsed, loaded = run_once(args.cold)
+        timings.append(elapsed)
+        print('run %d: first paint after %.3fs, heavy modules loaded: %s' % (run + 1, elapsed, loaded or 'none'))
+    print('median %.3fs, best %.3fs' % (statistics.median(timings), min(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Load test of the local optimisation service.
+
+Starts :mod:`support.optimizeService` in this process on a free port, with
+synthetic prices behind a stand-in fetch that sleeps like a download, and
+lets concurrent clients request baskets drawn from a small pool, as a desk
+of analysts repeating the same baskets would. Reports requests per second,
+latency percentiles and how the answers were served (computed, memo,
+coalesced). Run from the repository root:
+
+    python -m benchmarks.load_service --clients 16 --requests 400 --baskets 20
+    python -m benchmarks.load_service --memo-size 0     # coalescing only
+'''
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from support.optimizeService import OptimizationService, ServiceClient, make_server
+from support.synthetic import SyntheticPrices
+
+
+class SlowPrices(object):
+    '''
+    Synthetic prices that take ``latency`` seconds per ticker, like a download.
+    '''
+
+    def __init__(self, generator, latency):
+        self.generator = generator
+        self.latency = latency
+
+    def __call__(self, ticker, start_date, end_date):
+        time.sleep(self.latency)
+        return self.generator(ticker, start_date, end_date)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=400, help='requests in total')
+    parser.add_argument('--baskets', type=int, default=20, help='distinct baskets requested')
+    parser.add_argument('--assets', type=int, default=20, help='stocks per basket')
+    parser.add_argument('--universe', type=int, default=100, help='stocks the baskets are drawn from')
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per ticker fetched')
+    parser.add_argument('--memo-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generator = SyntheticPrices(args.days, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    codes = generator.codes(args.universe)
+    baskets = [list(rng.choice(codes, args.assets, replace=False)) for _ in range(args.baskets)]
+    plan = [baskets[i] for i in rng.integers(len(baskets), size=args.requests)]
+
+    service = OptimizationService(fetch=SlowPrices(generator, args.latency), memo_size=args.memo_size)
+    server = make_server(service, port=0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ServiceClient('http://%s:%d' % server.server_address[:2])
+
+    def one(basket):
+        started = time.perf_counter()
+        answer = client.optimize(basket, generator.start, generator.end)
+        return time.perf_counter() - started, answer.source
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        outcomes = list(pool.map(one, plan))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+
+    latencies = [latency for latency, _ in outcomes]
+    sources = Counter(source for _, source in outcomes)
+    print('%d requests from %d clients in %.2fs: %.1f requests/s' % (
+        len(outcomes), args.clients, elapsed, len(outcomes) / elapsed))
+    print('latency ms: p50 %.1f  p90 %.1f  p99 %.1f  max %.1f' % tuple(
+        1000 * value for value in (percentile(latencies, 50), percentile(latencies, 90),
+                                   percentile(latencies, 99), max(latencies))))
+    print('served: %s' % ', '.join('%s %d' % item for item in sorted(sources.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,17 @@
+import os
 import sys
 import traceback
 
-import numpy as np
-import pandas as pd
-import yfinance as yf
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
-from scipy.optimize import minimize
 
-from support.pandasModel import PandasModel
 from support.stockCalculation import Ui_StockRiskCalculator
+from support.tickerModel import TickerSearchProxy
+from support.universeStore import load_universe
+
+# Seconds an optimisation may run before the best weights found so far are shown
+OPTIMIZE_TIME_BUDGET = 120
 
 
 class WorkerSignals( QObject ):
@@ -29,13 +30,15 @@ class WorkerSignals( QObject ):
         `object` data returned from processing, anything
 
     progress
-        `int` indicating % progress
+        `support.optimizer.SolveProgress` of the running solve (iteration,
+        objective, constraint violation, elapsed seconds), throttled by the
+        solve monitor
 
     '''
     finished = pyqtSignal()
     error = pyqtSignal( tuple )
     result = pyqtSignal( object )
-    progress = pyqtSignal( int )
+    progress = pyqtSignal( object )
 
 
 class Worker( QRunnable ):
@@ -61,9 +64,6 @@ class Worker( QRunnable ):
         self.kwargs = kwargs
         self.signals = WorkerSignals()
 
-        # # Add the callback to our kwargs
-        # self.kwargs['progress_callback'] = self.signals.progress
-
     @pyqtSlot()
     def run( self ):
         '''
@@ -88,26 +88,22 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
     def __init__( self, *args, **kwargs ):
         super( TickerSelection, self ).__init__( *args, **kwargs )
         self.setupUi( self )
-        # self.update_list()
-        self.update_buttons_status()
-        self.connections()
-
-        colnames = ['bsecode', 'nsecode', 'compname']
-        data = pd.read_csv( '../inputData/Equity.csv', names=colnames )
 
-        BSE_Code = data.bsecode.tolist()
-        NSE_Code = data.nsecode.tolist()
-        Comp_Name = data.compname.tolist()
+        # Searchable universe of codes, BSE codes and company names, memory-mapped
+        # from a compiled copy of the CSV that is rebuilt whenever the CSV changes
+        self.universe, self.ticker_index = load_universe( '../inputData/Equity.csv', '../cache/Equity.universe' )
+        self.available_model = TickerSearchProxy( self.ticker_index, self )
+        self.listView.setModel( self.available_model )
+        self.lcdNumber.display( self.available_model.availableCount() )
 
-        self.widgets = NSE_Code[1:]
-        self.listWidget.addItems( NSE_Code[1:] )
-        self.lcdNumber.display( self.listWidget.count() )
+        self.update_buttons_status()
+        self.connections()
 
         # Adding Completer.
-        self.completer = QtWidgets.QCompleter( self.widgets )
+        self.completer = QtWidgets.QCompleter( self.available_model.sourceModel(), self )
         self.search_le.setCompleter( self.completer )
         self.search_le.textChanged.connect( self.searchItem )
-        self.pushButton.clicked.connect( self.threadStart )
+        self.pushButton.clicked.connect( self.calculateClicked )
 
         self.actionAbout = QAction( "&About", self,
                                     statusTip="Show the application's About box",
@@ -120,7 +116,52 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
         self.menuAbout.addAction(self.actionAbout)
         self.menuAbout.addAction(self.actionAbout_Qt)
 
+        self.actionFrontier = QAction( "Efficient &Frontier", self,
+                                       statusTip="Calculate the efficient frontier of the selected stocks",
+                                       triggered=self.frontierStart )
+        self.menuAnalysis = self.menubar.addMenu( "&Analysis" )
+        self.menuAnalysis.addAction( self.actionFrontier )
+
+        self.actionExport = QAction( "&Export to Excel", self,
+                                     statusTip="Write the last calculation to ../output/Stock-Risk.xlsx",
+                                     triggered=self.exportStart )
+        self.actionExport.setEnabled( False )
+        self.menuAnalysis.addAction( self.actionExport )
+
+        self.actionSimulate = QAction( "&Simulate VaR/CVaR", self,
+                                       statusTip="Monte Carlo VaR, CVaR and drawdowns of the calculated weights",
+                                       triggered=self.simulateStart )
+        self.actionSimulate.setEnabled( False )
+        self.menuAnalysis.addAction( self.actionSimulate )
+
+        self.actionProfile = QAction( "&Profile Calculations", self, checkable=True,
+                                      statusTip="Run calculations under cProfile and keep the report with the run" )
+        self.menuAnalysis.addAction( self.actionProfile )
+
+        self.actionService = QAction( "Optimisation &Service...", self,
+                                      statusTip="Calculate through a shared optimisation service",
+                                      triggered=self.chooseService )
+        self.menuAnalysis.addAction( self.actionService )
+
+        # Stage timings of the last calculation, see support.instrumentation
+        self.stats_label = QLabel( self )
+        self.statusbar.addPermanentWidget( self.stats_label )
+
         self.threadpool = QThreadPool()
+        self.price_cache = None
+        self.result_store = None
+        self.run_id = None
+        self.monitor = None
+        # URL of a running support.optimizeService, '' to calculate in this window
+        self.service_url = os.environ.get( 'STOCK_RISK_SERVICE', '' )
+
+        # What-if state of the basket after a Calculate, see support.basketSession.
+        # Its updates run one at a time on their own pool so they queue in order.
+        self.session = None
+        self.session_pool = QThreadPool()
+        self.session_pool.setMaxThreadCount( 1 )
+        self.start_date.dateChanged.connect( self.dropSession )
+        self.end_date.dateChanged.connect( self.dropSession )
 
     def about(self):
         QMessageBox.about(self, "About Application",
@@ -143,45 +184,227 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
     #
     #     self.
 
-    def progress_fn( self, n ):
-        progress_msg = QtWidgets.QMessageBox()
-        progress_msg.setWindowTitle( " Stock Risk Calculator" )
-        progress_msg.setText( '"%d%% done" % n' )
-        progress_msg.setStandardButtons( QMessageBox.Ok )
+    def progress_fn( self, progress ):
+        self.portfolio_risk_le.setText( str( progress.objective ) )
+        self.statusbar.showMessage( "Iteration %d: risk %.6f, constraint violation %.1e, %.1fs" % (
+            progress.iteration, progress.objective, progress.violation, progress.elapsed) )
+
+    def print_output( self, output ):
+        from support.pandasModel import PandasModel
+
+        result, self.run_id, stats, self.session = output
+        self.result = result
+        self.stats_label.setText( stats.summary() )
+        self.stats_label.setToolTip( "Run %s, %.2fs in total" % (self.run_id, stats.elapsed) )
+        self.actionExport.setEnabled( True )
+        self.actionSimulate.setEnabled( True )
+        self.portfolio_risk_le.setText( str( result.risk ) )
+        self.expected_return_le.setText( str( result.expected_return ) )
+        if result.stopped:
+            self.statusbar.showMessage( f"Calculation stopped ({result.stopped}), showing the best weights found; "
+                                        f"equal weighted portfolio risk: {result.equal_weight_risk}" )
+        elif len( result.solver.get( 'excluded', () ) ):
+            flat = ", ".join( result.weights.index[result.solver['excluded']] )
+            self.statusbar.showMessage( f"Equal weighted portfolio risk: {result.equal_weight_risk}; "
+                                        f"prices that never moved, given no weight: {flat}" )
+        elif result.data.dropped_dates:
+            self.statusbar.showMessage( f"Equal weighted portfolio risk: {result.equal_weight_risk}; "
+                                        f"{result.data.dropped_dates} dates without a price for every stock were "
+                                        f"left out" )
+        else:
+            self.statusbar.showMessage( f"Equal weighted portfolio risk: {result.equal_weight_risk}" )
 
-    def print_output( self, s ):
-        pass
+        self.model = PandasModel( result.weights_frame() )
+        self.tableView.setModel( self.model )
+
+        report = result.data.fetch_report
+        if report is not None and report.failures:
+            QtWidgets.QMessageBox.warning( self, " Stock Risk Calculator",
+                                           "These stocks were left out, their data could not be loaded:\n"
+                                           + report.summary() )
+
+    def show_what_if( self, output ):
+        from support.pandasModel import PandasModel
+
+        session, state = output
+        if session is not self.session:
+            return  # the dates changed or a new calculation finished meanwhile
+        # the calculated run no longer matches the table: simulate the edited basket, export nothing
+        self.run_id = None
+        self.actionExport.setEnabled( False )
+        if state is None:
+            self.result = None
+            self.actionSimulate.setEnabled( False )
+            self.portfolio_risk_le.clear()
+            self.expected_return_le.clear()
+            self.tableView.setModel( None )
+            return
+        self.result = state
+        self.actionSimulate.setEnabled( True )
+        self.portfolio_risk_le.setText( str( state.risk ) )
+        self.expected_return_le.setText( str( state.expected_return ) )
+        self.statusbar.showMessage( "What-if: %d stocks re-optimised in %.0f ms; equal weighted portfolio risk: %s"
+                                    % (len( state.weights ), 1000 * state.elapsed, state.equal_weight_risk) )
+
+        self.model = PandasModel( state.weights_frame() )
+        self.tableView.setModel( self.model )
+
+    def what_if_error( self, error ):
+        exctype, value, trace = error
+        self.statusbar.showMessage( f"What-if update failed: {value}" )
+
+    def print_remote( self, result ):
+        from support.pandasModel import PandasModel
+
+        # prices stay on the service, so there is nothing to export, simulate or edit
+        self.run_id = None
+        self.session = None
+        self.actionExport.setEnabled( False )
+        self.actionSimulate.setEnabled( False )
+        self.portfolio_risk_le.setText( str( result.risk ) )
+        self.expected_return_le.setText( str( result.expected_return ) )
+        self.statusbar.showMessage( f"Answered by the optimisation service ({result.source}); "
+                                    f"equal weighted portfolio risk: {result.equal_weight_risk}" )
+
+        self.model = PandasModel( result.weights_frame() )
+        self.tableView.setModel( self.model )
+
+    def thread_error( self, error ):
+        exctype, value, trace = error
+        QtWidgets.QMessageBox.critical( self, " Stock Risk Calculator", f"Calculation failed: {value}" )
 
     def thread_complete( self ):
+        self.monitor = None
+        self.pushButton.setText( "Calculate Risk" )
+        self.pushButton.setEnabled( True )
         thread_complete_msg = QtWidgets.QMessageBox()
         thread_complete_msg.setWindowTitle( " Stock Risk Calculator" )
         thread_complete_msg.setText( "Calculation Completed" )
         thread_complete_msg.setInformativeText(
-            'The Calculated optimised weights are'
-            'stored in ../output/Stock-Risk.xlsx'
+            'The Calculated optimised weights are '
+            'stored in ../output/runs, use Analysis > Export to Excel for a workbook'
         )
         thread_complete_msg.addButton( QtWidgets.QMessageBox.Close )
 
+    def calculateClicked( self ):
+        # The Calculate button doubles as Stop while an optimisation runs
+        if self.monitor is None:
+            self.threadStart()
+        else:
+            self.monitor.cancel()
+            self.pushButton.setEnabled( False )
+
     def threadStart( self ):
+        from support.optimizer import SolveMonitor
+
+        if self.service_url:
+            self.serviceStart()
+            return
+
         # Pass the function to execute
-        worker = Worker( self.optimizedWeights )  # Any other args, kwargs are passed to the run function
+        self.get_price_cache()
+        self.get_result_store()
+        start_date, end_date = self.get_date_range()
+        worker = Worker( self.optimizedWeights, self.get_right_elements(), start_date, end_date,
+                         profile=self.actionProfile.isChecked() )
+        # The monitor calls back on the worker thread; the signal queues it to the GUI thread
+        self.monitor = SolveMonitor( callback=worker.signals.progress.emit, time_budget=OPTIMIZE_TIME_BUDGET )
+        worker.kwargs['monitor'] = self.monitor
+        self.pushButton.setText( "Stop" )
         worker.signals.result.connect( self.print_output )
+        worker.signals.error.connect( self.thread_error )
         worker.signals.finished.connect( self.thread_complete )
         worker.signals.progress.connect( self.progress_fn )
 
         # Execute
         self.threadpool.start( worker )
 
+    def serviceStart( self ):
+        start_date, end_date = self.get_date_range()
+        worker = Worker( self.remoteWeights, self.service_url, self.get_right_elements(), start_date, end_date )
+        worker.signals.result.connect( self.print_remote )
+        worker.signals.error.connect( self.thread_error )
+        worker.signals.finished.connect( self.thread_complete )
+        # the service cannot be interrupted, so there is no Stop
+        self.pushButton.setEnabled( False )
+        self.statusbar.showMessage( "Waiting for the optimisation service at %s..." % self.service_url )
+
+        self.threadpool.start( worker )
+
+    def chooseService( self ):
+        url, ok = QInputDialog.getText( self, " Stock Risk Calculator",
+                                        "Optimisation service URL (empty to calculate in this window):",
+                                        text=self.service_url )
+        if ok:
+            self.service_url = url.strip()
+
+    def exportStart( self ):
+        if self.run_id is None:
+            return
+        worker = Worker( self.exportExcel, self.run_id, '../output/Stock-Risk.xlsx' )
+        worker.signals.result.connect( self.statusbar.showMessage )
+        worker.signals.error.connect( self.thread_error )
+
+        self.threadpool.start( worker )
+
+    def whatIfStart( self ):
+        if self.session is None:
+            return
+        worker = Worker( self.whatIfWeights, self.session, self.get_right_elements() )
+        worker.signals.result.connect( self.show_what_if )
+        worker.signals.error.connect( self.what_if_error )
+
+        self.session_pool.start( worker )
+
+    def dropSession( self ):
+        # A session holds prices for one date range only
+        self.session = None
+
+    def frontierStart( self ):
+        self.get_price_cache()
+        start_date, end_date = self.get_date_range()
+        worker = Worker( self.frontierCurve, self.get_right_elements(), start_date, end_date )
+        worker.signals.result.connect( self.show_frontier )
+        worker.signals.error.connect( self.thread_error )
+
+        self.threadpool.start( worker )
+
+    def simulateStart( self ):
+        if self.result is None:
+            return
+        worker = Worker( self.result.simulate_risk )
+        worker.signals.result.connect( self.show_risk )
+        worker.signals.error.connect( self.thread_error )
+        self.statusbar.showMessage( "Simulating scenarios..." )
+
+        self.threadpool.start( worker )
+
+    def show_risk( self, report ):
+        from support.pandasModel import PandasModel
+
+        self.model = PandasModel( report.to_frame() )
+        self.tableView.setModel( self.model )
+        self.statusbar.showMessage( report.summary() )
+
+    def show_frontier( self, curve ):
+        from support.pandasModel import PandasModel
+
+        self.model = PandasModel( curve.to_frame() )
+        self.tableView.setModel( self.model )
+        self.statusbar.showMessage( "Maximum Sharpe ratio %.3f at risk %.4f" % (
+            curve.sharpe[curve.max_sharpe], curve.risks[curve.max_sharpe]) )
+
     @QtCore.pyqtSlot()
     def update_buttons_status( self ):
         self.up_pb.setDisabled( not bool( self.listWidget_2.selectedItems() ) or self.listWidget_2.currentRow() == 0 )
         self.down_pb.setDisabled( not bool( self.listWidget_2.selectedItems() ) or self.listWidget_2.currentRow() == (
                     self.listWidget_2.count() - 1) )
-        self.right_pb.setDisabled( not bool( self.listWidget.selectedItems() ) or self.listWidget_2.currentRow() == 0 )
+        self.right_pb.setDisabled( not self.listView.selectionModel().hasSelection() or self.listWidget_2.currentRow() == 0 )
         self.left_pb.setDisabled( not bool( self.listWidget_2.selectedItems() ) )
 
     def connections( self ):
-        self.listWidget.itemSelectionChanged.connect( self.update_buttons_status )
+        self.listView.selectionModel().selectionChanged.connect( self.update_buttons_status )
+        self.available_model.modelReset.connect( self.update_buttons_status )
         self.listWidget_2.itemSelectionChanged.connect( self.update_buttons_status )
         self.right_pb.clicked.connect( self.on_mBtnMoveToAvailable_clicked )
         self.left_pb.clicked.connect( self.on_mBtnMoveToSelected_clicked )
@@ -190,15 +413,22 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
 
     @QtCore.pyqtSlot()
     def on_mBtnMoveToAvailable_clicked( self ):
-        self.listWidget_2.addItem( self.listWidget.takeItem( self.listWidget.currentRow() ) )
+        current = self.listView.currentIndex()
+        if not current.isValid():
+            return
+        self.listWidget_2.addItem( self.available_model.take( current.row() ) )
         self.lcdNumber_2.display( self.listWidget_2.count() )
-        self.lcdNumber.display( self.listWidget.count() )
+        self.lcdNumber.display( self.available_model.availableCount() )
+        self.whatIfStart()
 
     @QtCore.pyqtSlot()
     def on_mBtnMoveToSelected_clicked( self ):
-        self.listWidget.addItem( self.listWidget_2.takeItem( self.listWidget_2.currentRow() ) )
+        item = self.listWidget_2.takeItem( self.listWidget_2.currentRow() )
+        if item is not None:
+            self.available_model.release( item.text() )
+            self.whatIfStart()
         self.lcdNumber_2.display( self.listWidget_2.count() )
-        self.lcdNumber.display( self.listWidget.count() )
+        self.lcdNumber.display( self.available_model.availableCount() )
 
     @QtCore.pyqtSlot()
     def on_mBtnUp_clicked( self ):
@@ -215,11 +445,7 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
         self.listWidget_2.setCurrentRow( row + 1 )
 
     def get_left_elements( self ):
-        r = []
-        for i in range( self.listWidget.count() ):
-            it = self.listWidget.item( i )
-            r.append( it.text() )
-        return r
+        return self.available_model.availableCodes()
 
     def get_right_elements( self ):
         r = []
@@ -229,103 +455,68 @@ class TickerSelection( QtWidgets.QMainWindow, Ui_StockRiskCalculator ):
         return r
 
     def searchItem( self, text ):
-        # search_string = self.search_le.toPlainText()
-        match_items = self.listWidget.findItems( text, QtCore.Qt.MatchContains )
-        for i in range( self.listWidget.count() ):
-            it = self.listWidget.item( i )
-            it.setHidden( it not in match_items )
+        self.available_model.setQuery( text )
+
+    def get_date_range( self ):
+        start_date = self.start_date.date().toPyDate()
+        end_date = self.end_date.date().toPyDate()
+        return start_date, end_date
+
+    def get_price_cache( self ):
+        # pandas and the download stack are only imported once they are needed
+        if self.price_cache is None:
+            from support.priceCache import PriceCache
+            self.price_cache = PriceCache( '../cache' )
+        return self.price_cache
+
+    def get_result_store( self ):
+        if self.result_store is None:
+            from support.resultStore import ResultStore
+            self.result_store = ResultStore( '../output/runs' )
+        return self.result_store
 
     def get_data( self, ticker ):
-        try:
-            data = yf.Ticker( ticker )
-            start_date_qt = self.start_date.date()
-            start_date = start_date_qt.toPyDate()
-            end_date_qt = self.end_date.date()
-            end_date = end_date_qt.toPyDate()
-            datadf = data.history( period='1d', start=start_date, end=end_date )
-            stock_col = ticker + '-close'
-            stock_data = datadf[['Close']]
-            stock_data.rename( columns={ 'Close': str( stock_col ) }, inplace=True )
-            return stock_data
-        except Exception as e:
-            QtWidgets.QMessageBox.critical( self, f"Could not load the {ticker} stock data: {e}" )
-
-    def getPortRisk( self, weights ):
-
-        try:
-            labels = [self.listWidget_2.item( i ).text() for i in range( self.listWidget_2.count() )]
-            bsecode = ".BO"
-            tickers = [x + bsecode for x in labels]
-
-            df = pd.concat( [self.get_data( ticker ) for ticker in tickers], axis=1 )
-            df = df.dropna()
-
-        except Exception as e:
-            tickerError = QtWidgets.QMessageBox.critical( self, f"could not get data from selected stocks: {e}",
-                                                               buttons=[QMessageBox.Ok])
-
-        try:
-            with pd.ExcelWriter( 'Stock-Risk.xlsx' ) as writer:
-                df.to_excel( writer, sheet_name='Stock-Data' )
-
-        except Exception as e:
-            QtWidgets.QMessageBox.critical( self, f"Could not save the file: {e}" )
-
-        returns_df = df.pct_change( 1 ).dropna()  # estimate returns for each asset
-
-        vcv = returns_df.cov()  # being the variance covariance matrix
-
-        var_p = np.dot( np.transpose( weights ), np.dot( vcv, weights ) )  # variance of the multi-asset portfolio
-        sd_p = np.sqrt( var_p )  # standard deviation of the multi-asset portfolio
-        sd_p_annual = sd_p * np.sqrt( 250 )  # annualised standard deviation of the multi-asset portfolio
-
-        self.portfolio_risk_le.setText( str( sd_p_annual ) )
-
-        return sd_p_annual
-
-    def optimizedWeights( self ):
-
-        num_stocks = self.listWidget_2.count()  # being the number of stocks (this is a 'global' variable)
-        init_weights = [1 / num_stocks] * num_stocks  # initialise weights (x0)
-
-        # Constraint that weights in any asset j must be between 0 and 1 inclusive
-        bounds = tuple( (0, 1) for i in range( num_stocks ) )
-
-        # Constraint that the sum of the weights of all assets must equate to 1
-        cons = ({ 'type': 'eq', 'fun': lambda x: np.sum( x ) - 1 })
-
-        results = minimize( fun=self.getPortRisk, x0=init_weights, bounds=bounds, constraints=cons )
-
-        # Check total risk of the equal weighted portfolio
-        self.getPortRisk( init_weights )
-
-        df = pd.read_excel( 'Stock-Risk.xlsx' )
-        df.set_index( 'Date', inplace=True )
-
-        # Explore optimised weights
-        optimised_weights = pd.DataFrame( results['x'] )
-        optimised_weights.index = df.columns
-        optimised_weights.rename( columns={ optimised_weights.columns[0]: 'weights' }, inplace=True )
-
-        returns_df = df.pct_change( 1 ).dropna()  # estimate returns for each asset
-        expected_return_daily = returns_df.mean()
-        #print( expected_return_daily )
-        expected_return_portfolio = optimised_weights['weights'].mul( expected_return_daily )
-        expected_return_portfolio_sum = expected_return_portfolio.sum()
-        # print(expected_return_portfolio)
-        #print( expected_return_portfolio_sum )
-        expected_return_portfolio_annual = ((1 + expected_return_portfolio_sum) ** 250) - 1
-        # print(expected_return_portfolio_annual)
-        self.expected_return_le.setText( str( expected_return_portfolio_annual ) )
-
-        # Clean format of the weights so it's more readable
-        optimised_weights['weights_rounded'] = optimised_weights['weights'].apply( lambda x: round( x, 3 ) )
-        self.model = PandasModel( optimised_weights )
-        self.tableView.setModel( self.model )
-
-        with pd.ExcelWriter( '../output/Stock-Risk.xlsx' ) as writer:
-            df.to_excel( writer, sheet_name='Stock-Data' )
-            optimised_weights.to_excel( writer, sheet_name='optimized-weights' )
+        start_date, end_date = self.get_date_range()
+        return self.get_price_cache().get( ticker, start_date, end_date )
+
+    def optimizedWeights( self, labels, start_date, end_date, monitor=None, profile=False ):
+        # Runs on the worker thread, so widgets are only updated from print_output and progress_fn
+        from support.basketSession import BasketSession
+        from support.engine import optimize
+        from support.instrumentation import RunStats, recording
+
+        stats = RunStats( 'calculate' )
+        with recording( stats, profile=profile ):
+            result = optimize( labels, start_date, end_date, fetch=self.price_cache.get, allow_partial=True,
+                               monitor=monitor )
+            run_id = self.result_store.save( result, start=str( start_date ), end=str( end_date ) )
+        stats.name = run_id
+        stats.write_json( self.result_store.stats_path( run_id ) )
+        session = None
+        if not result.stopped:
+            # later list changes re-optimise from these weights, see whatIfStart
+            session = BasketSession.from_data( result.data, result.weights.to_numpy(), start_date, end_date,
+                                               fetch=self.price_cache.get )
+        return result, run_id, stats, session
+
+    def whatIfWeights( self, session, labels ):
+        # Runs on the single session thread, so a session is never updated concurrently
+        return session, session.set_basket( labels )
+
+    def remoteWeights( self, url, labels, start_date, end_date ):
+        from support.optimizeService import ServiceClient
+
+        return ServiceClient( url ).optimize( labels, start_date, end_date )
+
+    def exportExcel( self, run_id, path ):
+        # Excel is slow to write, so it is only produced when asked for
+        self.result_store.export_excel( run_id, path )
+        return "Run %s exported to %s" % (run_id, path)
+
+    def frontierCurve( self, labels, start_date, end_date ):
+        from support.engine import frontier
+
+        return frontier( labels, start_date, end_date, fetch=self.price_cache.get, allow_partial=True )
 
 
 if __name__ == '__main__':
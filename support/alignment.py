@@ -0,0 +1,152 @@
+'''
+Price alignment on a shared trading-day calendar.
+
+A :class:`PricePanel` holds the close prices of a basket as one contiguous
+``dates x tickers`` float64 matrix over the union of every ticker's dates,
+with a validity mask marking where a price was observed. Nothing is dropped
+when the panel is built. A caller asks either for the complete rows (the
+dates on which every ticker has a price, what ``pd.concat(...).dropna()``
+gave) or for all of them, with :func:`pairwise_covariance` using every day
+a pair of tickers has in common.
+'''
+import numpy as np
+import pandas as pd
+
+COMMON = 'common'  # only dates on which every ticker has a price
+PAIRWISE = 'pairwise'  # every date, each statistic over the days its tickers share
+ALIGNMENTS = (COMMON, PAIRWISE)
+
+
+class PricePanel(object):
+    '''
+    Close prices of several tickers on one calendar.
+
+    :ivar dates: ``pd.DatetimeIndex``, the union of the tickers' dates
+    :ivar labels: one column label per ticker
+    :ivar values: ``dates x tickers`` float64 prices, NaN where missing
+    :ivar mask: boolean array of the same shape, True where a price was observed
+    :ivar calendar_dates: length of the calendar the panel was cut from
+    '''
+
+    def __init__(self, dates, labels, values, calendar_dates=None):
+        self.dates = dates
+        self.labels = list(labels)
+        self.values = values
+        self.mask = ~np.isnan(values)
+        self.calendar_dates = len(dates) if calendar_dates is None else calendar_dates
+
+    @classmethod
+    def from_frames(cls, frames):
+        '''
+        Panel of single-column frames (or Series), e.g. from a
+        :class:`support.fetchEngine.FetchReport`. Each column is written
+        straight into the preallocated matrix.
+        '''
+        columns = [frame.iloc[:, 0] if isinstance(frame, pd.DataFrame) else frame for frame in frames]
+        if not columns:
+            raise ValueError('no prices to align')
+        indexes = [pd.DatetimeIndex(column.index) for column in columns]
+        calendar = indexes[0]
+        for index in indexes[1:]:
+            # most tickers share the calendar, so merge only when one differs
+            if not index.equals(calendar):
+                calendar = calendar.union(index)
+        if not calendar.is_monotonic_increasing:
+            calendar = calendar.sort_values()
+
+        values = np.full((len(calendar), len(columns)), np.nan)
+        for j, (column, index) in enumerate(zip(columns, indexes)):
+            rows = slice(None) if index.equals(calendar) else calendar.get_indexer(index)
+            values[rows, j] = column.to_numpy(dtype=float)
+        return cls(calendar.rename(indexes[0].name), [column.name for column in columns], values)
+
+    @classmethod
+    def from_frame(cls, frame):
+        '''
+        Panel of an already aligned ``dates x tickers`` frame.
+        '''
+        return cls(pd.DatetimeIndex(frame.index), frame.columns, frame.to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def num_stocks(self):
+        return len(self.labels)
+
+    def complete_rows(self):
+        '''
+        Boolean array of the dates on which every ticker has a price.
+        '''
+        return self.mask.all(axis=1)
+
+    def complete(self):
+        '''
+        Panel of the complete rows only, as ``frame.dropna()``.
+        '''
+        rows = self.complete_rows()
+        if rows.all():
+            return self
+        return PricePanel(self.dates[rows], self.labels, self.values[rows], self.calendar_dates)
+
+    def frame(self):
+        '''
+        Prices as a ``pd.DataFrame`` sharing the panel's matrix.
+        '''
+        return pd.DataFrame(self.values, index=self.dates, columns=self.labels, copy=False)
+
+    def returns(self, kind='simple'):
+        '''
+        ``(dates - 1) x tickers`` daily returns, computed in one buffer. A
+        return is NaN unless the ticker has prices on both days; on a
+        :meth:`complete` panel this is ``frame.dropna().pct_change(1).dropna()``.
+
+        :param kind: ``'simple'`` (``p1 / p0 - 1``) or ``'log'`` (``log(p1 / p0)``)
+        '''
+        if kind not in ('simple', 'log'):
+            raise ValueError('unknown return kind %r, expected simple or log' % kind)
+        prices = self.values
+        out = np.empty((max(len(prices) - 1, 0), prices.shape[1]))
+        np.divide(prices[1:], prices[:-1], out=out)
+        if kind == 'log':
+            np.log(out, out=out)
+        else:
+            out -= 1
+        return out
+
+
+def pairwise_covariance(returns, min_periods=2):
+    '''
+    Covariance of ``returns`` with NaN gaps, where every pair uses all the
+    days both of its tickers have, like ``DataFrame.cov()``. Pairs with
+    fewer than ``min_periods`` common days are NaN.
+
+    Three ``N x N`` products of the zero-filled returns and the mask give
+    the pair counts, sums and cross products, so no pair is looped over.
+    '''
+    returns = np.asarray(returns, dtype=float)
+    valid = ~np.isnan(returns)
+    if valid.all():
+        return np.atleast_2d(np.cov(returns, rowvar=False))
+
+    filled = np.where(valid, returns, 0.0)
+    present = valid.astype(float)
+    counts = present.T @ present
+    sums = filled.T @ present  # sums[i, j]: sum of returns of i on the days j has too
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (filled.T @ filled - sums * sums.T / counts) / (counts - 1)
+    cov[counts < max(min_periods, 2)] = np.nan
+    return cov
+
+
+def nearest_psd(cov, floor=0.0):
+    '''
+    ``cov`` with its eigenvalues clipped at ``floor``. A pairwise covariance
+    mixes different samples and need not be positive semidefinite, which
+    the optimizer relies on.
+    '''
+    values, vectors = np.linalg.eigh(cov)
+    if values.min() >= floor:
+        return cov
+    fixed = (vectors * np.clip(values, floor, None)) @ vectors.T
+    return (fixed + fixed.T) / 2
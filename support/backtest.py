@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from support.optimizer import min_risk_weights
+from support.priceData import TRADING_DAYS
+
+DEFAULT_LOOKBACK = TRADING_DAYS
+DEFAULT_REBALANCE = 21  # trading days, about a month
+
+
+class RollingCovariance(object):
+    '''
+    Sample covariance of a sliding window of return rows, kept up to date by
+    rank-one updates: adding or removing a row costs O(N^2) instead of the
+    O(T N^2) of recomputing ``returns_df.cov()``.
+
+    Rows are stored relative to ``shift`` (the mean of the first window) so
+    the running sums stay small and the subtraction in :attr:`cov` does not
+    lose precision.
+    '''
+
+    def __init__(self, window):
+        window = np.asarray(window, dtype=float)
+        self.shift = window.mean(axis=0)
+        centred = window - self.shift
+        self.count = len(window)
+        self.sums = centred.sum(axis=0)
+        self.products = centred.T @ centred
+
+    def add(self, row):
+        row = np.asarray(row, dtype=float) - self.shift
+        self.count += 1
+        self.sums += row
+        self.products += np.outer(row, row)
+
+    def remove(self, row):
+        row = np.asarray(row, dtype=float) - self.shift
+        self.count -= 1
+        self.sums -= row
+        self.products -= np.outer(row, row)
+
+    def roll(self, entering, leaving):
+        '''
+        Slide the window one row: ``entering`` joins, ``leaving`` drops out.
+        '''
+        entering = np.asarray(entering, dtype=float) - self.shift
+        leaving = np.asarray(leaving, dtype=float) - self.shift
+        self.sums += entering - leaving
+        self.products += np.outer(entering, entering) - np.outer(leaving, leaving)
+
+    @property
+    def mean(self):
+        return self.shift + self.sums / self.count
+
+    @property
+    def cov(self):
+        mean = self.sums / self.count
+        return (self.products - self.count * np.outer(mean, mean)) / (self.count - 1)
+
+
+class BacktestResult(object):
+    '''
+    Outcome of :func:`walk_forward`.
+
+    :ivar returns: ``pd.Series`` of realised daily portfolio returns
+    :ivar weights: ``pd.DataFrame`` of target weights, one row per rebalance date
+    :ivar turnover: ``pd.Series`` of one-way turnover at each rebalance
+    '''
+
+    def __init__(self, returns, weights, turnover):
+        self.returns = returns
+        self.weights = weights
+        self.turnover = turnover
+
+    @property
+    def equity(self):
+        return (1 + self.returns).cumprod()
+
+    def summary(self):
+        equity = self.equity
+        drawdown = equity / equity.cummax() - 1
+        years = len(self.returns) / TRADING_DAYS
+        return {
+            'annual_return': float(equity.iloc[-1] ** (1 / years) - 1) if years > 0 else np.nan,
+            'annual_risk': float(self.returns.std() * np.sqrt(TRADING_DAYS)),
+            'max_drawdown': float(drawdown.min()),
+            'total_turnover': float(self.turnover.sum()),
+            'rebalances': len(self.weights),
+        }
+
+
+def walk_forward(returns, lookback=DEFAULT_LOOKBACK, rebalance=DEFAULT_REBALANCE, method='qp'):
+    '''
+    Walk-forward backtest of the minimum risk portfolio.
+
+    A ``lookback`` row window rolls over the return matrix one day at a time
+    with :class:`RollingCovariance`. Every ``rebalance`` days the weights are
+    re-optimised on the window ending the day before; in between they drift
+    with prices. Day ``t`` is always traded on weights chosen from data up
+    to ``t - 1``.
+
+    :param returns: ``pd.DataFrame`` of simple daily returns, dates by assets
+    :param method: solver backend, see :data:`support.optimizer.SOLVERS`
+    :rtype: BacktestResult
+    '''
+    values = returns.to_numpy(dtype=float)
+    num_days, num_stocks = values.shape
+    if num_days <= lookback:
+        raise ValueError('need more than %d days of returns for a %d day lookback' % (lookback, lookback))
+
+    window = RollingCovariance(values[:lookback])
+    portfolio_returns = np.empty(num_days - lookback)
+    rebalance_rows = []
+    targets = []
+    turnover = []
+    weights = np.zeros(num_stocks)
+
+    for step, t in enumerate(range(lookback, num_days)):
+        if step:
+            window.roll(values[t - 1], values[t - 1 - lookback])
+        if step % rebalance == 0:
+            target = min_risk_weights(window.cov, method=method)['x']
+            turnover.append(np.abs(target - weights).sum() / 2)
+            rebalance_rows.append(t)
+            targets.append(target)
+            weights = target
+
+        day_return = values[t] @ weights
+        portfolio_returns[step] = day_return
+        weights = weights * (1 + values[t]) / (1 + day_return)  # drift with prices
+
+    dates = returns.index
+    rebalance_dates = dates[rebalance_rows]
+    return BacktestResult(pd.Series(portfolio_returns, index=dates[lookback:], name='portfolio'),
+                          pd.DataFrame(targets, index=rebalance_dates, columns=returns.columns),
+                          pd.Series(turnover, index=rebalance_dates, name='turnover'))
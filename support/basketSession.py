@@ -0,0 +1,282 @@
+'''
+What-if state of the basket being edited in the window.
+
+A :class:`BasketSession` keeps the aligned returns and sample covariance of
+the selected stocks between list changes. Adding a stock whose prices cover
+the current dates appends one row and column to the covariance (O(T N)),
+removing one deletes them; only when the common dates change is the basket
+realigned from the prices kept in the session. Every change is re-solved
+from the previous optimum, so a change costs a few milliseconds once the new
+stock's prices are in the session.
+'''
+import time
+
+import numpy as np
+import pandas as pd
+
+from support.alignment import COMMON, PricePanel
+from support.optimizer import min_risk_weights
+from support.priceData import BSE_SUFFIX, TRADING_DAYS, get_close, make_risk_objective, to_yahoo_tickers
+from support.resultStore import weights_frame
+
+WARM_START_WEIGHT = 0.01  # weight a newly added stock starts from
+
+
+class SessionState(object):
+    '''
+    Weights and risk figures after a change, shaped like
+    :class:`support.engine.OptimizationResult` for the results table.
+
+    :ivar weights: ``pd.Series`` of weights indexed by price column
+    :ivar solver: the ``scipy.optimize.OptimizeResult`` of the re-solve
+    :ivar elapsed: seconds the change took, fetching included
+    :ivar rebuilt: True if the basket had to be realigned on new dates
+    :ivar cov: the covariance the weights were optimised against
+    :ivar mean_returns: mean daily returns of the stocks
+    '''
+
+    def __init__(self, labels, solver, cov, mean_returns, elapsed, rebuilt):
+        self.solver = solver
+        self.cov = cov
+        self.mean_returns = mean_returns
+        self.weights = pd.Series(solver['x'], index=labels, name='weights')
+        self.elapsed = elapsed
+        self.rebuilt = rebuilt
+
+        port_risk = make_risk_objective(cov)
+        num_stocks = len(labels)
+        self.risk = float(port_risk(solver['x']))
+        self.equal_weight_risk = float(port_risk(np.full(num_stocks, 1 / num_stocks)))
+        self.expected_return = ((1 + float(solver['x'] @ mean_returns)) ** TRADING_DAYS) - 1
+
+    def weights_frame(self):
+        return weights_frame(self.weights)
+
+    def simulate_risk(self, **options):
+        '''
+        Monte Carlo VaR, CVaR and drawdowns of the weights, as
+        :meth:`support.engine.OptimizationResult.simulate_risk`.
+
+        :rtype: support.monteCarlo.RiskReport
+        '''
+        from support.monteCarlo import simulate_risk
+
+        return simulate_risk(self.cov, self.weights.values, self.mean_returns, **options)
+
+
+class BasketSession(object):
+    '''
+    Incrementally maintained basket for one date range.
+
+    Not thread-safe: drive a session from one thread at a time.
+
+    :param fetch: callable ``(ticker, start_date, end_date) -> DataFrame``,
+                  called once per stock for the life of the session
+    :param method: minimum variance backend, see :data:`support.optimizer.SOLVERS`
+    '''
+
+    def __init__(self, start_date, end_date, fetch=get_close, method='qp'):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.fetch = fetch
+        self.method = method
+        self.closes = {}  # ticker -> close Series, kept when a stock is removed
+        self.unavailable = {}  # ticker -> why its prices could not be loaded
+        self.tickers = []
+        self.labels = []
+        self.dates = None  # dates of the aligned prices
+        self.prices = None  # aligned closes, dates x stocks
+        self.centred = None  # daily returns minus their mean, (dates - 1) x stocks
+        self.mean_returns = None
+        self.cov = None
+        self.weights = None
+
+    @classmethod
+    def from_data(cls, data, weights, start_date, end_date, fetch=get_close, method='qp'):
+        '''
+        Session continuing from a Calculate: the
+        :class:`support.priceData.PortfolioData` and its optimised weights.
+        '''
+        session = cls(start_date, end_date, fetch=fetch, method=method)
+        session.labels = list(data.labels)
+        session.tickers = [label[:-len('-close')] for label in session.labels]
+        report = data.fetch_report
+        if report is not None:
+            session.unavailable.update(report.failures)
+        for ticker, label in zip(session.tickers, session.labels):
+            if report is not None and ticker in report.frames:
+                close = report.frames[ticker].iloc[:, 0]
+            else:
+                close = data.prices[label]
+            session.closes[ticker] = pd.Series(close.to_numpy(dtype=float), index=pd.DatetimeIndex(close.index))
+        if data.alignment == COMMON:
+            session.dates = pd.DatetimeIndex(data.prices.index)
+            session.prices = data.prices.to_numpy(dtype=float)
+            session._set_returns(data.returns)
+            session.cov = np.atleast_2d(np.array(data.cov))
+        else:
+            # a session works on common dates, so pairwise data is realigned
+            session._rebuild(session.tickers)
+        session.weights = np.asarray(weights, dtype=float)
+        return session
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def codes(self):
+        return [ticker[:-len(BSE_SUFFIX)] if ticker.endswith(BSE_SUFFIX) else ticker for ticker in self.tickers]
+
+    # -- data ---------------------------------------------------------------
+
+    def _close(self, ticker):
+        if ticker not in self.closes:
+            try:
+                frame = self.fetch(ticker, self.start_date, self.end_date)
+                if frame is None or len(frame.index) == 0:
+                    raise LookupError('no prices for %s' % ticker)
+            except Exception as e:
+                self.unavailable[ticker] = str(e)
+                raise
+            close = frame.iloc[:, 0]
+            self.closes[ticker] = pd.Series(close.to_numpy(dtype=float), index=pd.DatetimeIndex(close.index))
+        return self.closes[ticker]
+
+    def _set_returns(self, returns):
+        self.mean_returns = returns.mean(axis=0)
+        self.centred = returns - self.mean_returns
+
+    def _rebuild(self, tickers):
+        '''
+        Align ``tickers`` from scratch on their common dates.
+        '''
+        panel = PricePanel.from_frames([self._close(ticker) for ticker in tickers]).complete()
+        if len(panel) < 3:
+            raise ValueError('not enough overlapping price history for the selected stocks')
+        self.tickers = list(tickers)
+        self.labels = [ticker + '-close' for ticker in tickers]
+        self.dates = panel.dates
+        self.prices = panel.values
+        returns = panel.returns()
+        self._set_returns(returns)
+        self.cov = np.atleast_2d(np.cov(returns, rowvar=False))
+
+    def _common_dates_without(self, position):
+        others = [self.closes[ticker].index for i, ticker in enumerate(self.tickers) if i != position]
+        common = others[0]
+        for index in others[1:]:
+            common = common.intersection(index)
+        return common
+
+    # -- changes ------------------------------------------------------------
+
+    def add(self, code):
+        '''
+        Add the stock with exchange code ``code`` and re-solve.
+
+        :rtype: SessionState
+        '''
+        started = time.perf_counter()
+        ticker = to_yahoo_tickers([code])[0]
+        if ticker in self.tickers:
+            return self._solve(self.weights, started, rebuilt=False)
+        close = self._close(ticker)
+
+        previous = self.weights
+        rebuilt = False
+        if not self.tickers:
+            self._rebuild([ticker])
+            rebuilt = True
+        else:
+            aligned = close.reindex(self.dates).to_numpy(dtype=float)
+            if np.isnan(aligned).any():
+                self._rebuild(self.tickers + [ticker])
+                rebuilt = True
+            else:
+                self._append_column(ticker, aligned)
+
+        x0 = None
+        if previous is not None:
+            x0 = np.append(previous * (1 - WARM_START_WEIGHT), WARM_START_WEIGHT)
+        return self._solve(x0, started, rebuilt)
+
+    def _append_column(self, ticker, prices):
+        returns = prices[1:] / prices[:-1] - 1
+        mean = returns.mean()
+        centred = returns - mean
+        cross = self.centred.T @ centred / (len(centred) - 1)
+
+        size = len(self.cov)
+        cov = np.empty((size + 1, size + 1))
+        cov[:size, :size] = self.cov
+        cov[size, :size] = cov[:size, size] = cross
+        cov[size, size] = centred @ centred / (len(centred) - 1)
+
+        self.cov = cov
+        self.tickers.append(ticker)
+        self.labels.append(ticker + '-close')
+        self.prices = np.column_stack([self.prices, prices])
+        self.centred = np.column_stack([self.centred, centred])
+        self.mean_returns = np.append(self.mean_returns, mean)
+
+    def remove(self, code):
+        '''
+        Remove the stock with exchange code ``code`` and re-solve.
+
+        :return: :class:`SessionState`, or None when the basket is now empty
+        '''
+        started = time.perf_counter()
+        ticker = to_yahoo_tickers([code])[0]
+        if ticker not in self.tickers:
+            return self._solve(self.weights, started, rebuilt=False) if self.tickers else None
+        position = self.tickers.index(ticker)
+        if len(self.tickers) == 1:
+            self.tickers, self.labels, self.weights = [], [], None
+            self.dates = self.prices = self.centred = self.mean_returns = self.cov = None
+            return None
+
+        keep = np.arange(len(self.tickers)) != position
+        x0 = self.weights[keep]
+        x0 = x0 / x0.sum() if x0.sum() > 0 else None
+
+        if len(self._common_dates_without(position)) != len(self.dates):
+            # the removed stock was limiting the common dates
+            self._rebuild([t for t in self.tickers if t != ticker])
+            return self._solve(x0, started, rebuilt=True)
+
+        self.tickers.pop(position)
+        self.labels.pop(position)
+        self.cov = self.cov[np.ix_(keep, keep)]
+        self.prices = self.prices[:, keep]
+        self.centred = self.centred[:, keep]
+        self.mean_returns = self.mean_returns[keep]
+        return self._solve(x0, started, rebuilt=False)
+
+    def set_basket(self, codes):
+        '''
+        Apply the removals and additions turning the session into ``codes``.
+        Stocks whose prices could not be loaded before are left out, as a
+        Calculate with partial data leaves them out.
+
+        :return: the :class:`SessionState` after the last change, the current
+                 one re-solved from the last weights when nothing changed, or
+                 None when the basket is empty
+        '''
+        started = time.perf_counter()
+        state = None
+        changed = False
+        wanted = to_yahoo_tickers(codes)
+        for ticker, code in zip(list(self.tickers), self.codes()):
+            if ticker not in wanted:
+                state, changed = self.remove(code), True
+        for code, ticker in zip(codes, wanted):
+            if ticker not in self.tickers and ticker not in self.unavailable:
+                state, changed = self.add(code), True
+        if not changed and self.tickers:
+            state = self._solve(self.weights, started, rebuilt=False)
+        return state
+
+    def _solve(self, x0, started, rebuilt):
+        solver = min_risk_weights(self.cov, x0=x0, method=self.method)
+        self.weights = solver['x']
+        return SessionState(list(self.labels), solver, self.cov, self.mean_returns,
+                            time.perf_counter() - started, rebuilt)
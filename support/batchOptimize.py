@@ -0,0 +1,128 @@
+'''
+Optimise many portfolios from the command line, without the GUI.
+
+The portfolio file has one basket per line, optionally named, with codes
+from inputData/Equity.csv separated by spaces or commas:
+
+    # name: codes
+    banks: HDFCBANK ICICIBANK SBIN
+    it: INFY, TCS, WIPRO
+
+Run from the repository root:
+
+    python -m support.batchOptimize portfolios.txt --start 2019-01-01 --end 2021-01-01
+'''
+import argparse
+import csv
+import re
+import sys
+import time
+
+import pandas as pd
+
+from support.alignment import ALIGNMENTS, COMMON
+from support.covariance import ESTIMATORS
+from support.engine import METHODS, optimize_many
+from support.instrumentation import RunStats, recording
+from support.priceCache import PriceCache
+from support.resultStore import ResultStore
+
+
+def read_portfolios(path):
+    '''
+    Parse a portfolio file into an ordered ``{name: [codes]}`` mapping.
+    '''
+    portfolios = {}
+    with open(path) as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            name, sep, codes = line.rpartition(':')
+            name = name.strip() if sep else 'portfolio-%d' % line_no
+            codes = [code for code in re.split(r'[\s,]+', codes) if code]
+            if codes:
+                portfolios[name] = codes
+    return portfolios
+
+
+def write_results(results, errors, out):
+    writer = csv.writer(out)
+    writer.writerow(['portfolio', 'ticker', 'weight', 'risk', 'expected_return', 'equal_weight_risk', 'error'])
+    for name, result in results.items():
+        for ticker, weight in result.weights.items():
+            writer.writerow([name, ticker, '%.6f' % weight, result.risk, result.expected_return,
+                             result.equal_weight_risk, ''])
+    for name, error in errors.items():
+        writer.writerow([name, '', '', '', '', '', error])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Minimum risk weights for a file of portfolios.')
+    parser.add_argument('portfolios', help='file with one basket of exchange codes per line')
+    parser.add_argument('--start', required=True, type=pd.Timestamp, help='first date, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, type=pd.Timestamp, help='end date (exclusive), YYYY-MM-DD')
+    parser.add_argument('--output', help='CSV file for the weights, default stdout')
+    parser.add_argument('--solver', choices=METHODS, default='qp',
+                        help='minimum variance backend, cvar to minimise simulated CVaR or hrp for '
+                             'hierarchical risk parity')
+    parser.add_argument('--estimator', choices=sorted(ESTIMATORS), default='sample',
+                        help='covariance estimator')
+    parser.add_argument('--alignment', choices=ALIGNMENTS, default=COMMON,
+                        help='use only dates on which every stock has a price, or every date pairwise')
+    parser.add_argument('--cache-dir', default='cache', help='price cache directory')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent downloads')
+    parser.add_argument('--processes', type=int,
+                        help='solve baskets on a process pool sharing one universe covariance '
+                             '(not with --store or --excel-dir)')
+    parser.add_argument('--store', help='keep every optimised portfolio in this result store directory')
+    parser.add_argument('--excel-dir', help='also write one Stock-Risk workbook per portfolio here')
+    parser.add_argument('--stats', help='write stage timings and counters of the run to this JSON file')
+    parser.add_argument('--profile', help='run under cProfile and dump the profile to this file')
+    args = parser.parse_args(argv)
+    if args.processes and (args.store or args.excel_dir):
+        # pool results carry weights and risks only, not the prices a stored run or workbook needs
+        parser.error('--store and --excel-dir cannot be combined with --processes')
+
+    portfolios = read_portfolios(args.portfolios)
+    cache = PriceCache(args.cache_dir)
+
+    stats = RunStats('batch')
+    started = time.perf_counter()
+    with recording(stats, profile=bool(args.profile), profile_path=args.profile):
+        results, errors = optimize_many(portfolios, args.start.date(), args.end.date(), fetch=cache.get,
+                                        method=args.solver, estimator=args.estimator, processes=args.processes,
+                                        alignment=args.alignment, max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+    if args.stats:
+        stats.write_json(args.stats)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_results(results, errors, out)
+    else:
+        write_results(results, errors, sys.stdout)
+
+    if args.store:
+        store = ResultStore(args.store)
+        for name, result in results.items():
+            run_id = store.save(result, portfolio=name, start=str(args.start.date()), end=str(args.end.date()))
+            print('%s stored as run %s' % (name, run_id), file=sys.stderr)
+
+    if args.excel_dir:
+        for name, result in results.items():
+            result.to_excel('%s/Stock-Risk-%s.xlsx' % (args.excel_dir, re.sub(r'[^\w.-]', '_', name)))
+
+    for name, result in results.items():
+        if args.processes and result.dropped_dates:
+            print('%s: %d dates with prices for all its stocks were left out because other portfolios\' '
+                  'stocks have none on them (run without --processes or with --alignment pairwise to keep them)'
+                  % (name, result.dropped_dates), file=sys.stderr)
+
+    print('%d portfolios optimised, %d failed in %.2fs' % (len(results), len(errors), elapsed),
+          file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+'''
+Optimise many baskets drawn from one universe across a process pool.
+
+The universe's covariance matrix and mean returns are computed once and
+placed in shared memory; every worker attaches to the same block and slices
+the submatrix of its basket by index, so nothing is refetched or pickled
+per basket beyond the index list.
+'''
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from support.hierarchical import hrp_weights
+from support.monteCarlo import min_cvar_weights
+from support.optimizer import min_risk_weights
+from support.priceData import TRADING_DAYS, make_risk_objective
+
+_shared = {}  # worker globals: attached blocks and the arrays viewing them
+
+
+class SharedArray(object):
+    '''
+    A NumPy array living in a ``multiprocessing.shared_memory`` block.
+
+    The creating process owns the block and must call :meth:`close` with
+    ``unlink=True`` when done; workers rebuild a view with :meth:`attach`.
+    '''
+
+    def __init__(self, shm, shape, dtype):
+        self.shm = shm
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, values):
+        values = np.ascontiguousarray(values)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        shared = cls(shm, values.shape, values.dtype)
+        shared.array[...] = values
+        return shared
+
+    @property
+    def spec(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, np.dtype(dtype))
+
+    def close(self, unlink=False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class BasketResult(object):
+    '''
+    Weights and risk figures of one basket from :func:`optimize_baskets`,
+    with the same attributes the batch CLI writes for an
+    :class:`support.engine.OptimizationResult`.
+
+    :ivar dropped_dates: dates on which the basket's own stocks all have
+                         prices but which the universe's common alignment
+                         left out, see :func:`support.engine.optimize_universe`
+    '''
+
+    def __init__(self, labels, weights, risk, equal_weight_risk, expected_return, method):
+        self.weights = pd.Series(weights, index=labels, name='weights')
+        self.risk = risk
+        self.equal_weight_risk = equal_weight_risk
+        self.expected_return = expected_return
+        self.method = method
+        self.dropped_dates = 0
+
+
+class BatchReport(object):
+    '''
+    Results and failures of one :func:`optimize_baskets` run, keyed by basket
+    name, with the wall time of the pool.
+    '''
+
+    def __init__(self, results, errors, elapsed, processes):
+        self.results = results
+        self.errors = errors
+        self.elapsed = elapsed
+        self.processes = processes
+
+    @property
+    def throughput(self):
+        '''
+        Portfolios optimised per second of wall time.
+        '''
+        return len(self.results) / self.elapsed if self.elapsed > 0 else float('inf')
+
+
+def _init_worker(cov_spec, mean_spec):
+    _shared['cov'] = SharedArray.attach(cov_spec)
+    _shared['mean'] = SharedArray.attach(mean_spec)
+
+
+def _solve_basket(task):
+    name, index, method = task
+    try:
+        index = np.asarray(index)
+        cov = _shared['cov'].array[np.ix_(index, index)]
+        mean_returns = _shared['mean'].array[index]
+        if method == 'hrp':
+            results = hrp_weights(cov)
+        elif method == 'cvar':
+            results = min_cvar_weights(cov, mean_returns)
+        else:
+            results = min_risk_weights(cov, method=method)
+        weights = results['x']
+        port_risk = make_risk_objective(cov)
+        expected_return = ((1 + weights @ mean_returns) ** TRADING_DAYS) - 1
+        return name, (weights, float(port_risk(weights)),
+                      float(port_risk(np.full(len(index), 1 / len(index)))),
+                      float(expected_return), results['method']), None
+    except Exception as e:
+        return name, None, '%s: %s' % (type(e).__name__, e)
+
+
+def basket_indices(labels, baskets):
+    '''
+    Translate baskets of universe labels into index arrays.
+
+    :raises KeyError: for a label that is not in the universe
+    '''
+    position = {label: i for i, label in enumerate(labels)}
+    return {name: [position[label] for label in members] for name, members in baskets.items()}
+
+
+def optimize_baskets(cov, mean_returns, labels, baskets, processes=None, method='qp', chunksize=None):
+    '''
+    Minimum risk weights for every basket, solved on ``processes`` workers
+    sharing one copy of the universe covariance.
+
+    :param cov: universe covariance matrix of daily returns
+    :param mean_returns: universe mean daily returns
+    :param labels: universe labels, in the order of ``cov``
+    :param baskets: mapping of basket name to a list of universe labels
+    :param processes: pool size, ``os.cpu_count()`` by default
+    :param method: a solver of :func:`support.optimizer.min_risk_weights`,
+                   ``'cvar'`` or ``'hrp'``, as in :func:`support.engine.optimize`
+    :rtype: BatchReport
+    '''
+    processes = processes or os.cpu_count() or 1
+    indices = basket_indices(labels, baskets)
+    tasks = [(name, index, method) for name, index in indices.items()]
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (processes * 4))
+
+    shared_cov = SharedArray.create(np.asarray(cov, dtype=float))
+    shared_mean = SharedArray.create(np.asarray(mean_returns, dtype=float))
+    started = time.perf_counter()
+    try:
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(shared_cov.spec, shared_mean.spec)) as pool:
+            outcomes = pool.map(_solve_basket, tasks, chunksize=chunksize)
+    finally:
+        shared_cov.close(unlink=True)
+        shared_mean.close(unlink=True)
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    errors = {}
+    for name, outcome, error in outcomes:
+        if error is not None:
+            errors[name] = error
+        else:
+            members = [labels[i] for i in indices[name]]
+            results[name] = BasketResult(members, *outcome)
+    return BatchReport(results, errors, elapsed, processes)
@@ -0,0 +1,240 @@
+'''
+Covariance estimators for daily return matrices.
+
+Every estimator turns a ``T x N`` return array into a :class:`CovarianceModel`.
+Dense estimators hold the full matrix; the factor model keeps a low-rank plus
+diagonal form so ``w' S w`` costs O(N k) rather than O(N^2).
+'''
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from support import instrumentation
+
+CACHE_SIZE = 32
+
+
+class CovarianceModel(object):
+    '''
+    A covariance matrix the optimizer can multiply with.
+    '''
+
+    @property
+    def matrix(self):
+        raise NotImplementedError
+
+    def dot(self, weights):
+        '''
+        S w
+        '''
+        return self.matrix @ weights
+
+    def quad(self, weights):
+        '''
+        w' S w
+        '''
+        return weights @ self.dot(weights)
+
+    def __len__(self):
+        return len(self.diagonal())
+
+    def diagonal(self):
+        return np.diag(self.matrix)
+
+
+class DenseCovariance(CovarianceModel):
+    def __init__(self, matrix):
+        self._matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+
+class FactorCovariance(CovarianceModel):
+    '''
+    S = B B' + diag(d) with ``loadings`` B of shape ``N x k`` and
+    ``specific`` variances d.
+    '''
+
+    def __init__(self, loadings, specific):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific = np.asarray(specific, dtype=float)
+        self._matrix = None
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = self.loadings @ self.loadings.T + np.diag(self.specific)
+        return self._matrix
+
+    def dot(self, weights):
+        return self.loadings @ (self.loadings.T @ weights) + self.specific * weights
+
+    def quad(self, weights):
+        exposure = self.loadings.T @ weights
+        return exposure @ exposure + self.specific @ (weights * weights)
+
+    def diagonal(self):
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific
+
+
+class CovarianceEstimator(object):
+    '''
+    Interface of an estimator. ``key`` identifies the estimator and its
+    parameters for memoisation.
+    '''
+    name = None
+
+    def params(self):
+        return ()
+
+    @property
+    def key(self):
+        return (self.name,) + tuple(self.params())
+
+    def estimate(self, returns):
+        raise NotImplementedError
+
+
+class SampleCovariance(CovarianceEstimator):
+    '''
+    The plain sample covariance, as ``returns_df.cov()``.
+    '''
+    name = 'sample'
+
+    def estimate(self, returns):
+        return DenseCovariance(np.cov(returns, rowvar=False))
+
+
+class LedoitWolf(CovarianceEstimator):
+    '''
+    Ledoit-Wolf (2004) shrinkage of the sample covariance towards a scaled
+    identity, with the optimal shrinkage intensity estimated from the data.
+    Stays well conditioned when there are more names than observations.
+    '''
+    name = 'ledoit-wolf'
+
+    def estimate(self, returns):
+        returns = np.asarray(returns, dtype=float)
+        num_days, num_stocks = returns.shape
+        centred = returns - returns.mean(axis=0)
+        sample = centred.T @ centred / num_days
+        target = np.trace(sample) / num_stocks
+
+        distance = (np.sum(sample * sample) - 2 * target * np.trace(sample)
+                    + num_stocks * target ** 2) / num_stocks
+        # sum_t |x_t x_t' - S|^2 = sum_t |x_t|^4 - T |S|^2
+        row_norms = np.sum(centred * centred, axis=1)
+        spread = (np.sum(row_norms ** 2) - num_days * np.sum(sample * sample)) / num_stocks / num_days ** 2
+        shrinkage = 0.0 if distance <= 0 else min(spread, distance) / distance
+
+        shrunk = (1 - shrinkage) * sample
+        shrunk[np.diag_indices(num_stocks)] += shrinkage * target
+        model = DenseCovariance(shrunk * num_days / (num_days - 1))
+        model.shrinkage = shrinkage
+        return model
+
+
+class EWMA(CovarianceEstimator):
+    '''
+    Exponentially weighted covariance, recent days weighted by ``decay`` per
+    day (0.94 is the RiskMetrics daily value).
+    '''
+    name = 'ewma'
+
+    def __init__(self, decay=0.94):
+        self.decay = decay
+
+    def params(self):
+        return (self.decay,)
+
+    def estimate(self, returns):
+        returns = np.asarray(returns, dtype=float)
+        weights = self.decay ** np.arange(len(returns) - 1, -1, -1)
+        weights /= weights.sum()
+        centred = returns - weights @ returns
+        return DenseCovariance((centred * weights[:, None]).T @ centred)
+
+
+class FactorModel(CovarianceEstimator):
+    '''
+    Statistical factor model: the ``factors`` leading principal components of
+    the returns plus a specific variance per name. Built from a thin SVD of
+    the ``T x N`` returns, so the dense ``N x N`` matrix is never needed.
+    '''
+    name = 'factor'
+
+    def __init__(self, factors=5):
+        self.factors = factors
+
+    def params(self):
+        return (self.factors,)
+
+    def estimate(self, returns):
+        returns = np.asarray(returns, dtype=float)
+        num_days = len(returns)
+        centred = returns - returns.mean(axis=0)
+        _, singular, components = np.linalg.svd(centred, full_matrices=False)
+        k = min(self.factors, len(singular))
+        loadings = components[:k].T * (singular[:k] / np.sqrt(num_days - 1))
+        total = np.sum(centred * centred, axis=0) / (num_days - 1)
+        specific = np.maximum(total - np.sum(loadings * loadings, axis=1), 1e-12 * total.max())
+        return FactorCovariance(loadings, specific)
+
+
+ESTIMATORS = {
+    'sample': SampleCovariance,
+    'ledoit-wolf': LedoitWolf,
+    'ewma': EWMA,
+    'factor': FactorModel,
+}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_estimator(estimator):
+    '''
+    Accept an estimator instance or a name from ``ESTIMATORS``.
+    '''
+    if estimator is None:
+        return SampleCovariance()
+    if isinstance(estimator, CovarianceEstimator):
+        return estimator
+    try:
+        return ESTIMATORS[estimator]()
+    except KeyError:
+        raise ValueError('unknown covariance estimator %r, expected one of %s'
+                         % (estimator, ', '.join(ESTIMATORS)))
+
+
+def estimate(returns, estimator=None, dataset_key=None):
+    '''
+    Estimate the covariance of ``returns``, memoised on ``dataset_key`` (for
+    example tickers, date range and a hash of the returns, see
+    :attr:`support.priceData.PortfolioData.dataset_key`) together with the
+    estimator parameters.
+
+    :rtype: CovarianceModel
+    '''
+    estimator = get_estimator(estimator)
+    if dataset_key is None:
+        with instrumentation.stage('estimate'):
+            return estimator.estimate(returns)
+
+    key = (dataset_key, estimator.key)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            instrumentation.count('covariance_cache_hits')
+            return _cache[key]
+
+    with instrumentation.stage('estimate'):
+        model = estimator.estimate(returns)
+    with _cache_lock:
+        _cache[key] = model
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return model
@@ -0,0 +1,222 @@
+'''
+Headless portfolio optimisation: everything the Stock Risk Calculator window
+does after Calculate is pressed, without importing PyQt5.
+'''
+import numpy as np
+import pandas as pd
+
+from support.alignment import COMMON, PricePanel
+from support.fetchEngine import fetch_all
+from support.optimizer import SOLVERS, min_risk_weights
+from support.portfolioStats import score_portfolios
+from support.priceData import get_close, prepare_portfolio_data, to_yahoo_tickers
+from support.resultStore import export_excel, weights_frame
+
+# Optimisation modes: the minimum variance backends plus minimum CVaR and
+# hierarchical risk parity
+METHODS = tuple(sorted(SOLVERS)) + ('cvar', 'hrp')
+
+
+class OptimizationResult(object):
+    '''
+    Minimum risk weights of one basket plus the numbers shown in the window.
+
+    :ivar data: the :class:`support.priceData.PortfolioData` that was optimised
+    :ivar weights: ``pd.Series`` of weights indexed by price column
+    :ivar risk: annualised standard deviation of the optimised portfolio
+    :ivar equal_weight_risk: the same for equal weights, for comparison
+    :ivar expected_return: annualised expected return of the optimised portfolio
+    :ivar solver: the ``scipy.optimize.OptimizeResult`` of the solve
+    :ivar cov: the covariance the weights were optimised against
+    :ivar stopped: why the solve was stopped early (cancelled, out of time),
+                   None if it ran to the end
+    '''
+
+    def __init__(self, data, solver, cov=None):
+        self.data = data
+        self.solver = solver
+        self.cov = data.cov if cov is None else cov
+        self.weights = pd.Series(solver['x'], index=data.labels, name='weights')
+        message = str(solver.get('message', ''))
+        self.stopped = message[len('stopped: '):] if message.startswith('stopped: ') else None
+
+        # the optimised and the equal weights, scored in one pass
+        scores = score_portfolios(self.cov, data.mean_returns,
+                                  [self.weights.values, np.full(data.num_stocks, 1 / data.num_stocks)])
+        self.risk = float(scores.risks[0])
+        self.equal_weight_risk = float(scores.risks[1])
+        self.expected_return = float(scores.returns[0])
+
+    @property
+    def prices(self):
+        return self.data.prices
+
+    def simulate_risk(self, **options):
+        '''
+        Monte Carlo VaR, CVaR and drawdowns of the weights, see
+        :func:`support.monteCarlo.simulate_risk` for the options.
+
+        :rtype: support.monteCarlo.RiskReport
+        '''
+        from support.monteCarlo import simulate_risk
+
+        return simulate_risk(self.cov, self.weights.values, self.data.mean_returns, **options)
+
+    def weights_frame(self):
+        '''
+        Weights as shown in the results table: ``weights`` and ``weights_rounded``.
+        '''
+        return weights_frame(self.weights)
+
+    def to_excel(self, path):
+        export_excel(self, path)
+
+
+def optimize_data(data, method='qp', estimator=None, monitor=None):
+    '''
+    Optimise already prepared :class:`support.priceData.PortfolioData`.
+    '''
+    cov = data.covariance(estimator)
+    if method == 'cvar':
+        from support.monteCarlo import min_cvar_weights
+
+        return OptimizationResult(data, min_cvar_weights(cov, data.mean_returns), cov)
+    if method == 'hrp':
+        from support.hierarchical import hrp_weights
+
+        return OptimizationResult(data, hrp_weights(cov), cov)
+    return OptimizationResult(data, min_risk_weights(cov, method=method, monitor=monitor), cov)
+
+
+def optimize(tickers, start, end, fetch=get_close, method='qp', estimator=None, allow_partial=False,
+             monitor=None, alignment=COMMON, **fetch_options):
+    '''
+    Download prices for ``tickers`` and return their minimum risk weights.
+
+    :param tickers: exchange codes as listed in ``inputData/Equity.csv``
+    :param start: first date of the price history
+    :param end: end of the price history (exclusive)
+    :param fetch: price source, see :func:`support.priceData.prepare_portfolio_data`
+    :param method: solver backend, see :data:`support.optimizer.SOLVERS`,
+                   ``'cvar'`` for the weights minimising simulated CVaR, see
+                   :func:`support.monteCarlo.min_cvar_weights`, or ``'hrp'``
+                   for hierarchical risk parity, see
+                   :func:`support.hierarchical.hrp_weights`
+    :param estimator: covariance estimator, see :data:`support.covariance.ESTIMATORS`
+    :param monitor: :class:`support.optimizer.SolveMonitor` streaming progress
+                    and able to stop the solve early
+    :param alignment: ``'common'`` dates only or ``'pairwise'``, see
+                      :class:`support.priceData.PortfolioData`
+    :rtype: OptimizationResult
+    '''
+    data = prepare_portfolio_data(to_yahoo_tickers(tickers), start, end, fetch=fetch,
+                                  allow_partial=allow_partial, alignment=alignment, **fetch_options)
+    return optimize_data(data, method=method, estimator=estimator, monitor=monitor)
+
+
+def frontier(tickers, start, end, fetch=get_close, points=None, risk_free=0.0, allow_partial=False,
+             alignment=COMMON, **fetch_options):
+    '''
+    Efficient frontier of ``tickers``, see :func:`support.frontier.efficient_frontier`.
+
+    :rtype: support.frontier.Frontier
+    '''
+    from support.frontier import FRONTIER_POINTS, efficient_frontier
+
+    data = prepare_portfolio_data(to_yahoo_tickers(tickers), start, end, fetch=fetch,
+                                  allow_partial=allow_partial, alignment=alignment, **fetch_options)
+    return efficient_frontier(data.cov, data.mean_returns, labels=data.labels,
+                              points=points or FRONTIER_POINTS, risk_free=risk_free)
+
+
+def backtest(tickers, start, end, fetch=get_close, lookback=None, rebalance=None, method='qp',
+             allow_partial=False, **fetch_options):
+    '''
+    Walk-forward backtest of the minimum risk portfolio of ``tickers``, see
+    :func:`support.backtest.walk_forward`.
+
+    :rtype: support.backtest.BacktestResult
+    '''
+    from support.backtest import DEFAULT_LOOKBACK, DEFAULT_REBALANCE, walk_forward
+
+    data = prepare_portfolio_data(to_yahoo_tickers(tickers), start, end, fetch=fetch,
+                                  allow_partial=allow_partial, **fetch_options)
+    returns = data.prices.pct_change(1).dropna()
+    return walk_forward(returns, lookback=lookback or DEFAULT_LOOKBACK,
+                        rebalance=rebalance or DEFAULT_REBALANCE, method=method)
+
+
+def optimize_many(portfolios, start, end, fetch=get_close, method='qp', estimator=None, processes=None,
+                  alignment=COMMON, **fetch_options):
+    '''
+    Optimise several baskets over the same dates, downloading each distinct
+    ticker only once.
+
+    :param portfolios: mapping of portfolio name to a list of exchange codes
+    :param processes: solve on a process pool of this size instead, see
+                      :func:`optimize_universe`
+    :return: ``(results, errors)`` dictionaries keyed by portfolio name; a
+             basket that cannot be optimised gets an error message instead
+             of a result
+    '''
+    if processes:
+        return optimize_universe(portfolios, start, end, fetch=fetch, method=method, estimator=estimator,
+                                 processes=processes, alignment=alignment, **fetch_options)
+
+    tickers = sorted({ticker for codes in portfolios.values() for ticker in to_yahoo_tickers(codes)})
+    report = fetch_all(tickers, start, end, fetch, **fetch_options)
+
+    def from_report(ticker, start_date, end_date):
+        if ticker not in report.frames:
+            raise LookupError(report.failures.get(ticker, 'not downloaded'))
+        return report.frames[ticker]
+
+    results = {}
+    errors = {}
+    for name, codes in portfolios.items():
+        try:
+            results[name] = optimize(codes, start, end, fetch=from_report, method=method, estimator=estimator,
+                                     alignment=alignment, retries=0)
+        except Exception as e:
+            errors[name] = str(e)
+    return results, errors
+
+
+def optimize_universe(portfolios, start, end, fetch=get_close, method='qp', estimator=None, processes=None,
+                      alignment=COMMON, **fetch_options):
+    '''
+    Like :func:`optimize_many`, but the union of all baskets is aligned and
+    its covariance computed once, then the baskets are solved in parallel by
+    :func:`support.batchPool.optimize_baskets`. With common alignment every
+    basket therefore uses the dates on which the whole universe has prices,
+    so its weights can differ from :func:`optimize_many` without
+    ``processes``; each result's ``dropped_dates`` counts the dates lost
+    that way. Pairwise alignment avoids that.
+
+    :return: ``(results, errors)`` with :class:`support.batchPool.BasketResult` values
+    '''
+    from support.batchPool import optimize_baskets
+
+    tickers = sorted({ticker for codes in portfolios.values() for ticker in to_yahoo_tickers(codes)})
+    universe = prepare_portfolio_data(tickers, start, end, fetch=fetch, allow_partial=True, alignment=alignment,
+                                      **fetch_options)
+    label_of = dict(zip(universe.fetch_report.fetched, universe.labels))
+
+    baskets = {}
+    errors = {}
+    for name, codes in portfolios.items():
+        missing = [ticker for ticker in to_yahoo_tickers(codes) if ticker not in label_of]
+        if missing:
+            errors[name] = 'could not get data for: ' + ', '.join(missing)
+        else:
+            baskets[name] = [label_of[ticker] for ticker in to_yahoo_tickers(codes)]
+
+    batch = optimize_baskets(universe.covariance(estimator).matrix, universe.mean_returns, universe.labels, baskets,
+                             processes=processes, method=method)
+    errors.update(batch.errors)
+    if alignment == COMMON:
+        frames = universe.fetch_report.frames
+        for name, result in batch.results.items():
+            own = PricePanel.from_frames([frames[ticker] for ticker in to_yahoo_tickers(portfolios[name])])
+            result.dropped_dates = int(own.complete_rows().sum()) - len(universe.prices.index)
+    return batch.results, errors
@@ -0,0 +1,176 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from support import instrumentation
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 30.0  # seconds per attempt
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5  # seconds, doubled after every failed attempt
+DEFAULT_MAX_ABANDONED = 8  # timed-out calls still running on top of max_workers
+
+
+class NoDataError(Exception):
+    '''
+    Raised when a source answers but has no prices for the ticker; not retried.
+    '''
+
+
+class Fetcher(object):
+    '''
+    Interface of a price source.
+
+    Subclasses implement :meth:`fetch`. Instances are callables with the
+    ``(ticker, start_date, end_date) -> DataFrame`` signature used by
+    :class:`support.priceCache.PriceCache` and
+    :func:`support.priceData.prepare_portfolio_data`.
+    '''
+
+    def fetch(self, ticker, start_date, end_date):
+        raise NotImplementedError
+
+    def __call__(self, ticker, start_date, end_date):
+        return self.fetch(ticker, start_date, end_date)
+
+
+class YahooFetcher(Fetcher):
+    '''
+    Daily closes from Yahoo Finance.
+    '''
+
+    def fetch(self, ticker, start_date, end_date):
+        from support.priceData import get_close
+        return get_close(ticker, start_date, end_date)
+
+
+class FetchReport(object):
+    '''
+    Outcome of :func:`fetch_all`: the frames that arrived, keyed by ticker in
+    request order, and a readable reason for every ticker that did not.
+    '''
+
+    def __init__(self, tickers):
+        self.tickers = list(tickers)
+        self.frames = {}
+        self.failures = {}
+        self.attempts = dict.fromkeys(self.tickers, 0)
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    @property
+    def fetched(self):
+        return [ticker for ticker in self.tickers if ticker in self.frames]
+
+    def summary(self):
+        lines = ['%s: %s' % (ticker, reason) for ticker, reason in self.failures.items()]
+        return '\n'.join(lines)
+
+
+class _Attempt(object):
+    '''
+    One call of ``fetch`` on its own daemon thread, recording into ``stats``.
+    ``started`` is set by the thread when the call begins, so the timeout
+    only counts running time.
+    '''
+
+    def __init__(self, ticker, fetch, args, stats):
+        self.ticker = ticker
+        self.future = Future()
+        self.started = None
+        self.thread = threading.Thread(target=self._run, args=(fetch, args, stats), daemon=True,
+                                       name='fetch-%s' % ticker)
+
+    def _run(self, fetch, args, stats):
+        self.started = time.monotonic()
+        try:
+            with instrumentation.attached(stats):
+                result = fetch(self.ticker, *args)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+def fetch_all(tickers, start_date, end_date, fetch, max_workers=DEFAULT_MAX_WORKERS,
+              timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+              max_abandoned=DEFAULT_MAX_ABANDONED):
+    '''
+    Download ``tickers`` concurrently and collect the results in a
+    :class:`FetchReport`; a failing ticker never aborts the others.
+
+    At most ``max_workers`` requests are in flight. An attempt that raises
+    or runs longer than ``timeout`` seconds (counted from when ``fetch``
+    starts) is retried up to ``retries`` times, waiting
+    ``backoff * 2 ** (attempt - 1)`` seconds before each retry. A timed-out
+    call cannot be interrupted, so its thread finishes in the background
+    and its late result is discarded. Up to ``max_abandoned`` such calls
+    may run on top of ``max_workers``, so a few hung downloads cannot starve
+    the others; beyond that they take the place of new requests until they
+    finish, and a slow source never sees more than
+    ``max_workers + max_abandoned`` open requests.
+
+    :param fetch: callable ``(ticker, start_date, end_date) -> DataFrame``
+    '''
+    report = FetchReport(tickers)
+    started_at = time.monotonic()
+    queue = [(started_at, ticker) for ticker in report.tickers]  # (not before, ticker)
+    in_flight = {}  # future -> attempt
+    abandoned = set()  # futures of timed-out attempts still running
+    stats = instrumentation.active()  # the caller's run, for the fetch threads to count into
+
+    def failed(ticker, error, now):
+        if isinstance(error, NoDataError) or report.attempts[ticker] > retries:
+            report.failures[ticker] = '%s: %s' % (type(error).__name__, error)
+        else:
+            queue.append((now + backoff * 2 ** (report.attempts[ticker] - 1), ticker))
+
+    def free():
+        return min(max_workers, max_workers + max_abandoned - len(abandoned)) - len(in_flight)
+
+    while queue or in_flight:
+        now = time.monotonic()
+        queue.sort()
+        while queue and queue[0][0] <= now and free() > 0:
+            _, ticker = queue.pop(0)
+            report.attempts[ticker] += 1
+            instrumentation.count('fetch_attempts')
+            attempt = _Attempt(ticker, fetch, (start_date, end_date), stats)
+            in_flight[attempt.future] = attempt
+            attempt.thread.start()
+
+        # an attempt whose thread has not begun yet is given a full timeout from now
+        wake_ups = [(attempt.started or now) + timeout for attempt in in_flight.values()]
+        if queue and free() > 0:
+            wake_ups.append(queue[0][0])
+        # with nothing else to wait for, the queue waits for an abandoned call to finish
+        wait_for = max(0.0, min(wake_ups) - now) if wake_ups else None
+        done, _ = wait(list(in_flight) + list(abandoned), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        now = time.monotonic()
+        abandoned.difference_update(done)
+        for future in done:
+            if future not in in_flight:
+                continue
+            ticker = in_flight.pop(future).ticker
+            try:
+                frame = future.result()
+                if frame is None or len(frame.index) == 0:
+                    raise NoDataError('no prices returned')
+            except Exception as e:
+                failed(ticker, e, now)
+            else:
+                report.frames[ticker] = frame
+                instrumentation.count('bytes_fetched', int(frame.memory_usage(index=True).sum()))
+
+        for future, attempt in list(in_flight.items()):
+            if attempt.started is not None and now - attempt.started >= timeout and not future.done():
+                del in_flight[future]
+                abandoned.add(future)
+                failed(attempt.ticker, TimeoutError('no answer after %.1fs' % timeout), now)
+
+    report.elapsed = time.monotonic() - started_at
+    return report
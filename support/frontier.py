@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from support.optimizer import make_risk_function, min_risk_weights, sum_to_one_constraint
+from support.portfolioStats import score_portfolios
+from support.priceData import TRADING_DAYS
+
+FRONTIER_POINTS = 50
+
+
+class Frontier(object):
+    '''
+    Points of the long-only efficient frontier, lowest risk first.
+
+    :ivar targets: daily expected return each point was solved for
+    :ivar weights: ``points x assets`` array of weights
+    :ivar risks: annualised standard deviation of each point
+    :ivar returns: annualised expected return of each point
+    :ivar sharpe: annualised Sharpe ratio of each point
+    :ivar max_sharpe: index into the arrays of the maximum Sharpe portfolio,
+                      which is appended as the last point
+    '''
+
+    def __init__(self, labels, targets, weights, cov, mean_returns, risk_free):
+        self.labels = list(labels)
+        self.targets = np.asarray(targets)
+        self.weights = np.asarray(weights)
+
+        scores = score_portfolios(cov, mean_returns, self.weights, risk_free)
+        self.risks = scores.risks
+        self.returns = scores.returns
+        self.sharpe = scores.sharpe
+        self.max_sharpe = len(self.weights) - 1
+
+    def as_array(self):
+        '''
+        ``points x 3`` array of (risk, expected return, Sharpe ratio).
+        '''
+        return np.column_stack([self.risks, self.returns, self.sharpe])
+
+    def to_frame(self):
+        '''
+        One row per point with risk, return, Sharpe ratio and the weights,
+        ready for :class:`support.pandasModel.PandasModel`.
+        '''
+        index = ['point-%d' % i for i in range(len(self.weights))]
+        index[self.max_sharpe] = 'max-sharpe'
+        frame = pd.DataFrame(self.weights.round(3), index=index, columns=self.labels)
+        frame.insert(0, 'sharpe', self.sharpe)
+        frame.insert(0, 'expected_return', self.returns)
+        frame.insert(0, 'risk', self.risks)
+        return frame
+
+
+def _target_return_constraint(mean_returns, target):
+    return {'type': 'eq',
+            'fun': lambda x: mean_returns @ x - target,
+            'jac': lambda x: mean_returns}
+
+
+def _slsqp(fun, x0, constraints):
+    num_stocks = len(x0)
+    bounds = tuple((0, 1) for i in range(num_stocks))
+    return minimize(fun=fun, x0=x0, jac=True, method='SLSQP', bounds=bounds,
+                    constraints=constraints, options={'ftol': 1e-12, 'maxiter': 500})
+
+
+def max_sharpe_weights(cov, mean_returns, risk_free=0.0, x0=None):
+    '''
+    Long-only weights maximising the Sharpe ratio (daily excess return over
+    daily standard deviation), solved with SLSQP and the analytic gradient.
+
+    :param risk_free: annual risk free rate
+    '''
+    cov = np.asarray(cov, dtype=float)
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    excess = mean_returns - risk_free / TRADING_DAYS
+    if x0 is None:
+        x0 = np.full(len(cov), 1 / len(cov))
+
+    def negative_sharpe(weights):
+        cov_w = cov @ weights
+        sd_p = np.sqrt(weights @ cov_w)
+        excess_p = excess @ weights
+        sharpe = excess_p / sd_p
+        gradient = (excess - sharpe * cov_w / sd_p) / sd_p
+        return -sharpe, -gradient
+
+    results = _slsqp(negative_sharpe, x0, [sum_to_one_constraint(len(cov))])
+    return results['x']
+
+
+def efficient_frontier(cov, mean_returns, labels=None, points=FRONTIER_POINTS, risk_free=0.0):
+    '''
+    Minimum variance weights for ``points`` target returns spread evenly
+    between the minimum variance portfolio and the best single asset, plus
+    the maximum Sharpe portfolio.
+
+    Every solve starts from the previous point's weights, which are nearly
+    optimal for the next target, and the covariance and mean return vectors
+    are shared by all solves.
+
+    :param cov: daily return covariance matrix
+    :param mean_returns: mean daily return of each asset
+    :param risk_free: annual risk free rate for the Sharpe ratios
+    :rtype: Frontier
+    '''
+    cov = np.asarray(cov, dtype=float)
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    if labels is None:
+        labels = ['asset-%d' % i for i in range(len(cov))]
+
+    risk_and_gradient = make_risk_function(cov)
+    budget = sum_to_one_constraint(len(cov))
+
+    weights = min_risk_weights(cov)['x']
+    targets = np.linspace(mean_returns @ weights, mean_returns.max(), points)
+    solved = [weights]
+    for target in targets[1:]:
+        results = _slsqp(risk_and_gradient, weights,
+                         [budget, _target_return_constraint(mean_returns, target)])
+        weights = np.clip(results['x'], 0, None)
+        solved.append(weights)
+
+    solved = np.array(solved)
+    frontier = Frontier(labels, targets, solved, cov, mean_returns, risk_free)
+    best = solved[int(np.argmax(frontier.sharpe))]
+    tangency = max_sharpe_weights(cov, mean_returns, risk_free, x0=best)
+
+    return Frontier(labels, np.append(targets, mean_returns @ tangency), np.vstack([solved, tangency]),
+                    cov, mean_returns, risk_free)
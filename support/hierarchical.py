@@ -0,0 +1,122 @@
+'''
+Hierarchical risk parity (Lopez de Prado, 2016).
+
+Allocation without inverting the covariance or running a solver, for
+universes where the minimum variance problem is too large or too badly
+conditioned:
+
+1. cluster the stocks on the correlation distance ``sqrt((1 - rho) / 2)``;
+2. order them by the leaves of the dendrogram, so that correlated stocks
+   sit next to each other (quasi-diagonalisation);
+3. split the ordered list in halves recursively, dividing each parent's
+   weight between its halves in inverse proportion to their variance
+   under inverse-variance weights.
+
+Stocks whose price never moved have no correlation and would take all the
+weight as if riskless; they are left out with zero weight and listed in
+the result's ``excluded``.
+
+Clustering costs O(N^2) with single linkage and each level of the
+bisection touches every covariance entry of its clusters once, so the
+whole allocation is O(N^2 log N).
+'''
+import numpy as np
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.optimize import OptimizeResult
+from scipy.spatial.distance import squareform
+
+from support.covariance import CovarianceModel
+
+LINKAGE = 'single'  # linkage of the original method; 'average', 'complete' and 'ward' also work
+ZERO_VARIANCE = 1e-16  # daily variances at or below this are constant prices
+
+
+def correlation_distance(cov):
+    '''
+    ``sqrt((1 - rho) / 2)`` for every pair: 0 for perfectly correlated
+    stocks, 1 for perfectly anti-correlated ones. A zero-variance stock is
+    taken as uncorrelated with every other, at ``sqrt(1 / 2)``.
+    '''
+    flat = np.diag(cov) <= ZERO_VARIANCE
+    std = np.sqrt(np.where(flat, 1.0, np.diag(cov)))
+    corr = cov / np.outer(std, std)
+    corr[flat, :] = 0
+    corr[:, flat] = 0
+    distance = np.sqrt(np.clip((1 - corr) / 2, 0, None))
+    np.fill_diagonal(distance, 0)
+    return distance
+
+
+def quasi_diagonal_order(cov, method=LINKAGE):
+    '''
+    Order of the stocks along the leaves of their hierarchical clustering.
+    '''
+    if len(cov) < 2:
+        return np.arange(len(cov))
+    condensed = squareform(correlation_distance(cov), checks=False)
+    return leaves_list(linkage(condensed, method=method))
+
+
+def _cluster_variance(cov, members):
+    sub = cov[np.ix_(members, members)]
+    weights = 1 / np.maximum(np.diag(sub), ZERO_VARIANCE)
+    weights /= weights.sum()
+    return weights @ sub @ weights
+
+
+def recursive_bisection(cov, order):
+    '''
+    Weights from splitting ``order`` in halves down to single stocks.
+    '''
+    weights = np.ones(len(cov))
+    clusters = [np.asarray(order)]
+    while clusters:
+        split = []
+        for members in clusters:
+            if len(members) < 2:
+                continue
+            half = len(members) // 2
+            left, right = members[:half], members[half:]
+            left_var, right_var = _cluster_variance(cov, left), _cluster_variance(cov, right)
+            alpha = 1 - left_var / (left_var + right_var)
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+            split += [left, right]
+        clusters = split
+    return weights
+
+
+def hrp_weights(cov, method=LINKAGE):
+    '''
+    Hierarchical risk parity weights of ``cov``: long-only, fully invested
+    and, unlike the minimum variance weights, spread across every stock.
+
+    :param cov: daily return covariance (array or
+                :class:`support.covariance.CovarianceModel`)
+    :param method: linkage of the clustering, see ``scipy.cluster.hierarchy.linkage``
+    :return: ``scipy.optimize.OptimizeResult`` like
+             :func:`support.optimizer.min_risk_weights`, with ``method``
+             ``'hrp'``, the quasi-diagonal order in ``order`` and the
+             positions of the zero-variance stocks left out in ``excluded``
+    '''
+    from support.optimizer import make_risk_function
+
+    matrix = cov.matrix if isinstance(cov, CovarianceModel) else np.asarray(cov, dtype=float)
+    flat = np.diag(matrix) <= ZERO_VARIANCE
+    live = np.flatnonzero(~flat)
+    weights = np.zeros(len(matrix))
+    message = 'hierarchical risk parity'
+    if len(live) == 0:
+        order = np.arange(len(matrix))
+        weights[:] = 1 / max(len(matrix), 1)
+        message += ', every stock has zero variance: equal weights'
+    else:
+        sub = matrix[np.ix_(live, live)]
+        local = quasi_diagonal_order(sub, method)
+        order = live[local]
+        weights[live] = recursive_bisection(sub, local)
+        if flat.any():
+            message += ', %d zero-variance stocks left out' % flat.sum()
+    risk = make_risk_function(cov)(weights)[0]
+    return OptimizeResult(x=weights, fun=risk, order=order, excluded=np.flatnonzero(flat), success=True,
+                          status=0, nit=0, message=message, method='hrp')
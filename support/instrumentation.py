@@ -0,0 +1,193 @@
+'''
+Timings and counters for one optimisation run.
+
+Pipeline code marks its stages with :func:`stage` and bumps counters with
+:func:`count`. Both do nothing unless a :class:`RunStats` is being recorded
+(see :func:`recording`), so the calls can stay in hot code: disabled, a
+stage costs one thread-local lookup and a shared no-op context manager.
+
+Recording is per thread, so runs on different threads (a calculation and a
+what-if update, say) keep their own stats. Worker threads of a run join it
+with :func:`attached`, as the download pool does.
+'''
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_LINES = 30  # functions listed in the profile summary
+
+_local = threading.local()  # .stats: the active RunStats of the thread
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class RunStats(object):
+    '''
+    Wall time and call count per stage, plus named counters (objective
+    evaluations, bytes fetched, cache hits, ...). Stages may nest, e.g.
+    ``fetch`` inside ``prepare``; each keeps its own total.
+    '''
+
+    def __init__(self, name=None):
+        self.name = name
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += seconds
+            entry['calls'] += 1
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        '''
+        JSON-serialisable dictionary of everything recorded.
+        '''
+        with self._lock:
+            return {'name': self.name,
+                    'started': self.started,
+                    'elapsed': self.elapsed,
+                    'stages': OrderedDict((name, dict(entry)) for name, entry in self.stages.items()),
+                    'counters': OrderedDict(self.counters),
+                    'profile': self.profile}
+
+    def write_json(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.report(), fh, indent=1, default=float)
+
+    def summary(self):
+        '''
+        One line for a status bar: stage times, then counters.
+        '''
+        with self._lock:
+            parts = ['%s %.3fs' % (name, entry['seconds']) for name, entry in self.stages.items()]
+            parts += ['%s %s' % (name.replace('_', ' '), _format_count(value))
+                      for name, value in self.counters.items()]
+        return ', '.join(parts)
+
+
+def _format_count(value):
+    if isinstance(value, float):
+        return '%g' % value
+    return '%d' % value
+
+
+class recording(object):
+    '''
+    Context manager making ``stats`` the active :class:`RunStats` of the
+    calling thread; the thread's previous one is restored on exit.
+
+    :param profile: also run the block under cProfile; the top functions by
+                    cumulative time end up in ``stats.profile`` (text) and
+                    the raw profile in ``profile_path`` if given. Only the
+                    calling thread is profiled.
+    '''
+
+    def __init__(self, stats=None, profile=False, profile_path=None):
+        self.stats = RunStats() if stats is None else stats
+        self.profile = profile
+        self.profile_path = profile_path
+        self._profiler = None
+
+    def __enter__(self):
+        self._previous = active()
+        _local.stats = self.stats
+        self._started = time.perf_counter()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            self.stats.profile = out.getvalue()
+            if self.profile_path:
+                self._profiler.dump_stats(self.profile_path)
+        self.stats.elapsed += time.perf_counter() - self._started
+        _local.stats = self._previous
+        return False
+
+
+class attached(object):
+    '''
+    Context manager making ``stats`` (may be None) the active
+    :class:`RunStats` of the calling thread without timing the block, for
+    a worker thread contributing to a run recorded on another thread.
+    '''
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self._previous = active()
+        _local.stats = self.stats
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        _local.stats = self._previous
+        return False
+
+
+def active():
+    '''
+    The :class:`RunStats` being recorded on the calling thread, or None.
+    '''
+    return getattr(_local, 'stats', None)
+
+
+def stage(name):
+    '''
+    Time the enclosed block as stage ``name`` of the active run, if any.
+    '''
+    stats = active()
+    return _NULL_STAGE if stats is None else stats.stage(name)
+
+
+def count(name, amount=1):
+    '''
+    Add ``amount`` to counter ``name`` of the active run, if any.
+    '''
+    stats = active()
+    if stats is not None:
+        stats.count(name, amount)
@@ -0,0 +1,238 @@
+'''
+Monte Carlo risk of a weighted portfolio: value at risk, conditional value
+at risk (expected shortfall) and the distribution of maximum drawdowns.
+
+Daily asset returns are drawn from a multivariate normal with the estimated
+mean and covariance. The covariance is factored once, then scenarios are
+generated in chunks of at most ``CHUNK_ELEMENTS`` numbers. For a fixed
+portfolio only ``z @ (L' w)`` is needed per chunk, so a million scenarios of
+a hundred assets never hold more than one chunk of draws plus the
+portfolio returns themselves.
+'''
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import OptimizeResult, linprog
+
+from support.covariance import CovarianceModel
+from support.priceData import TRADING_DAYS
+
+DEFAULT_SCENARIOS = 1000000
+DEFAULT_LEVEL = 0.95
+DRAWDOWN_PATHS = 2000
+CVAR_SCENARIOS = 5000  # scenarios in the CVaR linear program, whose cost grows fast with them
+CHUNK_ELEMENTS = 4 * 1024 * 1024  # random numbers drawn at once (32 MB of float64)
+
+
+def covariance_factor(cov):
+    '''
+    Matrix L with L L' = ``cov``: the Cholesky factor, or for a singular
+    covariance (more assets than days) the square root from its
+    eigendecomposition.
+    '''
+    cov = cov.matrix if isinstance(cov, CovarianceModel) else np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def value_at_risk(returns, level=DEFAULT_LEVEL):
+    '''
+    Loss not exceeded with probability ``level``, as a positive fraction.
+    '''
+    return -float(np.quantile(returns, 1 - level))
+
+
+def conditional_value_at_risk(returns, level=DEFAULT_LEVEL):
+    '''
+    Mean loss in the worst ``1 - level`` of ``returns``, as a positive fraction.
+    '''
+    returns = np.asarray(returns)
+    tail = max(int(np.ceil(len(returns) * (1 - level))), 1)
+    worst = np.partition(returns, tail - 1)[:tail]
+    return -float(worst.mean())
+
+
+def max_drawdowns(paths):
+    '''
+    Largest peak-to-trough fall of wealth along each row of daily ``paths``.
+    '''
+    wealth = np.cumprod(1 + paths, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=1)
+    return (1 - wealth / peaks).max(axis=1)
+
+
+class ScenarioGenerator(object):
+    '''
+    Correlated normal daily return scenarios for one covariance.
+
+    :param cov: daily return covariance (array or
+                :class:`support.covariance.CovarianceModel`)
+    :param mean_returns: mean daily returns, zero if omitted
+    :param seed: seed of the random generator, for repeatable results
+    '''
+
+    def __init__(self, cov, mean_returns=None, seed=None, chunk_elements=CHUNK_ELEMENTS):
+        self.factor = covariance_factor(cov)
+        self.num_assets = len(self.factor)
+        self.mean_returns = (np.zeros(self.num_assets) if mean_returns is None
+                             else np.asarray(mean_returns, dtype=float))
+        self.rng = np.random.default_rng(seed)
+        self.chunk_rows = max(chunk_elements // max(self.factor.shape[1], 1), 1)
+
+    def _chunk_sizes(self, rows):
+        while rows > 0:
+            size = min(rows, self.chunk_rows)
+            yield size
+            rows -= size
+
+    def asset_returns(self, num_scenarios):
+        '''
+        ``num_scenarios x assets`` array of scenarios, for when the weights
+        are not fixed yet (see :func:`min_cvar_weights`).
+        '''
+        out = np.empty((num_scenarios, self.num_assets))
+        row = 0
+        for size in self._chunk_sizes(num_scenarios):
+            draws = self.rng.standard_normal((size, self.factor.shape[1]))
+            np.matmul(draws, self.factor.T, out=out[row:row + size])
+            row += size
+        out += self.mean_returns
+        return out
+
+    def portfolio_returns(self, weights, num_scenarios, horizon=1):
+        '''
+        Simulated ``horizon``-day returns of the portfolio ``weights``, as the
+        sum of independent daily returns.
+        '''
+        weights = np.asarray(weights, dtype=float)
+        loading = self.factor.T @ weights * np.sqrt(horizon)
+        out = np.empty(num_scenarios)
+        row = 0
+        for size in self._chunk_sizes(num_scenarios):
+            out[row:row + size] = self.rng.standard_normal((size, len(loading))) @ loading
+            row += size
+        out += (self.mean_returns @ weights) * horizon
+        return out
+
+    def portfolio_paths(self, weights, num_paths, horizon):
+        '''
+        Yield chunks of ``paths x horizon`` daily portfolio returns.
+        '''
+        weights = np.asarray(weights, dtype=float)
+        loading = self.factor.T @ weights
+        mean = self.mean_returns @ weights
+        paths_per_chunk = max(self.chunk_rows // horizon, 1)
+        remaining = num_paths
+        while remaining > 0:
+            size = min(remaining, paths_per_chunk)
+            draws = self.rng.standard_normal((size * horizon, len(loading)))
+            yield (draws @ loading + mean).reshape(size, horizon)
+            remaining -= size
+
+
+class RiskReport(object):
+    '''
+    Simulated risk of one portfolio.
+
+    :ivar level: confidence level of ``var`` and ``cvar``
+    :ivar horizon: days the VaR and CVaR losses are measured over
+    :ivar returns: simulated ``horizon``-day portfolio returns
+    :ivar var: value at risk, a positive fraction of the portfolio value
+    :ivar cvar: conditional value at risk (mean loss beyond ``var``)
+    :ivar drawdowns: maximum drawdown of each simulated path
+    :ivar drawdown_horizon: length of those paths in days
+    '''
+
+    def __init__(self, returns, level, horizon, drawdowns, drawdown_horizon):
+        self.returns = returns
+        self.level = level
+        self.horizon = horizon
+        self.var = value_at_risk(returns, level)
+        self.cvar = conditional_value_at_risk(returns, level)
+        self.drawdowns = drawdowns
+        self.drawdown_horizon = drawdown_horizon
+
+    @property
+    def scenarios(self):
+        return len(self.returns)
+
+    def drawdown_quantiles(self, quantiles=(0.5, 0.9, 0.95, 0.99)):
+        return pd.Series(np.quantile(self.drawdowns, quantiles), index=list(quantiles), name='max_drawdown')
+
+    def summary(self):
+        return '%d-day VaR %.2f%%, CVaR %.2f%% at %g%% over %d scenarios; median %d-day drawdown %.2f%%' % (
+            self.horizon, 100 * self.var, 100 * self.cvar, 100 * self.level, self.scenarios,
+            self.drawdown_horizon, 100 * float(np.median(self.drawdowns)))
+
+    def to_frame(self):
+        '''
+        The headline numbers and drawdown quantiles, one per row.
+        '''
+        rows = [('VaR %g%% (%dd)' % (100 * self.level, self.horizon), self.var),
+                ('CVaR %g%% (%dd)' % (100 * self.level, self.horizon), self.cvar)]
+        rows += [('drawdown q%g (%dd)' % (100 * q, self.drawdown_horizon), value)
+                 for q, value in self.drawdown_quantiles().items()]
+        return pd.DataFrame({'value': [value for _, value in rows]}, index=[name for name, _ in rows])
+
+
+def simulate_risk(cov, weights, mean_returns=None, scenarios=DEFAULT_SCENARIOS, level=DEFAULT_LEVEL, horizon=1,
+                  drawdown_paths=DRAWDOWN_PATHS, drawdown_horizon=TRADING_DAYS, seed=None):
+    '''
+    Monte Carlo VaR, CVaR and drawdowns of the portfolio ``weights``.
+
+    :param scenarios: number of simulated ``horizon``-day returns
+    :param level: confidence level, e.g. 0.95 or 0.99
+    :param drawdown_paths: number of simulated paths of ``drawdown_horizon`` days
+    :rtype: RiskReport
+    '''
+    generator = ScenarioGenerator(cov, mean_returns, seed=seed)
+    returns = generator.portfolio_returns(weights, scenarios, horizon)
+    drawdowns = np.concatenate([max_drawdowns(paths)
+                                for paths in generator.portfolio_paths(weights, drawdown_paths, drawdown_horizon)])
+    return RiskReport(returns, level, horizon, drawdowns, drawdown_horizon)
+
+
+def min_cvar_weights(cov, mean_returns=None, level=DEFAULT_LEVEL, scenarios=CVAR_SCENARIOS, seed=0,
+                     scenario_returns=None):
+    '''
+    Long-only weights minimising the daily CVaR of simulated scenarios, by
+    the Rockafellar-Uryasev linear program
+
+        minimise   a + sum(u) / ((1 - level) S)
+        subject to u_s >= -r_s' w - a,  u >= 0,  sum(w) = 1,  w >= 0
+
+    solved with HiGHS on a sparse constraint matrix.
+
+    :param scenario_returns: ``S x assets`` returns to use instead of drawing
+                             ``scenarios`` from ``cov`` (e.g. historical returns)
+    :return: ``scipy.optimize.OptimizeResult`` like
+             :func:`support.optimizer.min_risk_weights`, with ``method``
+             ``'cvar'``, the annualised standard deviation in ``fun`` and the
+             CVaR in ``cvar``
+    '''
+    from support.optimizer import make_risk_function
+
+    if scenario_returns is None:
+        scenario_returns = ScenarioGenerator(cov, mean_returns, seed=seed).asset_returns(scenarios)
+    num_scenarios, num_assets = scenario_returns.shape
+
+    # variables: w (assets), a, u (scenarios)
+    costs = np.r_[np.zeros(num_assets), 1.0, np.full(num_scenarios, 1 / ((1 - level) * num_scenarios))]
+    # -R w - a - u <= 0
+    a_ub = sparse.hstack([sparse.csr_matrix(-scenario_returns), sparse.csr_matrix(-np.ones((num_scenarios, 1))),
+                          -sparse.identity(num_scenarios, format='csr')], format='csr')
+    b_ub = np.zeros(num_scenarios)
+    a_eq = sparse.csr_matrix(np.r_[np.ones(num_assets), 0.0, np.zeros(num_scenarios)])
+    bounds = [(0, 1)] * num_assets + [(None, None)] + [(0, None)] * num_scenarios
+
+    solved = linprog(costs, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=[1.0], bounds=bounds, method='highs')
+    if not solved.success:
+        raise ValueError('CVaR optimisation failed: %s' % solved.message)
+    weights = np.clip(solved.x[:num_assets], 0, None)
+    weights /= weights.sum()
+    risk = make_risk_function(cov)(weights)[0]
+    return OptimizeResult(x=weights, fun=risk, cvar=float(solved.fun), success=True, status=0,
+                          nit=int(solved.get('nit', 0)), message=solved.message, method='cvar')
@@ -0,0 +1,347 @@
+'''
+Local optimisation service shared by several windows or scripts.
+
+The service wraps :func:`support.engine.optimize` behind a small JSON over
+HTTP API built on the standard library. Results are memoised on a hash of
+the canonical request (sorted tickers, dates, solver, estimator and
+alignment). An answer for a range reaching the day it was computed on is
+only kept for ``fresh_for`` seconds, the price cache's staleness, since
+those days' prices are provisional. Identical requests arriving while one
+is being computed wait for that computation instead of starting their own.
+Run from the
+repository root:
+
+    python -m support.optimizeService --port 8765 --cache-dir cache
+
+and point the window at it with Analysis > Optimisation Service, or set
+``STOCK_RISK_SERVICE=http://127.0.0.1:8765`` before starting it.
+
+``POST /optimize`` takes ``{"tickers": [...], "start": "YYYY-MM-DD", "end":
+"YYYY-MM-DD"}`` plus optional ``method``, ``estimator`` and ``alignment``,
+and answers with the labels, weights and risk figures. ``GET /health``
+reports the memo and in-flight counts.
+'''
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from support.alignment import ALIGNMENTS, COMMON
+from support.covariance import ESTIMATORS
+from support.engine import METHODS, optimize
+from support.priceCache import DEFAULT_STALE_AFTER
+from support.priceData import FetchFailed, get_close
+from support.resultStore import weights_frame
+
+DEFAULT_PORT = 8765
+MEMO_SIZE = 256
+SERVICE_ENV = 'STOCK_RISK_SERVICE'  # URL of the service the window should use
+CLIENT_TIMEOUT = 300
+
+
+class ServiceError(Exception):
+    '''
+    A request the service could not answer; ``status`` is the HTTP status.
+    '''
+
+    def __init__(self, message, status=400):
+        super(ServiceError, self).__init__(message)
+        self.status = status
+
+
+def canonical_request(tickers, start, end, method='qp', estimator='sample', alignment=COMMON):
+    '''
+    Normalised form of a request: tickers upper-cased, de-duplicated and
+    sorted, dates as ISO strings. Raises :class:`ServiceError` on bad input.
+    '''
+    if not tickers or isinstance(tickers, str):
+        raise ServiceError('tickers must be a non-empty list of exchange codes')
+    if method not in METHODS:
+        raise ServiceError('unknown method %r, expected one of %s' % (method, ', '.join(METHODS)))
+    if estimator not in ESTIMATORS:
+        raise ServiceError('unknown estimator %r, expected one of %s' % (estimator, ', '.join(ESTIMATORS)))
+    if alignment not in ALIGNMENTS:
+        raise ServiceError('unknown alignment %r, expected one of %s' % (alignment, ', '.join(ALIGNMENTS)))
+    try:
+        start, end = pd.Timestamp(start).date().isoformat(), pd.Timestamp(end).date().isoformat()
+    except (TypeError, ValueError):
+        raise ServiceError('dates must be YYYY-MM-DD')
+    return {
+        'tickers': sorted({str(ticker).strip().upper() for ticker in tickers}),
+        'start': start,
+        'end': end,
+        'method': method,
+        'estimator': estimator,
+        'alignment': alignment,
+    }
+
+
+def request_key(request):
+    '''
+    Hash identifying a canonical request, see :func:`canonical_request`.
+    '''
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class OptimizationService(object):
+    '''
+    Memoising, coalescing front of :func:`support.engine.optimize`; the
+    HTTP layer is :func:`make_server`.
+
+    :param fetch: price source shared by every request, usually
+                  ``PriceCache(...).get``
+    :param memo_size: number of answers kept, least recently used first out;
+                      0 disables memoisation but keeps coalescing
+    :param fresh_for: seconds an answer whose ``end`` is on or after the day
+                      it was computed stays memoised, as long as the price
+                      cache trusts that day's rows
+    :param now: clock returning epoch seconds, replaceable in tests
+    '''
+
+    def __init__(self, fetch=get_close, memo_size=MEMO_SIZE, fresh_for=DEFAULT_STALE_AFTER, now=time.time):
+        self.fetch = fetch
+        self.memo_size = memo_size
+        self.fresh_for = fresh_for
+        self.now = now
+        self._memo = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def optimize(self, tickers, start, end, method='qp', estimator='sample', alignment=COMMON):
+        '''
+        Answer for one basket as a JSON-ready dict, with ``source`` telling
+        whether it was ``computed``, served from the ``memo`` or shared with
+        an identical request in flight (``coalesced``).
+        '''
+        request = canonical_request(tickers, start, end, method, estimator, alignment)
+        key = request_key(request)
+        with self._lock:
+            if key in self._memo:
+                answer, expires = self._memo[key]
+                if expires is None or self.now() < expires:
+                    self._memo.move_to_end(key)
+                    self.hits += 1
+                    return dict(answer, source='memo')
+                del self._memo[key]  # computed on provisional prices that may have changed since
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return dict(future.result(), source='coalesced')
+
+        try:
+            computed_at = self.now()
+            answer = self._compute(key, request)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(answer)
+            with self._lock:
+                if self.memo_size > 0:
+                    self._memo[key] = answer, self._expiry(request, computed_at)
+                    while len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+            return dict(answer, source='computed')
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _expiry(self, request, computed_at):
+        '''
+        When a memoised answer must be computed again: never for a range that
+        ended before the day it was computed on, ``fresh_for`` later otherwise.
+        '''
+        if pd.Timestamp(request['end']) < pd.Timestamp(computed_at, unit='s').normalize():
+            return None
+        return computed_at + self.fresh_for
+
+    def _compute(self, key, request):
+        started = time.perf_counter()
+        try:
+            result = optimize(request['tickers'], request['start'], request['end'], fetch=self.fetch,
+                              method=request['method'], estimator=request['estimator'],
+                              alignment=request['alignment'])
+        except FetchFailed as e:
+            raise ServiceError(str(e), status=502)
+        except ValueError as e:
+            raise ServiceError(str(e), status=422)
+        return {
+            'key': key,
+            'request': request,
+            'labels': list(result.weights.index),
+            'weights': [float(weight) for weight in result.weights.values],
+            'risk': result.risk,
+            'expected_return': result.expected_return,
+            'equal_weight_risk': result.equal_weight_risk,
+            'stopped': result.stopped,
+            'dropped_dates': result.data.dropped_dates,
+            'seconds': time.perf_counter() - started,
+        }
+
+    def health(self):
+        with self._lock:
+            return {'status': 'ok', 'memo': len(self._memo), 'in_flight': len(self._in_flight),
+                    'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None  # set by make_server
+    quiet = False
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, self.service.health())
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/optimize':
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError('expected a JSON object')
+            answer = self.service.optimize(body.get('tickers'), body.get('start'), body.get('end'),
+                                           method=body.get('method', 'qp'),
+                                           estimator=body.get('estimator', 'sample'),
+                                           alignment=body.get('alignment', COMMON))
+        except ServiceError as e:
+            self._reply(e.status, {'error': str(e)})
+        except ValueError as e:
+            self._reply(400, {'error': 'bad request: %s' % e})
+        except Exception as e:
+            self._reply(500, {'error': '%s: %s' % (type(e).__name__, e)})
+        else:
+            self._reply(200, answer)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super(_Handler, self).log_message(format, *args)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT, quiet=False):
+    '''
+    Threading HTTP server for ``service``; port 0 picks a free port, see
+    ``server.server_address``. Call ``serve_forever()`` to run it.
+    '''
+    handler = type('Handler', (_Handler,), {'service': service, 'quiet': quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class RemoteResult(object):
+    '''
+    Answer of the service, shaped like :class:`support.engine.OptimizationResult`
+    for the results table. Prices stay on the service.
+
+    :ivar source: ``'computed'``, ``'memo'`` or ``'coalesced'``
+    '''
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.weights = pd.Series(answer['weights'], index=answer['labels'], name='weights')
+        self.risk = answer['risk']
+        self.expected_return = answer['expected_return']
+        self.equal_weight_risk = answer['equal_weight_risk']
+        self.stopped = answer['stopped']
+        self.dropped_dates = answer['dropped_dates']
+        self.source = answer['source']
+
+    def weights_frame(self):
+        return weights_frame(self.weights)
+
+
+class ServiceClient(object):
+    '''
+    Client of a running service.
+
+    :param url: e.g. ``http://127.0.0.1:8765``
+    '''
+
+    def __init__(self, url, timeout=CLIENT_TIMEOUT):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _call(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read())['error']
+            except (ValueError, KeyError):
+                message = str(e)
+            raise ServiceError(message, status=e.code)
+
+    def optimize(self, tickers, start, end, method='qp', estimator='sample', alignment=COMMON):
+        '''
+        :rtype: RemoteResult
+        '''
+        return RemoteResult(self._call('/optimize', {
+            'tickers': list(tickers), 'start': str(start), 'end': str(end),
+            'method': method, 'estimator': estimator, 'alignment': alignment}))
+
+    def health(self):
+        return self._call('/health')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve minimum risk weights to local clients.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-dir', default='cache', help='price cache directory')
+    parser.add_argument('--memo-size', type=int, default=MEMO_SIZE, help='answers kept in memory')
+    args = parser.parse_args(argv)
+
+    from support.priceCache import PriceCache
+
+    cache = PriceCache(args.cache_dir)
+    service = OptimizationService(fetch=cache.get, memo_size=args.memo_size, fresh_for=cache.stale_after)
+    server = make_server(service, args.host, args.port)
+    print('serving on http://%s:%d' % server.server_address[:2], file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import threading
+import time
+import warnings
+from collections import namedtuple
+
+import numpy as np
+from scipy.optimize import OptimizeResult, approx_fprime, minimize
+
+from support import instrumentation
+from support.covariance import CovarianceModel
+from support.priceData import TRADING_DAYS
+
+GRADIENT_TOLERANCE = 1e-5
+QP_TOLERANCE = 1e-12
+QP_MAX_ITER = 1000
+PROGRESS_INTERVAL = 0.1  # seconds between progress reports
+
+
+SolveProgress = namedtuple('SolveProgress', ['iteration', 'objective', 'violation', 'elapsed'])
+
+
+class SolveStopped(Exception):
+    '''
+    Raised inside a backend by :meth:`SolveMonitor.update` to end the solve.
+    '''
+
+
+class SolveMonitor(object):
+    '''
+    Watches a running solve: reports its progress, lets another thread cancel
+    it and stops it once a wall-clock budget is spent. Whatever stops the
+    solve, the best feasible weights seen so far are returned.
+
+    :param callback: called with a :class:`SolveProgress` at most every
+                     ``interval`` seconds (and once at the end); runs on the
+                     solving thread
+    :param time_budget: seconds the solve may take, unlimited if None
+    :param now: clock returning seconds, replaceable in tests
+    '''
+
+    def __init__(self, callback=None, time_budget=None, interval=PROGRESS_INTERVAL, now=time.perf_counter):
+        self.callback = callback
+        self.time_budget = time_budget
+        self.interval = interval
+        self.now = now
+        self._cancelled = threading.Event()
+        self.start()
+
+    def start(self):
+        '''
+        Restart the clock and forget the best weights, before a new solve.
+        '''
+        self.started = self.now()
+        self.best_weights = None
+        self.best_objective = np.inf
+        self.iterations = 0
+        self.stop_reason = None
+        self._last_report = None
+
+    def cancel(self):
+        '''
+        Ask the solve to stop at its next iteration; safe from any thread.
+        '''
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self):
+        return self.now() - self.started
+
+    def update(self, iteration, weights, objective, violation=0.0):
+        '''
+        Record one iteration.
+
+        :param weights: feasible weights reached at this iteration
+        :param objective: their annualised risk
+        :param violation: constraint violation of the backend's own iterate,
+                          reported only
+        :raises SolveStopped: when cancelled or out of time
+        '''
+        self.iterations = iteration
+        if objective < self.best_objective:
+            self.best_weights = np.array(weights, dtype=float)
+            self.best_objective = objective
+        self._report(SolveProgress(iteration, float(objective), float(violation), self.elapsed), force=False)
+
+        if self.cancelled:
+            self.stop_reason = 'cancelled'
+        elif self.time_budget is not None and self.elapsed > self.time_budget:
+            self.stop_reason = 'time budget of %gs spent' % self.time_budget
+        if self.stop_reason:
+            raise SolveStopped(self.stop_reason)
+
+    def finish(self, results):
+        self._report(SolveProgress(self.iterations, float(results['fun']), 0.0, self.elapsed), force=True)
+
+    def _report(self, progress, force):
+        if self.callback is None:
+            return
+        now = self.now()
+        if force or self._last_report is None or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.callback(progress)
+
+
+def make_risk_function(cov):
+    '''
+    Objective for ``minimize(..., jac=True)``: returns the annualised
+    portfolio standard deviation and its gradient in one call.
+
+    With sigma = sqrt(w' S w) the gradient is S w / sigma, scaled by
+    sqrt(TRADING_DAYS) like the risk itself. ``cov`` may be an array or a
+    :class:`support.covariance.CovarianceModel`; a factor model then costs
+    O(N k) per call.
+    '''
+    if isinstance(cov, CovarianceModel):
+        cov_dot = cov.dot
+    else:
+        cov = np.ascontiguousarray(cov, dtype=float)
+        cov_dot = cov.dot
+    annualise = np.sqrt(TRADING_DAYS)
+
+    def risk_and_gradient(weights):
+        w = np.asarray(weights, dtype=float)
+        cov_w = cov_dot(w)
+        var_p = w @ cov_w  # variance of the multi-asset portfolio
+        if var_p <= 0:
+            return 0.0, np.zeros_like(w)
+        sd_p = np.sqrt(var_p)
+        return sd_p * annualise, cov_w * (annualise / sd_p)
+
+    return risk_and_gradient
+
+
+def sum_to_one_constraint(num_stocks):
+    '''
+    Equality constraint that the weights of all assets add up to 1, with its
+    constant Jacobian.
+    '''
+    ones = np.ones(num_stocks)
+    return {'type': 'eq',
+            'fun': lambda x: np.sum(x) - 1,
+            'jac': lambda x: ones}
+
+
+def gradient_error(cov, weights, epsilon=1e-8):
+    '''
+    Largest absolute difference between the analytic gradient and a forward
+    difference estimate at ``weights``.
+    '''
+    risk_and_gradient = make_risk_function(cov)
+    weights = np.asarray(weights, dtype=float)
+    analytic = risk_and_gradient(weights)[1]
+    numeric = approx_fprime(weights, lambda w: risk_and_gradient(w)[0], epsilon)
+    return float(np.max(np.abs(analytic - numeric)))
+
+
+def slsqp_weights(cov, x0=None, monitor=None):
+    '''
+    General purpose backend: SLSQP on the annualised risk with the analytic
+    gradient.
+    '''
+    num_stocks = len(cov)
+    if x0 is None:
+        x0 = np.full(num_stocks, 1 / num_stocks)  # initialise weights (x0)
+
+    # Constraint that weights in any asset j must be between 0 and 1 inclusive
+    bounds = tuple((0, 1) for i in range(num_stocks))
+    risk_and_gradient = make_risk_function(cov)
+
+    callback = None
+    if monitor is not None:
+        iteration = [0]
+
+        def report(xk):
+            iteration[0] += 1
+            violation = abs(np.sum(xk) - 1) + np.sum(np.clip(-xk, 0, None))
+            weights = _project(xk)
+            monitor.update(iteration[0], weights, risk_and_gradient(weights)[0], violation)
+
+        callback = report
+
+    try:
+        results = minimize(fun=risk_and_gradient, x0=x0, jac=True, method='SLSQP',
+                           bounds=bounds, constraints=sum_to_one_constraint(num_stocks), callback=callback)
+    except SolveStopped as e:
+        return _stopped_result(cov, monitor, x0, str(e), 'slsqp')
+    results['method'] = 'slsqp'
+    return results
+
+
+def _equality_qp(cov, free):
+    '''
+    Minimum variance weights over the ``free`` assets with only the budget
+    constraint: S^-1 1 / 1' S^-1 1. Returns None when the block is singular.
+    '''
+    sub_cov = cov[np.ix_(free, free)]
+    try:
+        z = np.linalg.solve(sub_cov, np.ones(len(free)))
+    except np.linalg.LinAlgError:
+        return None
+    total = z.sum()
+    if not np.isfinite(total) or abs(total) < QP_TOLERANCE:
+        return None
+    return z / total
+
+
+def _guess_support(cov):
+    '''
+    Feasible starting point for the active-set method: repeatedly solve the
+    budget-only problem and drop every asset with a negative weight at once.
+    This usually lands on (or next to) the optimal set of held assets.
+    '''
+    free = np.arange(len(cov))
+    while len(free):
+        y_free = _equality_qp(cov, free)
+        if y_free is None:
+            break
+        if y_free.min() >= 0:
+            x = np.zeros(len(cov))
+            x[free] = y_free
+            return x
+        free = free[y_free > 0]
+    return np.ones(len(cov))
+
+
+def qp_weights(cov, x0=None, monitor=None):
+    '''
+    Dedicated backend for the long-only minimum variance quadratic program
+
+        minimise w' S w  subject to  sum(w) = 1, w >= 0
+
+    (w <= 1 follows from the other two). The unconstrained closed form
+    S^-1 1 / 1' S^-1 1 is tried first; if it has negative weights a primal
+    active-set method walks from ``x0`` (by default a guess of the optimal
+    support, see :func:`_guess_support`) towards the optimum, pinning assets at
+    zero when they block the step and releasing them when their Lagrange
+    multiplier turns negative.
+
+    Returns None if a free block is singular, so the caller can fall back.
+    Every iterate is feasible, so a ``monitor`` can stop the walk at any point.
+    '''
+    cov = cov.matrix if isinstance(cov, CovarianceModel) else np.asarray(cov, dtype=float)
+    num_stocks = len(cov)
+    all_assets = np.arange(num_stocks)
+
+    closed_form = _equality_qp(cov, all_assets)
+    if closed_form is not None and closed_form.min() >= 0:
+        return _qp_result(cov, closed_form, 0, 'closed form')
+
+    if x0 is None:
+        x0 = _guess_support(cov) if closed_form is not None else np.ones(num_stocks)
+    x = _project(x0)
+    pinned = x <= 0  # assets held at the zero bound
+
+    for nit in range(1, QP_MAX_ITER + 1):
+        if monitor is not None:
+            try:
+                monitor.update(nit, x, np.sqrt(max(x @ cov @ x, 0) * TRADING_DAYS))
+            except SolveStopped as e:
+                return _stopped_result(cov, monitor, x0, str(e), 'qp')
+        free = all_assets[~pinned]
+        y_free = _equality_qp(cov, free)
+        if y_free is None:
+            return None
+        y = np.zeros(num_stocks)
+        y[free] = y_free
+        step = y - x
+
+        if np.max(np.abs(step)) <= 1e-10:
+            # Optimal on this working set: check the multipliers of pinned assets
+            grad = 2 * cov @ x
+            budget = grad[free].mean()
+            multipliers = np.where(pinned, grad - budget, np.inf)
+            release = int(np.argmin(multipliers))
+            if multipliers[release] >= -1e-12:
+                return _qp_result(cov, x, nit, 'active set')
+            pinned[release] = False
+            continue
+
+        # Longest step towards y that keeps every free weight non-negative
+        shrinking = (~pinned) & (step < 0)
+        ratios = np.full(num_stocks, np.inf)
+        ratios[shrinking] = -x[shrinking] / step[shrinking]
+        blocking = int(np.argmin(ratios))
+        alpha = min(1.0, ratios[blocking])
+        x = x + alpha * step
+        if alpha < 1.0:
+            x[blocking] = 0.0
+            pinned[blocking] = True
+        x = np.clip(x, 0, None)
+
+    return None
+
+
+def _qp_result(cov, weights, nit, message):
+    risk = make_risk_function(cov)(weights)[0]
+    return OptimizeResult(x=weights, fun=risk, success=True, status=0, nit=nit,
+                          message=message, method='qp')
+
+
+def _project(weights):
+    '''
+    Clip ``weights`` at zero and rescale them to sum to one.
+    '''
+    weights = np.clip(np.asarray(weights, dtype=float), 0, None)
+    total = weights.sum()
+    return weights / total if total > 0 else np.full(len(weights), 1 / len(weights))
+
+
+def _stopped_result(cov, monitor, x0, reason, method):
+    weights = monitor.best_weights if monitor.best_weights is not None else _project(x0)
+    risk = make_risk_function(cov)(weights)[0]
+    return OptimizeResult(x=weights, fun=risk, success=False, status=-1, nit=monitor.iterations,
+                          message='stopped: ' + reason, method=method)
+
+
+SOLVERS = {
+    'qp': qp_weights,
+    'slsqp': slsqp_weights,
+}
+
+
+def min_risk_weights(cov, x0=None, check_gradient=False, method='qp', monitor=None):
+    '''
+    Long-only weights minimising annualised portfolio risk.
+
+    :param cov: daily return covariance matrix or
+                :class:`support.covariance.CovarianceModel`
+    :param x0: starting weights; equal weights by default for SLSQP, the
+               clipped closed form for the QP backend
+    :param check_gradient: compare the analytic gradient with finite
+                           differences at ``x0`` first and warn on a mismatch;
+                           the error is kept on the result as ``gradient_error``
+    :param method: backend from ``SOLVERS``; when ``'qp'`` cannot solve the
+                   problem (singular covariance) SLSQP is used instead
+    :param monitor: :class:`SolveMonitor` for progress, cancellation and a
+                    time budget; a stopped solve has ``success`` False, the
+                    reason in ``message`` and the best weights found in ``x``
+    :return: ``scipy.optimize.OptimizeResult`` with the backend in ``method``
+    '''
+    if not isinstance(cov, CovarianceModel):
+        cov = np.asarray(cov, dtype=float)
+    num_stocks = len(cov)
+    init_weights = np.full(num_stocks, 1 / num_stocks)  # initialise weights (x0)
+
+    grad_error = None
+    if check_gradient:
+        grad_error = gradient_error(cov, init_weights if x0 is None else x0)
+        if grad_error > GRADIENT_TOLERANCE:
+            warnings.warn('analytic gradient differs from finite differences by %g' % grad_error)
+
+    try:
+        solver = SOLVERS[method]
+    except KeyError:
+        raise ValueError('unknown solver %r, expected one of %s' % (method, ', '.join(SOLVERS)))
+
+    if monitor is not None:
+        monitor.start()
+    with instrumentation.stage('optimize'):
+        results = solver(cov, x0, monitor=monitor)
+        if results is None:
+            results = slsqp_weights(cov, init_weights if x0 is None else x0, monitor=monitor)
+    instrumentation.count('solver_iterations', int(results.get('nit', 0)))
+    if 'nfev' in results:
+        instrumentation.count('objective_evaluations', int(results['nfev']))
+    if monitor is not None:
+        monitor.finish(results)
+    results['gradient_error'] = grad_error
+    return results
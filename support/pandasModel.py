@@ -1,27 +1,63 @@
+from collections import OrderedDict
+
 from PyQt5 import QtCore
 
+import numpy as np
 import pandas as pd
 
+FETCH_BATCH = 1000  # rows handed to the view per fetchMore
+CELL_CACHE_SIZE = 8192  # formatted cells kept for repaints
+
 class PandasModel(QtCore.QAbstractTableModel):
+    '''
+    Table model over a DataFrame for large results.
+
+    Column values and header labels are pulled out of the frame once; cells
+    and row labels are formatted only when painted, with an LRU of rendered strings. Rows
+    are handed to the view in batches via canFetchMore/fetchMore, and
+    sorting permutes a row order array instead of reordering the frame, so
+    the index labels (tickers) stay attached to their rows.
+    '''
+
     def __init__(self, df = pd.DataFrame(), parent=None):
         QtCore.QAbstractTableModel.__init__(self, parent=parent)
         self._df = df
+        self._columns = [df.iloc[:, col].to_numpy() for col in range(len(df.columns))]
+        self._column_labels = [str(label) for label in df.columns]
+        self._index = df.index
+        self._index_labels = {}
+        self._order = np.arange(len(df.index))
+        self._loaded = min(len(df.index), FETCH_BATCH)
+        self._cells = OrderedDict()
+
+    def _cell_text(self, row, col):
+        key = (row, col)
+        text = self._cells.get(key)
+        if text is None:
+            text = str(self._columns[col][self._order[row]])
+            self._cells[key] = text
+            if len(self._cells) > CELL_CACHE_SIZE:
+                self._cells.popitem(last=False)
+        else:
+            self._cells.move_to_end(key)
+        return text
 
     def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
         if role != QtCore.Qt.DisplayRole:
             return QtCore.QVariant()
 
         if orientation == QtCore.Qt.Horizontal:
-            try:
-                return self._df.columns.tolist()[section]
-            except (IndexError, ):
-                return QtCore.QVariant()
+            if 0 <= section < len(self._column_labels):
+                return self._column_labels[section]
+            return QtCore.QVariant()
         elif orientation == QtCore.Qt.Vertical:
-            try:
-                # return self.df.index.tolist()
-                return self._df.index.tolist()[section]
-            except (IndexError, ):
-                return QtCore.QVariant()
+            if 0 <= section < self._loaded:
+                row = self._order[section]
+                label = self._index_labels.get(row)
+                if label is None:
+                    label = self._index_labels[row] = str(self._index[row])
+                return label
+            return QtCore.QVariant()
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if role != QtCore.Qt.DisplayRole:
@@ -30,31 +66,50 @@ class PandasModel(QtCore.QAbstractTableModel):
         if not index.isValid():
             return QtCore.QVariant()
 
-        return QtCore.QVariant(str(self._df.iloc[index.row(), index.column()]))
+        return self._cell_text(index.row(), index.column())
 
     def setData(self, index, value, role):
-        row = self._df.index[index.row()]
-        col = self._df.columns[index.column()]
+        row = self._order[index.row()]
+        col = index.column()
         if hasattr(value, 'toPyObject'):
             # PyQt4 gets a QVariant
             value = value.toPyObject()
         else:
             # PySide gets an unicode
-            dtype = self._df[col].dtype
+            dtype = self._df.dtypes.iloc[col]
             if dtype != object:
                 value = None if value == '' else dtype.type(value)
-        self._df.set_value(row, col, value)
+        self._df.iat[row, col] = value
+        self._columns[col] = self._df.iloc[:, col].to_numpy()
+        self._cells.pop((index.row(), col), None)
+        self.dataChanged.emit(index, index)
         return True
 
     def rowCount(self, parent=QtCore.QModelIndex()):
-        return len(self._df.index)
+        return 0 if parent.isValid() else self._loaded
 
     def columnCount(self, parent=QtCore.QModelIndex()):
-        return len(self._df.columns)
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._order)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        more = min(FETCH_BATCH, len(self._order) - self._loaded)
+        if more <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._loaded, self._loaded + more - 1)
+        self._loaded += more
+        self.endInsertRows()
 
     def sort(self, column, order):
-        colname = self._df.columns.tolist()[column]
+        if not 0 <= column < len(self._columns):
+            return
         self.layoutAboutToBeChanged.emit()
-        self._df.sort_values(colname, ascending= order == QtCore.Qt.AscendingOrder, inplace=True)
-        self._df.reset_index(inplace=True, drop=True)
-        self.layoutChanged.emit()
\ No newline at end of file
+        values = pd.Series(self._columns[column])
+        self._order = values.sort_values(ascending=order == QtCore.Qt.AscendingOrder,
+                                         kind='stable').index.to_numpy()
+        self._cells.clear()
+        self.layoutChanged.emit()
@@ -0,0 +1,106 @@
+'''
+Risk, return and Sharpe ratio of many portfolios at once.
+
+A ``K x N`` weight matrix is scored in chunks of at most ``CHUNK_ELEMENTS``
+weights: per chunk the variances are ``rowsum((W S) * W)``, the diagonal of
+``W S W'`` without forming the ``K x K`` product. A million random
+portfolios of a hundred stocks therefore need one chunk of ``W S`` on top
+of the weights and the ``K`` results.
+'''
+import numpy as np
+import pandas as pd
+
+from support.covariance import CovarianceModel, FactorCovariance
+from support.priceData import TRADING_DAYS
+
+CHUNK_ELEMENTS = 4 * 1024 * 1024  # weights scored at once (32 MB of float64 for W S)
+
+
+def _chunks(num_rows, num_cols, chunk_elements):
+    step = max(chunk_elements // max(num_cols, 1), 1)
+    for start in range(0, num_rows, step):
+        yield slice(start, min(start + step, num_rows))
+
+
+def portfolio_variances(cov, weights, chunk_elements=CHUNK_ELEMENTS):
+    '''
+    Daily variance ``w' S w`` of every row of ``weights``.
+
+    :param cov: daily return covariance (array or
+                :class:`support.covariance.CovarianceModel`); a factor model
+                is used in its low-rank form, O(K N k)
+    :param weights: ``K x N`` weights, or one vector of ``N``
+    '''
+    weights = np.asarray(weights, dtype=float)
+    single = weights.ndim == 1
+    weights = np.atleast_2d(weights)
+    out = np.empty(len(weights))
+
+    if isinstance(cov, FactorCovariance):
+        for rows in _chunks(len(weights), cov.loadings.shape[1] + 1, chunk_elements):
+            exposure = weights[rows] @ cov.loadings
+            # specific part as one contraction: no rows x N temporary for the squared weights
+            out[rows] = (np.einsum('ij,ij->i', exposure, exposure)
+                         + np.einsum('ij,ij,j->i', weights[rows], weights[rows], cov.specific))
+    else:
+        matrix = cov.matrix if isinstance(cov, CovarianceModel) else np.asarray(cov, dtype=float)
+        for rows in _chunks(len(weights), weights.shape[1], chunk_elements):
+            out[rows] = np.einsum('ij,ij->i', weights[rows] @ matrix, weights[rows])
+    np.maximum(out, 0, out=out)  # rounding can leave tiny negatives
+    return out[0] if single else out
+
+
+def portfolio_risks(cov, weights, chunk_elements=CHUNK_ELEMENTS):
+    '''
+    Annualised standard deviation of every row of ``weights``, as
+    :func:`support.priceData.make_risk_objective` computes for one.
+    '''
+    return np.sqrt(portfolio_variances(cov, weights, chunk_elements) * TRADING_DAYS)
+
+
+class PortfolioScores(object):
+    '''
+    Scores of ``K`` portfolios.
+
+    :ivar risks: annualised standard deviations
+    :ivar returns: annualised expected returns, ``(1 + w' mu) ** 250 - 1``
+    :ivar sharpe: annualised Sharpe ratios against ``risk_free``
+    '''
+
+    def __init__(self, risks, returns, sharpe):
+        self.risks = risks
+        self.returns = returns
+        self.sharpe = sharpe
+
+    def __len__(self):
+        return len(self.risks)
+
+    def to_frame(self, index=None):
+        return pd.DataFrame({'risk': self.risks, 'expected_return': self.returns, 'sharpe': self.sharpe},
+                            index=index)
+
+
+def score_portfolios(cov, mean_returns, weights, risk_free=0.0, chunk_elements=CHUNK_ELEMENTS):
+    '''
+    Risk, expected return and Sharpe ratio of every row of ``weights`` in
+    one vectorised pass.
+
+    :param mean_returns: mean daily returns of the ``N`` stocks
+    :param weights: ``K x N`` weights
+    :param risk_free: annual risk free rate
+    :rtype: PortfolioScores
+    '''
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    daily_sd = np.sqrt(portfolio_variances(cov, weights, chunk_elements))
+    daily_returns = weights @ np.asarray(mean_returns, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = (daily_returns - risk_free / TRADING_DAYS) / daily_sd * np.sqrt(TRADING_DAYS)
+    return PortfolioScores(daily_sd * np.sqrt(TRADING_DAYS), ((1 + daily_returns) ** TRADING_DAYS) - 1, sharpe)
+
+
+def random_weights(num_portfolios, num_stocks, seed=None):
+    '''
+    ``num_portfolios`` long-only, fully invested weightings drawn uniformly
+    from the simplex, e.g. to score against an optimised portfolio.
+    '''
+    return np.random.default_rng(seed).dirichlet(np.ones(num_stocks), size=num_portfolios)
@@ -0,0 +1,269 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from support import instrumentation
+
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_STALE_AFTER = 60 * 60  # seconds
+MANIFEST_FLUSH_INTERVAL = 1.0  # seconds between manifest writes
+
+
+def _day(value):
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return stamp.normalize()
+
+
+def _normalise_index(frame):
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame = frame.copy()
+    frame.index = index.normalize()
+    frame.index.name = 'Date'
+    return frame
+
+
+class PriceCache(object):
+    '''
+    On-disk cache of daily close prices, one ``.npz`` file per ticker plus a
+    JSON manifest recording the date range each file covers.
+
+    ``get`` has the same signature as :func:`support.priceData.get_close`, so
+    a cache can be handed to ``prepare_portfolio_data(..., fetch=cache.get)``.
+    Only the part of a requested range that is not covered yet is fetched.
+
+    Staleness: rows dated on or after the day they were downloaded may be
+    provisional (market still open, late corrections). Once an entry is older
+    than ``stale_after`` seconds its coverage is cut back to the download day,
+    so that tail is fetched again on the next request.
+
+    A segment fetched without any rows is not recorded as covered (an
+    empty answer is often a transient failure), so it is fetched again
+    next time.
+
+    Eviction: when the files grow past ``max_bytes`` the least recently used
+    tickers are removed.
+
+    The manifest is written at most once per ``MANIFEST_FLUSH_INTERVAL``
+    seconds (and by :meth:`flush`, also at exit), but always before
+    eviction deletes files. An entry missing after a crash only means that
+    ticker is fetched again; an entry whose file is missing or unreadable
+    is dropped and treated as a miss.
+
+    :param cache_dir: directory holding the npz files and manifest
+    :param fetch: callable ``(ticker, start_date, end_date) -> DataFrame``
+    :param now: clock returning epoch seconds, replaceable in tests
+    '''
+
+    def __init__(self, cache_dir, fetch=None, max_bytes=DEFAULT_MAX_BYTES,
+                 stale_after=DEFAULT_STALE_AFTER, now=time.time):
+        if fetch is None:
+            from support.priceData import get_close as fetch
+        self.cache_dir = cache_dir
+        self.fetch = fetch
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self.now = now
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._manifest = self._load_manifest()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        atexit.register(self.flush)
+
+    # -- manifest -----------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self._manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _touch_manifest(self):
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= MANIFEST_FLUSH_INTERVAL:
+            self._save_manifest()
+
+    def _file_path(self, ticker):
+        return os.path.join(self.cache_dir, re.sub(r'[^A-Za-z0-9._-]', '_', ticker) + '.npz')
+
+    # -- storage ------------------------------------------------------------
+
+    def _read(self, ticker, entry):
+        '''
+        Cached prices of ``ticker``, or None after dropping ``entry`` if its
+        file is missing or unreadable.
+        '''
+        try:
+            return self._load(ticker, entry)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            self._manifest.pop(ticker, None)
+            self._touch_manifest()
+            return None
+
+    def _load(self, ticker, entry):
+        with np.load(self._file_path(ticker)) as npz:
+            index = pd.DatetimeIndex(npz['dates'].astype('datetime64[ns]'), name='Date')
+            return pd.DataFrame({entry['column']: npz['close']}, index=index)
+
+    def _write(self, ticker, frame):
+        path = self._file_path(ticker)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path,
+                 dates=frame.index.values.astype('datetime64[ns]'),
+                 close=frame.iloc[:, 0].to_numpy(dtype=float))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _evict(self, keep):
+        total = sum(entry['bytes'] for entry in self._manifest.values())
+        by_age = sorted(self._manifest.items(), key=lambda item: item[1]['last_access'])
+        evicted = []
+        for ticker, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if ticker == keep:
+                continue
+            total -= entry['bytes']
+            del self._manifest[ticker]
+            evicted.append(ticker)
+        if not evicted:
+            return
+        self._save_manifest()  # before deleting, so a crash cannot leave entries without files
+        for ticker in evicted:
+            try:
+                os.remove(self._file_path(ticker))
+            except OSError:
+                pass
+
+    def _coverage(self, entry):
+        start = pd.Timestamp(entry['start'])
+        end = pd.Timestamp(entry['end'])
+        fetched_day = _day(pd.Timestamp(entry['fetched_at'], unit='s'))
+        if end > fetched_day and self.now() - entry['fetched_at'] > self.stale_after:
+            end = fetched_day
+        return start, end
+
+    # -- public api ---------------------------------------------------------
+
+    def get(self, ticker, start_date, end_date):
+        '''
+        Close prices of ``ticker`` for ``[start_date, end_date)``, topping up
+        the cached range from ``fetch`` where needed.
+        '''
+        start, end = _day(start_date), _day(end_date)
+
+        with self._lock:
+            entry = self._manifest.get(ticker)
+            cached = self._read(ticker, entry) if entry is not None else None
+
+        fetched_at = None
+        covered = None  # range the file covers, widened only by segments that returned rows
+        if cached is None:
+            segments = [(start, end)]
+        else:
+            fetched_at = entry['fetched_at']
+            covered = self._coverage(entry)
+            cached = cached[(cached.index >= covered[0]) & (cached.index < covered[1])]
+            segments = []
+            if start < covered[0]:
+                segments.append((start, covered[0]))
+            if end > covered[1]:
+                segments.append((covered[1], end))
+
+        if segments:
+            self.misses += 1
+            instrumentation.count('cache_misses')
+            frames = [] if cached is None else [cached]
+            widened = False
+            for seg_start, seg_end in segments:
+                fetched = _normalise_index(self.fetch(ticker, seg_start.date(), seg_end.date()))
+                if len(fetched.index) == 0:
+                    # often a transient failure: leave the range uncovered so it is asked for again
+                    empty = fetched
+                    continue
+                frames.append(fetched)
+                if covered is None:
+                    covered = (seg_start, seg_end)
+                else:
+                    covered = (min(seg_start, covered[0]), max(seg_end, covered[1]))
+                if seg_end == covered[1]:
+                    fetched_at = self.now()  # the newest rows are provisional from here on
+                widened = True
+            if not frames:
+                return empty
+            merged = pd.concat(frames)
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            with self._lock:
+                if widened:
+                    size = self._write(ticker, merged)
+                    self._manifest[ticker] = {
+                        'column': str(merged.columns[0]),
+                        'start': covered[0].isoformat(),
+                        'end': covered[1].isoformat(),
+                        'fetched_at': fetched_at,
+                        'last_access': self.now(),
+                        'bytes': size,
+                    }
+                    self._evict(keep=ticker)
+                elif ticker in self._manifest:
+                    self._manifest[ticker]['last_access'] = self.now()
+                self._touch_manifest()
+        else:
+            self.hits += 1
+            instrumentation.count('cache_hits')
+            merged = cached
+            with self._lock:
+                if ticker in self._manifest:  # unless evicted meanwhile
+                    self._manifest[ticker]['last_access'] = self.now()
+                    self._touch_manifest()
+
+        return merged[(merged.index >= start) & (merged.index < end)]
+
+    def flush(self):
+        '''
+        Write pending manifest changes.
+        '''
+        with self._lock:
+            if self._dirty:
+                try:
+                    self._save_manifest()
+                except OSError:
+                    pass  # cache directory gone, e.g. a removed temporary cache
+
+    def clear(self):
+        with self._lock:
+            for ticker in list(self._manifest):
+                try:
+                    os.remove(self._file_path(ticker))
+                except OSError:
+                    pass
+            self._manifest = {}
+            self._save_manifest()
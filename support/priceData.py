@@ -0,0 +1,187 @@
+import hashlib
+
+import numpy as np
+
+from support import instrumentation
+from support.alignment import ALIGNMENTS, COMMON, PAIRWISE, PricePanel, nearest_psd, pairwise_covariance
+from support.covariance import CovarianceModel, DenseCovariance, estimate, get_estimator
+from support.fetchEngine import fetch_all
+
+BSE_SUFFIX = '.BO'
+TRADING_DAYS = 250
+
+
+def to_yahoo_tickers(labels):
+    '''
+    Map exchange codes from the ticker list to Yahoo Finance BSE symbols.
+    '''
+    return [label + BSE_SUFFIX for label in labels]
+
+
+def get_close(ticker, start_date, end_date):
+    '''
+    Download daily close prices for one ticker as a single column frame
+    named ``<ticker>-close``.
+    '''
+    import yfinance as yf
+
+    datadf = yf.Ticker(ticker).history(period='1d', start=start_date, end=end_date)
+    stock_col = ticker + '-close'
+    return datadf[['Close']].rename(columns={'Close': stock_col})
+
+
+class FetchFailed(Exception):
+    '''
+    Raised when prices for one or more tickers could not be downloaded; the
+    :class:`support.fetchEngine.FetchReport` is kept on ``report``.
+    '''
+
+    def __init__(self, report):
+        super(FetchFailed, self).__init__('could not get data for:\n' + report.summary())
+        self.report = report
+
+
+class PortfolioData(object):
+    '''
+    Aligned prices of a basket together with the return matrix, mean daily
+    returns and covariance derived from them.
+
+    Everything the optimizer needs is computed once here, so the objective
+    never has to touch pandas or the network.
+
+    :param prices: ``dates x tickers`` frame or :class:`support.alignment.PricePanel`
+    :param alignment: ``'common'`` keeps the dates on which every ticker has
+                      a price; ``'pairwise'`` keeps every date, so ``prices``
+                      and ``returns`` have NaN gaps and the covariance uses
+                      all the days each pair has in common
+    '''
+
+    def __init__(self, prices, fetch_report=None, alignment=COMMON):
+        if alignment not in ALIGNMENTS:
+            raise ValueError('unknown alignment %r, expected one of %s' % (alignment, ', '.join(ALIGNMENTS)))
+        panel = prices if isinstance(prices, PricePanel) else PricePanel.from_frame(prices)
+        self.calendar_dates = panel.calendar_dates
+        complete = alignment == COMMON
+        if complete:
+            panel = panel.complete()
+        self.alignment = alignment
+        self.labels = list(panel.labels)
+        self.fetch_report = fetch_report
+        self.prices = panel.frame()
+        self._dataset_key = None
+
+        with instrumentation.stage('returns'):
+            self.returns = panel.returns()  # estimate returns for each asset
+            self.mean_returns = self.returns.mean(axis=0) if complete else np.nanmean(self.returns, axis=0)
+        with instrumentation.stage('covariance'):
+            if complete:
+                # being the variance covariance matrix (same ddof as DataFrame.cov)
+                self.cov = np.atleast_2d(np.cov(self.returns, rowvar=False))
+            else:
+                cov = pairwise_covariance(self.returns)
+                if np.isnan(cov).any():
+                    i, j = np.argwhere(np.isnan(cov))[0]
+                    raise ValueError('not enough overlapping price history for %s and %s'
+                                     % (self.labels[i], self.labels[j]))
+                self.cov = nearest_psd(cov)
+
+    @property
+    def num_stocks(self):
+        return len(self.labels)
+
+    @property
+    def dropped_dates(self):
+        '''
+        Number of dates with a price for some but not all tickers that the
+        common alignment left out.
+        '''
+        return self.calendar_dates - len(self.prices.index)
+
+    @property
+    def dataset_key(self):
+        '''
+        Labels, date range and a hash of the returns: prices refetched for
+        the same range (provisional last days) give a different key.
+        '''
+        if self._dataset_key is None:
+            index = self.prices.index
+            digest = hashlib.sha1(np.ascontiguousarray(self.returns).tobytes()).hexdigest()
+            self._dataset_key = tuple(self.labels), str(index[0]), str(index[-1]), len(index), digest
+        return self._dataset_key
+
+    def covariance(self, estimator=None):
+        '''
+        Covariance of the returns from ``estimator`` (an instance or a name from
+        :data:`support.covariance.ESTIMATORS`, sample covariance by default),
+        memoised per dataset and estimator parameters.
+
+        With pairwise alignment only the sample covariance is available, the
+        other estimators need complete rows.
+
+        :rtype: support.covariance.CovarianceModel
+        '''
+        name = get_estimator(estimator).name
+        if name == 'sample':
+            return DenseCovariance(self.cov)  # computed above already
+        if self.alignment == PAIRWISE:
+            raise ValueError('the %s estimator needs common alignment' % name)
+        return estimate(self.returns, estimator, self.dataset_key)
+
+
+def prepare_portfolio_data(tickers, start_date, end_date, fetch=get_close, allow_partial=False,
+                           alignment=COMMON, **fetch_options):
+    '''
+    Fetch every ticker once (concurrently, see :func:`support.fetchEngine.fetch_all`),
+    align them on one calendar and return a :class:`PortfolioData`.
+
+    :param tickers: Yahoo Finance symbols
+    :param fetch: callable ``(ticker, start_date, end_date) -> DataFrame``
+    :param allow_partial: carry on with the tickers that did arrive instead of
+                          raising :class:`FetchFailed`
+    :param alignment: ``'common'`` or ``'pairwise'``, see :class:`PortfolioData`
+    :param fetch_options: ``max_workers``, ``timeout``, ``retries``, ``backoff``, ``max_abandoned``
+    '''
+    if not tickers:
+        raise ValueError('no tickers selected')
+
+    with instrumentation.stage('fetch'):
+        report = fetch_all(tickers, start_date, end_date, fetch, **fetch_options)
+    if report.failures and not (allow_partial and report.frames):
+        raise FetchFailed(report)
+
+    with instrumentation.stage('align'):
+        panel = align_prices([report.frames[ticker] for ticker in report.fetched], alignment)
+    if len(panel) < 2:
+        raise ValueError('not enough overlapping price history for the selected stocks')
+
+    return PortfolioData(panel, report, alignment)
+
+
+def align_prices(frames, alignment=COMMON):
+    '''
+    :class:`support.alignment.PricePanel` of single-column price frames;
+    with common alignment only its complete rows are kept, so the full
+    calendar is released straight away.
+    '''
+    panel = PricePanel.from_frames(frames)
+    return panel.complete() if alignment == COMMON else panel
+
+
+def make_risk_objective(cov):
+    '''
+    Build the optimizer objective: annualised portfolio standard deviation
+    as a pure NumPy function of the weights, closed over ``cov`` (an array or
+    a :class:`support.covariance.CovarianceModel`).
+    '''
+    annualise = np.sqrt(TRADING_DAYS)
+    if isinstance(cov, CovarianceModel):
+        quad = cov.quad
+    else:
+        cov = np.ascontiguousarray(cov, dtype=float)
+        quad = lambda w: w @ cov @ w
+
+    def port_risk(weights):
+        var_p = quad(np.asarray(weights, dtype=float))  # variance of the multi-asset portfolio
+        return np.sqrt(var_p) * annualise  # annualised standard deviation
+
+    return port_risk
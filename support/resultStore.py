@@ -0,0 +1,212 @@
+'''
+Optimisation runs kept on disk as columnar arrays.
+
+Each run is one uncompressed ``.npz`` file named after its run id, holding
+the aligned prices (dates x tickers), the daily returns, the weights and the
+run metadata as JSON. A ``runs.json`` index lists the metadata of every run,
+so runs can be browsed without opening their files. Excel is only an export
+format: :func:`export_excel` writes the familiar Stock-Risk workbook from a
+stored run or an :class:`support.engine.OptimizationResult` on request.
+'''
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from support import instrumentation
+
+INDEX_NAME = 'runs.json'
+
+
+def new_run_id(now=time.time):
+    '''
+    Sortable, unique run id: UTC timestamp plus a random suffix.
+    '''
+    return time.strftime('%Y%m%dT%H%M%S', time.gmtime(now())) + '-' + uuid.uuid4().hex[:6]
+
+
+def weights_frame(weights):
+    '''
+    Weights as shown in the results table: ``weights`` and ``weights_rounded``.
+    '''
+    optimised_weights = weights.to_frame(name='weights')
+    # Clean format of the weights so it's more readable
+    optimised_weights['weights_rounded'] = optimised_weights['weights'].round(3)
+    return optimised_weights
+
+
+def export_excel(run, path):
+    '''
+    Write ``run`` (anything with ``prices`` and ``weights_frame()``) as the
+    Stock-Risk workbook: prices on "Stock-Data", weights on "optimized-weights".
+    '''
+    with instrumentation.stage('excel'), pd.ExcelWriter(path) as writer:
+        run.prices.to_excel(writer, sheet_name='Stock-Data')
+        run.weights_frame().to_excel(writer, sheet_name='optimized-weights')
+
+
+class StoredRun(object):
+    '''
+    One run read back from a :class:`ResultStore`.
+
+    :ivar run_id: key of the run in its store
+    :ivar metadata: dictionary saved with the run (dates, solver, risk, ...)
+    :ivar prices: ``pd.DataFrame`` of aligned close prices
+    :ivar returns: ``pd.DataFrame`` of daily returns
+    :ivar weights: ``pd.Series`` of weights indexed by price column
+    '''
+
+    def __init__(self, run_id, metadata, prices, returns, weights):
+        self.run_id = run_id
+        self.metadata = metadata
+        self.prices = prices
+        self.returns = returns
+        self.weights = weights
+
+    @property
+    def risk(self):
+        return self.metadata.get('risk')
+
+    @property
+    def expected_return(self):
+        return self.metadata.get('expected_return')
+
+    def weights_frame(self):
+        return weights_frame(self.weights)
+
+    def to_excel(self, path):
+        export_excel(self, path)
+
+
+class ResultStore(object):
+    '''
+    Directory of optimisation runs keyed by run id.
+
+    Safe to use from worker threads; files are written to a temporary name
+    and renamed, so a reader never sees half a run.
+
+    :param directory: where the run files and ``runs.json`` live
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    # -- index --------------------------------------------------------------
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self._index, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def _file_path(self, run_id):
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9._-]', '_', run_id) + '.npz')
+
+    # -- public api ---------------------------------------------------------
+
+    def save(self, result, run_id=None, **metadata):
+        '''
+        Store an :class:`support.engine.OptimizationResult`.
+
+        :param run_id: key to store under, a new :func:`new_run_id` by default
+        :param metadata: extra JSON-serialisable fields, e.g. ``start``/``end``
+        :return: the run id
+        '''
+        run_id = run_id or new_run_id()
+        data = result.data
+        prices = data.prices
+        metadata = dict(metadata, run_id=run_id, created=time.time(), labels=list(map(str, data.labels)),
+                        solver=result.solver.get('method'), risk=result.risk,
+                        expected_return=result.expected_return, equal_weight_risk=result.equal_weight_risk,
+                        stopped=result.stopped)
+
+        path = self._file_path(run_id)
+        tmp_path = path + '.tmp.npz'
+        with instrumentation.stage('store'):
+            np.savez(tmp_path,
+                     dates=prices.index.values.astype('datetime64[ns]'),
+                     labels=np.array(metadata['labels'], dtype=str),
+                     prices=prices.to_numpy(dtype=float),
+                     returns=data.returns,
+                     weights=result.weights.to_numpy(dtype=float),
+                     metadata=np.array(json.dumps(metadata, default=str)))
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._index[run_id] = metadata
+            self._save_index()
+        return run_id
+
+    def stats_path(self, run_id):
+        '''
+        Where the :mod:`support.instrumentation` report of a run is kept.
+        '''
+        return self._file_path(run_id)[:-len('.npz')] + '.stats.json'
+
+    def load(self, run_id):
+        '''
+        :rtype: StoredRun
+        :raises KeyError: if there is no such run
+        '''
+        if run_id not in self._index:
+            raise KeyError(run_id)
+        with np.load(self._file_path(run_id)) as npz:
+            dates = pd.DatetimeIndex(npz['dates'], name='Date')
+            labels = [str(label) for label in npz['labels']]
+            prices = pd.DataFrame(npz['prices'], index=dates, columns=labels)
+            returns = pd.DataFrame(npz['returns'], index=dates[len(dates) - len(npz['returns']):], columns=labels)
+            weights = pd.Series(npz['weights'], index=labels, name='weights')
+            metadata = json.loads(str(npz['metadata']))
+        return StoredRun(run_id, metadata, prices, returns, weights)
+
+    def runs(self):
+        '''
+        Metadata of every stored run, oldest first.
+        '''
+        with self._lock:
+            return sorted(self._index.values(), key=lambda meta: (meta['created'], meta['run_id']))
+
+    def latest(self):
+        '''
+        Id of the most recently stored run, or None.
+        '''
+        runs = self.runs()
+        return runs[-1]['run_id'] if runs else None
+
+    def export_excel(self, run_id, path):
+        export_excel(self.load(run_id), path)
+
+    def delete(self, run_id):
+        with self._lock:
+            self._index.pop(run_id, None)
+            self._save_index()
+        for path in (self._file_path(run_id), self.stats_path(run_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __contains__(self, run_id):
+        return run_id in self._index
+
+    def __len__(self):
+        return len(self._index)
@@ -30,9 +30,10 @@ class Ui_StockRiskCalculator(object):
         self.search_le = QtWidgets.QLineEdit(self.frame)
         self.search_le.setGeometry(QtCore.QRect(10, 20, 131, 16))
         self.search_le.setObjectName("search_le")
-        self.listWidget = QtWidgets.QListWidget(self.frame)
-        self.listWidget.setGeometry(QtCore.QRect(10, 40, 131, 221))
-        self.listWidget.setObjectName("listWidget")
+        self.listView = QtWidgets.QListView(self.frame)
+        self.listView.setGeometry(QtCore.QRect(10, 40, 131, 221))
+        self.listView.setUniformItemSizes(True)
+        self.listView.setObjectName("listView")
         self.right_pb = QtWidgets.QPushButton(self.frame)
         self.right_pb.setGeometry(QtCore.QRect(150, 130, 31, 23))
         self.right_pb.setObjectName("right_pb")
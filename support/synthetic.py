@@ -0,0 +1,105 @@
+'''
+Deterministic synthetic prices for benchmarks and offline runs.
+
+Prices follow a correlated geometric Brownian motion: daily log returns are
+driven by a few market factors shared by every asset plus an idiosyncratic
+part, so the covariance looks like equity data (one dominant factor, a
+minimum variance portfolio holding only some of the names). Every ticker's
+path depends only on the generator seed and the ticker, so a basket gives
+the same prices whichever other tickers are requested with it.
+'''
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from support.priceData import BSE_SUFFIX, TRADING_DAYS
+
+DEFAULT_START = '2000-01-03'
+
+
+class SyntheticPrices(object):
+    '''
+    Correlated GBM price source.
+
+    An instance is a fetch callable ``(ticker, start_date, end_date) ->
+    DataFrame`` like :func:`support.priceData.get_close`, with the same
+    ``<ticker>-close`` column, so it can be handed to
+    :func:`support.engine.optimize` or a :class:`support.priceCache.PriceCache`.
+
+    :param num_days: length of the business-day calendar starting at ``start``
+    :param factors: number of common factors; the first is the market
+    :param seed: seeds the factor paths; asset parameters and noise are
+                 seeded from ``seed`` and the ticker
+    '''
+
+    def __init__(self, num_days, factors=3, seed=0, start=DEFAULT_START):
+        self.num_days = num_days
+        self.factors = factors
+        self.seed = seed
+        self.dates = pd.bdate_range(start, periods=num_days, name='Date')
+        rng = np.random.default_rng(seed)
+        # factor returns in units of daily volatility, market first and strongest
+        self.factor_scale = np.r_[1.0, np.full(factors - 1, 0.5)][:factors]
+        self.factor_returns = rng.standard_normal((num_days, factors)) * self.factor_scale
+
+    @staticmethod
+    def codes(num_assets):
+        '''
+        Exchange codes ``SYN0000``, ``SYN0001``, ... as used in the GUI lists.
+        '''
+        return ['SYN%04d' % i for i in range(num_assets)]
+
+    @classmethod
+    def tickers(cls, num_assets):
+        return [code + BSE_SUFFIX for code in cls.codes(num_assets)]
+
+    def _rng(self, ticker):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode('utf-8'))])
+
+    def log_returns(self, ticker):
+        '''
+        Daily log returns of ``ticker`` over the whole calendar.
+        '''
+        rng = self._rng(ticker)
+        annual_vol = rng.uniform(0.15, 0.45)
+        annual_drift = rng.normal(0.08, 0.05)
+        loadings = np.r_[rng.uniform(0.4, 0.9), rng.normal(0, 0.25, self.factors - 1)][:self.factors]
+        systematic = self.factor_returns @ loadings
+        systematic_var = np.sum((loadings * self.factor_scale) ** 2)
+        specific = rng.standard_normal(self.num_days) * np.sqrt(max(1 - systematic_var, 0.05))
+        daily_vol = annual_vol / np.sqrt(TRADING_DAYS)
+        return (annual_drift / TRADING_DAYS - daily_vol ** 2 / 2) + daily_vol * (systematic + specific)
+
+    def close(self, ticker):
+        '''
+        Close prices of ``ticker`` over the whole calendar, as a Series.
+        '''
+        start_price = self._rng(ticker + '/price').uniform(20, 2000)
+        prices = start_price * np.exp(np.cumsum(self.log_returns(ticker)))
+        return pd.Series(prices, index=self.dates, name=ticker + '-close')
+
+    def fetch(self, ticker, start_date, end_date):
+        close = self.close(ticker)
+        window = (close.index >= pd.Timestamp(start_date)) & (close.index < pd.Timestamp(end_date))
+        return close[window].to_frame()
+
+    def __call__(self, ticker, start_date, end_date):
+        return self.fetch(ticker, start_date, end_date)
+
+    def frame(self, tickers):
+        '''
+        Aligned close prices of ``tickers``, one column each.
+        '''
+        return pd.concat([self.close(ticker) for ticker in tickers], axis=1)
+
+    @property
+    def start(self):
+        return self.dates[0].date()
+
+    @property
+    def end(self):
+        '''
+        Exclusive end date covering the whole calendar.
+        '''
+        return (self.dates[-1] + pd.Timedelta(days=1)).date()
@@ -0,0 +1,203 @@
+'''
+In-memory search over the instrument universe of inputData/Equity.csv.
+
+Matching is case-insensitive on the exchange code, the BSE security code and
+the company name. Substring queries go through an n-gram index (1, 2 and
+3-grams of every record, stored as one sorted CSR array), code prefixes
+through a sorted array, so a keystroke costs roughly O(matches) whatever the
+size of the universe. Longer queries intersect the postings of their 3-grams
+and check the few remaining candidates directly; when the 3-grams are not
+selective (``' ltd'``) the joined texts are scanned instead, vectorised over
+a 3-gram key per byte that is built on the first such query.
+'''
+import numpy as np
+
+COLUMNS = ['bsecode', 'nsecode', 'compname']
+SEPARATOR = b'\n'
+MAX_GRAM = 3
+VERIFY_DIRECTLY = 64  # candidate count below which substring checks beat intersections
+SCAN_ABOVE = 2048  # candidate count above which scanning the joined texts beats checking rows
+
+
+class Universe(object):
+    '''
+    The instrument list: parallel sequences of BSE codes, exchange codes
+    (the tickers shown in the lists) and company names.
+    '''
+
+    def __init__(self, bsecodes, nsecodes, names):
+        self.bsecodes = list(bsecodes)
+        self.nsecodes = list(nsecodes)
+        self.names = list(names)
+
+    @classmethod
+    def from_csv(cls, path):
+        import pandas as pd
+
+        data = pd.read_csv(path, names=COLUMNS, skiprows=1, dtype=str, keep_default_na=False)
+        return cls(data.bsecode.tolist(), data.nsecode.tolist(), data.compname.tolist())
+
+    def __len__(self):
+        return len(self.nsecodes)
+
+    def search_text(self, row):
+        return '%s %s %s' % (self.nsecodes[row], self.bsecodes[row], self.names[row])
+
+    def search_texts(self):
+        '''
+        Lower-cased utf-8 text of every row, as matched by :class:`TickerIndex`.
+        '''
+        return [self.search_text(row).lower().encode('utf-8') for row in range(len(self))]
+
+
+def _gram_keys(data, n):
+    '''
+    Integer key of every n-gram starting in ``data`` (a uint8 array).
+    '''
+    keys = np.zeros(len(data) - n + 1, dtype=np.int64)
+    for i in range(n):
+        keys = (keys << 8) | data[i:len(data) - n + 1 + i]
+    return keys | (n << 24)  # the length keeps 'ab' and '\0ab' apart
+
+
+class TickerIndex(object):
+    '''
+    Search index over a :class:`Universe`.
+
+    :meth:`search` returns row numbers: code prefix matches first
+    (alphabetically), then every other record containing the text, in
+    universe order.
+
+    :param texts: precomputed :meth:`Universe.search_texts`, any sequence
+    :param arrays: precomputed :meth:`arrays`, e.g. memory-mapped by
+                   :mod:`support.universeStore`; built from ``texts`` if omitted
+    '''
+    ARRAY_NAMES = ('grams', 'offsets', 'postings', 'prefix_order', 'sorted_codes')
+
+    def __init__(self, universe, texts=None, arrays=None):
+        self.universe = universe
+        self.texts = universe.search_texts() if texts is None else texts
+        self._scan_arrays = None
+        if arrays is None:
+            self._build_grams()
+            self._build_prefixes()
+        else:
+            (self._grams, self._offsets, self._postings,
+             self._prefix_order, self._sorted_codes) = [arrays[name] for name in self.ARRAY_NAMES]
+
+    def arrays(self):
+        return dict(zip(self.ARRAY_NAMES, (self._grams, self._offsets, self._postings,
+                                           self._prefix_order, self._sorted_codes)))
+
+    def _build_grams(self):
+        blob = SEPARATOR.join(self.texts)
+        data = np.frombuffer(blob, dtype=np.uint8).astype(np.int64)
+        lengths = np.array([len(text) + len(SEPARATOR) for text in self.texts], dtype=np.int64)
+        rows = np.repeat(np.arange(len(self.texts), dtype=np.int64), lengths)[:len(data)]
+
+        keys = []
+        owners = []
+        for n in range(1, MAX_GRAM + 1):
+            if len(data) < n:
+                break
+            gram = _gram_keys(data, n)
+            inside = np.ones(len(gram), dtype=bool)  # grams spanning two records are dropped
+            for i in range(n):
+                inside &= data[i:len(data) - n + 1 + i] != SEPARATOR[0]
+            keys.append(gram[inside])
+            owners.append(rows[:len(gram)][inside])
+
+        pairs = np.concatenate(keys) << 32 | np.concatenate(owners) if keys else np.zeros(0, np.int64)
+        pairs.sort()
+        pairs = pairs[np.append(True, np.diff(pairs) != 0)] if len(pairs) else pairs  # (gram, row) once
+        gram_of_pair = pairs >> 32
+        self._postings = (pairs & 0xFFFFFFFF).astype(np.int32)
+        self._offsets = np.flatnonzero(np.append(True, np.diff(gram_of_pair) != 0))
+        self._grams = gram_of_pair[self._offsets]
+        self._offsets = np.append(self._offsets, len(pairs))
+
+    def _build_prefixes(self):
+        codes = np.array([code.lower() for code in self.universe.nsecodes], dtype=str)
+        self._prefix_order = np.argsort(codes, kind='stable').astype(np.int32)
+        self._sorted_codes = codes[self._prefix_order]
+
+    def _posting(self, gram):
+        data = np.frombuffer(gram, dtype=np.uint8).astype(np.int64)
+        key = _gram_keys(data, len(data))[0]
+        at = np.searchsorted(self._grams, key)
+        if at == len(self._grams) or self._grams[at] != key:
+            return self._postings[:0]
+        return self._postings[self._offsets[at]:self._offsets[at + 1]]
+
+    def contains(self, text):
+        '''
+        Sorted rows whose code, BSE code or name contain ``text``.
+        '''
+        query = text.lower().encode('utf-8')
+        if not query:
+            return np.arange(len(self.texts), dtype=np.int32)
+        if len(query) <= MAX_GRAM:
+            return self._posting(query)
+
+        grams = sorted({query[i:i + MAX_GRAM] for i in range(len(query) - MAX_GRAM + 1)},
+                       key=lambda gram: len(self._posting(gram)))
+        candidates = self._posting(grams[0])
+        for gram in grams[1:]:
+            if len(candidates) <= VERIFY_DIRECTLY:
+                break
+            candidates = np.intersect1d(candidates, self._posting(gram), assume_unique=True)
+        if len(candidates) > SCAN_ABOVE:
+            return self._scan(query)
+        texts = self.texts
+        return np.array([row for row in candidates.tolist() if query in texts[row]], dtype=np.int32)
+
+    def _scan(self, query):
+        '''
+        Sorted rows containing ``query`` (at least 3 bytes), by matching its
+        first 3-gram against every position of the joined texts.
+        '''
+        if self._scan_arrays is None:
+            blob = getattr(self.texts, 'blob', None)  # support.universeStore.StringColumn: already joined
+            if blob is None:
+                blob = np.frombuffer(b''.join(self.texts), dtype=np.uint8)
+                bounds = np.zeros(len(self.texts) + 1, dtype=np.int64)
+                np.cumsum([len(text) for text in self.texts], out=bounds[1:])
+            else:
+                blob, bounds = np.asarray(blob), np.asarray(self.texts.offsets)
+            keys = _gram_keys(blob.astype(np.int64), MAX_GRAM).astype(np.int32)
+            self._scan_arrays = blob, bounds, keys
+        blob, bounds, keys = self._scan_arrays
+
+        needle = np.frombuffer(query, dtype=np.uint8)
+        starts = np.flatnonzero(keys == _gram_keys(needle[:MAX_GRAM].astype(np.int64), MAX_GRAM)[0])
+        starts = starts[starts + len(needle) <= len(blob)]
+        for i in range(MAX_GRAM, len(needle)):
+            starts = starts[blob[starts + i] == needle[i]]
+        rows = np.searchsorted(bounds, starts, side='right') - 1
+        rows = rows[starts + len(needle) <= bounds[rows + 1]]  # not running into the next text
+        return rows[np.append(True, np.diff(rows) != 0)].astype(np.int32) if len(rows) else rows.astype(np.int32)
+
+    def row_of(self, code):
+        '''
+        Row of the exact exchange code ``code``, or None.
+        '''
+        for row in self.prefix(code):
+            if self.universe.nsecodes[row] == code:
+                return int(row)
+        return None
+
+    def prefix(self, text):
+        '''
+        Rows whose exchange code starts with ``text``, alphabetically.
+        '''
+        text = text.lower()
+        lo = np.searchsorted(self._sorted_codes, text, side='left')
+        hi = np.searchsorted(self._sorted_codes, text + '\U0010ffff', side='left')
+        return self._prefix_order[lo:hi]
+
+    def search(self, text):
+        if not text:
+            return np.arange(len(self.texts), dtype=np.int32)
+        first = self.prefix(text)
+        rest = np.setdiff1d(self.contains(text), first, assume_unique=True)
+        return np.concatenate([first, rest]).astype(np.int32)
@@ -0,0 +1,116 @@
+from PyQt5 import QtCore
+
+import numpy as np
+
+
+class UniverseModel(QtCore.QAbstractListModel):
+    '''
+    Read-only list model over a :class:`support.tickerIndex.Universe`: shows
+    the exchange code, with company name and BSE code as tooltip.
+    '''
+
+    def __init__(self, universe, parent=None):
+        QtCore.QAbstractListModel.__init__(self, parent=parent)
+        self.universe = universe
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.universe)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return QtCore.QVariant()
+
+        row = index.row()
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self.universe.nsecodes[row]
+        if role == QtCore.Qt.ToolTipRole:
+            return '%s (%s)' % (self.universe.names[row], self.universe.bsecodes[row])
+        return QtCore.QVariant()
+
+
+class TickerSearchProxy(QtCore.QAbstractProxyModel):
+    '''
+    The "available stocks" list: the rows of a :class:`UniverseModel` that
+    match the search text and have not been moved to the selection.
+
+    Matching rows come from a :class:`support.tickerIndex.TickerIndex`, so a
+    new search text costs O(matches) and the view only materialises the rows
+    it paints; no per-row filter callback runs over the whole universe.
+    '''
+
+    def __init__(self, search_index, parent=None):
+        QtCore.QAbstractProxyModel.__init__(self, parent=parent)
+        self.search_index = search_index
+        universe = search_index.universe
+        self.available = np.ones(len(universe), dtype=bool)
+        self._query = ''
+        self._rows = np.arange(len(universe), dtype=np.int32)
+        self.setSourceModel(UniverseModel(universe, self))
+
+    # -- filtering ----------------------------------------------------------
+
+    def setQuery(self, text):
+        self._query = text
+        self._refresh()
+
+    def _refresh(self):
+        self.beginResetModel()
+        rows = self.search_index.search(self._query)
+        self._rows = rows[self.available[rows]]
+        self.endResetModel()
+
+    def take(self, proxy_row):
+        '''
+        Remove a row from the available list and return its code.
+        '''
+        source_row = int(self._rows[proxy_row])
+        self.available[source_row] = False
+        self.beginRemoveRows(QtCore.QModelIndex(), proxy_row, proxy_row)
+        self._rows = np.delete(self._rows, proxy_row)
+        self.endRemoveRows()
+        return self.search_index.universe.nsecodes[source_row]
+
+    def release(self, code):
+        '''
+        Put a code back into the available list.
+        '''
+        source_row = self.search_index.row_of(code)
+        if source_row is not None:
+            self.available[source_row] = True
+            self._refresh()
+
+    def availableCount(self):
+        return int(self.available.sum())
+
+    def availableCodes(self):
+        codes = self.search_index.universe.nsecodes
+        return [codes[row] for row in np.flatnonzero(self.available)]
+
+    # -- QAbstractProxyModel ------------------------------------------------
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QtCore.QModelIndex()
+
+    def mapToSource(self, proxyIndex):
+        if not proxyIndex.isValid():
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(int(self._rows[proxyIndex.row()]), 0)
+
+    def mapFromSource(self, sourceIndex):
+        if not sourceIndex.isValid():
+            return QtCore.QModelIndex()
+        found = np.flatnonzero(self._rows == sourceIndex.row())
+        if not len(found):
+            return QtCore.QModelIndex()
+        return self.index(int(found[0]), 0)
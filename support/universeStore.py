@@ -0,0 +1,175 @@
+'''
+Compiled, memory-mapped form of inputData/Equity.csv.
+
+The CSV is parsed once and written as a single binary file holding the three
+string columns, the search texts and the prebuilt
+:class:`support.tickerIndex.TickerIndex` arrays. Later starts map that file
+and decode strings only when a row is actually shown, so neither pandas nor
+the index build is on the startup path. The file records the CSV's mtime,
+size and SHA-1 and is rebuilt when the CSV changes.
+'''
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from support.tickerIndex import TickerIndex, Universe
+
+MAGIC = b'MPRUNIV1'
+FORMAT_VERSION = 1
+ALIGN = 64
+COLUMNS = ('bsecodes', 'nsecodes', 'names', 'texts')
+
+
+class StringColumn(object):
+    '''
+    Read-only sequence of strings stored as one utf-8 blob plus offsets.
+    Rows are decoded on access.
+    '''
+
+    def __init__(self, offsets, blob, decode=True):
+        self.offsets = offsets
+        self.blob = blob
+        self.decode = decode
+
+    @classmethod
+    def pack(cls, values):
+        encoded = [value if isinstance(value, bytes) else value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return offsets, blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        value = self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes()
+        return value.decode('utf-8') if self.decode else value
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+
+class MappedUniverse(Universe):
+    '''
+    :class:`support.tickerIndex.Universe` whose columns are
+    :class:`StringColumn` views of a compiled file.
+    '''
+
+    def __init__(self, bsecodes, nsecodes, names):
+        self.bsecodes = bsecodes
+        self.nsecodes = nsecodes
+        self.names = names
+
+
+def _source_stamp(csv_path, with_hash=True):
+    stat = os.stat(csv_path)
+    stamp = {'mtime': stat.st_mtime, 'size': stat.st_size}
+    if with_hash:
+        with open(csv_path, 'rb') as fh:
+            stamp['sha1'] = hashlib.sha1(fh.read()).hexdigest()
+    return stamp
+
+
+def compile_universe(csv_path, out_path):
+    '''
+    Parse ``csv_path`` and write the compiled universe to ``out_path``.
+    '''
+    universe = Universe.from_csv(csv_path)
+    index = TickerIndex(universe)
+
+    arrays = {}
+    for name, values in (('bsecodes', universe.bsecodes), ('nsecodes', universe.nsecodes),
+                         ('names', universe.names), ('texts', index.texts)):
+        arrays[name + '_offsets'], arrays[name + '_blob'] = StringColumn.pack(values)
+    for name, values in index.arrays().items():
+        arrays['index_' + name] = np.ascontiguousarray(values)
+
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+
+    header = json.dumps({'version': FORMAT_VERSION, 'source': _source_stamp(csv_path),
+                         'arrays': layout}).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGN) * ALIGN
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(MAGIC + struct.pack('<I', len(header)) + header)
+        for name, values in arrays.items():
+            fh.seek(data_start + layout[name]['offset'])
+            fh.write(values.tobytes())
+    os.replace(tmp_path, out_path)
+
+
+def _read_header(path):
+    with open(path, 'rb') as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%s is not a compiled universe' % path)
+        (length,) = struct.unpack('<I', fh.read(4))
+        header = json.loads(fh.read(length).decode('utf-8'))
+    header['data_start'] = -(-(len(MAGIC) + 4 + length) // ALIGN) * ALIGN
+    return header
+
+
+def _is_current(header, csv_path):
+    if header.get('version') != FORMAT_VERSION:
+        return False
+    source = header['source']
+    quick = _source_stamp(csv_path, with_hash=False)
+    if quick['size'] != source['size']:
+        return False
+    if quick['mtime'] == source['mtime']:
+        return True
+    return _source_stamp(csv_path)['sha1'] == source['sha1']  # touched but unchanged
+
+
+def _map_arrays(path, header):
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        dtype = np.dtype(spec['dtype'])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                     offset=header['data_start'] + spec['offset'])
+    return arrays
+
+
+def load_universe(csv_path, compiled_path):
+    '''
+    Universe and search index of ``csv_path``, served from ``compiled_path``
+    and (re)compiled first when missing or out of date.
+
+    :return: ``(universe, index)``
+    '''
+    try:
+        header = _read_header(compiled_path)
+        current = _is_current(header, csv_path)
+    except (OSError, ValueError):
+        current = False
+    if not current:
+        directory = os.path.dirname(compiled_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        compile_universe(csv_path, compiled_path)
+        header = _read_header(compiled_path)
+
+    arrays = _map_arrays(compiled_path, header)
+    columns = {name: StringColumn(arrays[name + '_offsets'], arrays[name + '_blob'], decode=name != 'texts')
+               for name in COLUMNS}
+    universe = MappedUniverse(columns['bsecodes'], columns['nsecodes'], columns['names'])
+    index_arrays = {name: arrays['index_' + name] for name in TickerIndex.ARRAY_NAMES}
+    return universe, TickerIndex(universe, texts=columns['texts'], arrays=index_arrays)
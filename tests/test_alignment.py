@@ -0,0 +1,72 @@
+'''
+Tests of :mod:`support.alignment` against the pandas operations it replaces.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from support.alignment import PricePanel, nearest_psd, pairwise_covariance
+
+
+def ragged_frames(seed=0):
+    '''
+    Four price series on overlapping but different business-day calendars.
+    '''
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    frames = []
+    for i, (first, last) in enumerate(((0, 300), (20, 300), (0, 260), (40, 280))):
+        keep = np.sort(rng.choice(np.arange(first, last), size=int(0.9 * (last - first)), replace=False))
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(keep))))
+        frames.append(pd.DataFrame({'T%d-close' % i: prices}, index=dates[keep]))
+    return frames
+
+
+class PricePanelTest(unittest.TestCase):
+
+    def test_complete_matches_concat_dropna(self):
+        frames = ragged_frames()
+        panel = PricePanel.from_frames(frames).complete()
+        expected = pd.concat(frames, axis=1, sort=True).dropna()
+        self.assertEqual(list(panel.dates), list(expected.index))
+        np.testing.assert_array_equal(panel.values, expected.to_numpy())
+        np.testing.assert_allclose(panel.returns(), expected.pct_change(1).dropna().to_numpy())
+
+    def test_pairwise_covariance_matches_dataframe_cov(self):
+        frames = ragged_frames(1)
+        panel = PricePanel.from_frames(frames)
+        expected = pd.DataFrame(panel.returns()).cov().to_numpy()
+        np.testing.assert_allclose(pairwise_covariance(panel.returns()), expected, rtol=1e-10, atol=1e-16)
+
+    def test_pairwise_covariance_without_gaps_is_np_cov(self):
+        returns = np.random.default_rng(2).normal(0, 0.01, (100, 3))
+        np.testing.assert_allclose(pairwise_covariance(returns), np.cov(returns, rowvar=False))
+
+    def test_pairs_without_enough_days_are_nan(self):
+        returns = np.full((10, 2), np.nan)
+        returns[:5, 0] = np.arange(5)
+        returns[5:, 1] = np.arange(5)
+        cov = pairwise_covariance(returns)
+        self.assertTrue(np.isnan(cov[0, 1]) and np.isnan(cov[1, 0]))
+        self.assertAlmostEqual(cov[0, 0], np.var(np.arange(5), ddof=1))
+
+
+class NearestPSDTest(unittest.TestCase):
+
+    def test_psd_matrix_is_unchanged(self):
+        cov = np.cov(np.random.default_rng(3).normal(size=(50, 4)), rowvar=False)
+        self.assertIs(nearest_psd(cov), cov)
+
+    def test_negative_eigenvalues_are_clipped(self):
+        cov = np.array([[1.0, 0.9, 0.9], [0.9, 1.0, -0.9], [0.9, -0.9, 1.0]])
+        self.assertLess(np.linalg.eigvalsh(cov).min(), 0)
+        fixed = nearest_psd(cov)
+        np.testing.assert_allclose(fixed, fixed.T)
+        self.assertGreaterEqual(np.linalg.eigvalsh(fixed).min(), -1e-12)
+        values, vectors = np.linalg.eigh(cov)
+        np.testing.assert_allclose(fixed, (vectors * np.clip(values, 0, None)) @ vectors.T, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+'''
+Tests of :class:`support.backtest.RollingCovariance` and the walk-forward
+backtest against covariances recomputed from scratch.
+'''
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from support.backtest import RollingCovariance, walk_forward
+from support.optimizer import min_risk_weights
+
+
+def random_returns(days, num_stocks, seed=0):
+    rng = np.random.default_rng(seed)
+    return 0.0005 + rng.normal(0, 0.01, (days, num_stocks)) * rng.uniform(0.5, 2.0, num_stocks)
+
+
+class RollingCovarianceTest(unittest.TestCase):
+
+    def test_roll_matches_np_cov_on_the_window(self):
+        values = random_returns(600, 8)
+        lookback = 120
+        window = RollingCovariance(values[:lookback])
+        for t in range(lookback, len(values)):
+            window.roll(values[t], values[t - lookback])
+            expected = values[t - lookback + 1:t + 1]
+            np.testing.assert_allclose(window.cov, np.cov(expected, rowvar=False), rtol=1e-9, atol=1e-15)
+            np.testing.assert_allclose(window.mean, expected.mean(axis=0), rtol=1e-9, atol=1e-15)
+
+    def test_add_and_remove(self):
+        values = random_returns(50, 4, seed=1)
+        window = RollingCovariance(values[:30])
+        for row in values[30:]:
+            window.add(row)
+        for row in values[:10]:
+            window.remove(row)
+        self.assertEqual(window.count, 40)
+        np.testing.assert_allclose(window.cov, np.cov(values[10:], rowvar=False), rtol=1e-9, atol=1e-15)
+
+
+class WalkForwardTest(unittest.TestCase):
+
+    def test_weights_use_only_the_window_before_each_rebalance(self):
+        dates = pd.bdate_range('2020-01-01', periods=200)
+        returns = pd.DataFrame(random_returns(200, 5, seed=2), index=dates, columns=list('ABCDE'))
+        lookback, rebalance = 60, 20
+        result = walk_forward(returns, lookback=lookback, rebalance=rebalance)
+
+        self.assertEqual(len(result.returns), 200 - lookback)
+        self.assertEqual(list(result.weights.index), list(dates[lookback::rebalance]))
+        for date, target in result.weights.iterrows():
+            t = dates.get_loc(date)
+            window = returns.iloc[t - lookback:t]
+            expected = min_risk_weights(window.cov().to_numpy())['x']
+            np.testing.assert_allclose(target.to_numpy(), expected, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+'''
+Offline tests of :func:`support.fetchEngine.fetch_all` with a fake fetcher.
+'''
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+from support.fetchEngine import NoDataError, fetch_all
+
+
+class FakeFetcher(object):
+    '''
+    Answers after ``latency`` seconds, except for ``hangs``, which answer
+    after ``hang`` seconds.
+    '''
+
+    def __init__(self, latency=0.05, hangs=(), hang=5.0, empty=()):
+        self.latency = latency
+        self.hangs = set(hangs)
+        self.hang = hang
+        self.empty = set(empty)
+        self.release = threading.Event()
+
+    def __call__(self, ticker, start_date, end_date):
+        if ticker in self.hangs:
+            self.release.wait(self.hang)
+        else:
+            time.sleep(self.latency)
+        if ticker in self.empty:
+            raise NoDataError('no prices')
+        return pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.date_range('2020-01-01', periods=2))
+
+
+class FetchAllTest(unittest.TestCase):
+
+    def test_hung_downloads_do_not_time_out_queued_tickers(self):
+        healthy = ['OK%d' % i for i in range(6)]
+        fetcher = FakeFetcher(hangs=['HANG0', 'HANG1'])
+        self.addCleanup(fetcher.release.set)
+        started = time.monotonic()
+        report = fetch_all(['HANG0', 'HANG1'] + healthy, None, None, fetcher, max_workers=2, timeout=0.5,
+                           retries=1, backoff=0.0)
+        self.assertEqual(sorted(report.frames), healthy)
+        self.assertEqual(sorted(report.failures), ['HANG0', 'HANG1'])
+        self.assertTrue(all(error.startswith('TimeoutError') for error in report.failures.values()))
+        self.assertLess(time.monotonic() - started, 3.0)
+
+    def test_at_most_max_workers_running(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def fetch(ticker, start_date, end_date):
+            with lock:
+                running.append(ticker)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(ticker)
+            return pd.DataFrame({'Close': [1.0]})
+
+        report = fetch_all(['T%d' % i for i in range(12)], None, None, fetch, max_workers=3)
+        self.assertEqual(len(report.frames), 12)
+        self.assertLessEqual(max(peak), 3)
+
+    def test_abandoned_calls_are_capped_on_a_slow_source(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def fetch(ticker, start_date, end_date):
+            with lock:
+                running.append(ticker)
+                peak.append(len(running))
+            time.sleep(0.2)
+            with lock:
+                running.remove(ticker)
+            return pd.DataFrame({'Close': [1.0]})
+
+        report = fetch_all(['T%d' % i for i in range(6)], None, None, fetch, max_workers=2, timeout=0.05,
+                           retries=2, backoff=0.0, max_abandoned=2)
+        self.assertEqual(len(report.failures), 6)
+        self.assertEqual(max(peak), 4)
+
+    def test_no_data_is_not_retried(self):
+        report = fetch_all(['A', 'B'], None, None, FakeFetcher(latency=0.0, empty=['B']), retries=2)
+        self.assertEqual(list(report.frames), ['A'])
+        self.assertEqual(report.attempts['B'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+'''
+Tests of hierarchical risk parity, including stocks whose price never moved.
+'''
+import unittest
+
+import numpy as np
+
+from support.hierarchical import correlation_distance, hrp_weights, recursive_bisection
+
+
+def random_cov(num_stocks, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (500, 1)) * rng.uniform(0.2, 1.5, num_stocks) \
+        + rng.normal(0, 0.01, (500, num_stocks))
+    return np.cov(returns, rowvar=False)
+
+
+class HRPTest(unittest.TestCase):
+
+    def test_uncorrelated_stocks_get_inverse_variance_weights(self):
+        variances = np.array([1.0, 2.0, 4.0, 8.0]) * 1e-4
+        weights = recursive_bisection(np.diag(variances), np.arange(4))
+        expected = (1 / variances) / (1 / variances).sum()
+        np.testing.assert_allclose(weights, expected)
+
+    def test_weights_are_long_only_and_fully_invested(self):
+        result = hrp_weights(random_cov(40))
+        self.assertAlmostEqual(result.x.sum(), 1.0, places=12)
+        self.assertTrue(np.all(result.x > 0))
+        self.assertEqual(sorted(result.order), list(range(40)))
+        self.assertEqual(len(result.excluded), 0)
+
+    def test_zero_variance_stocks_are_left_out(self):
+        cov = random_cov(6, seed=1)
+        cov[2, :] = cov[:, 2] = 0
+        distance = correlation_distance(cov)
+        self.assertFalse(np.isnan(distance).any())
+        np.testing.assert_allclose(np.delete(distance[2], 2), np.sqrt(0.5))
+
+        result = hrp_weights(cov)
+        self.assertEqual(result.excluded.tolist(), [2])
+        self.assertEqual(result.x[2], 0.0)
+        self.assertAlmostEqual(result.x.sum(), 1.0, places=12)
+        live = [0, 1, 3, 4, 5]
+        np.testing.assert_allclose(result.x[live], hrp_weights(cov[np.ix_(live, live)]).x)
+
+    def test_all_zero_variance_falls_back_to_equal_weights(self):
+        result = hrp_weights(np.zeros((3, 3)))
+        np.testing.assert_allclose(result.x, np.full(3, 1 / 3))
+        self.assertEqual(result.excluded.tolist(), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
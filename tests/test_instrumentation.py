@@ -0,0 +1,61 @@
+'''
+Tests of the per-thread recording in :mod:`support.instrumentation`.
+'''
+import threading
+import unittest
+
+import pandas as pd
+
+from support import instrumentation
+from support.fetchEngine import fetch_all
+from support.instrumentation import RunStats, recording
+
+
+class RecordingTest(unittest.TestCase):
+
+    def test_other_threads_do_not_count_into_a_run(self):
+        stats = RunStats('calculate')
+        outside = RunStats('what-if')
+        inside = threading.Event()
+        done = threading.Event()
+
+        def what_if():
+            inside.wait()
+            with recording(outside):
+                instrumentation.count('solves')
+            instrumentation.count('unrecorded')
+            done.set()
+
+        thread = threading.Thread(target=what_if)
+        thread.start()
+        with recording(stats):
+            inside.set()
+            done.wait()
+            instrumentation.count('solves', 2)
+        thread.join()
+        self.assertEqual(dict(stats.counters), {'solves': 2})
+        self.assertEqual(dict(outside.counters), {'solves': 1})
+        self.assertIsNone(instrumentation.active())
+
+    def test_nested_recording_restores_the_outer_run(self):
+        outer, inner = RunStats(), RunStats()
+        with recording(outer):
+            with recording(inner):
+                self.assertIs(instrumentation.active(), inner)
+            self.assertIs(instrumentation.active(), outer)
+        self.assertIsNone(instrumentation.active())
+
+    def test_fetch_threads_count_into_the_callers_run(self):
+        def fetch(ticker, start_date, end_date):
+            instrumentation.count('downloads')
+            return pd.DataFrame({'Close': [1.0]})
+
+        stats = RunStats()
+        with recording(stats):
+            fetch_all(['A', 'B', 'C'], None, None, fetch, max_workers=2)
+        self.assertEqual(stats.counters['downloads'], 3)
+        self.assertEqual(stats.counters['fetch_attempts'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+'''
+Tests of the memo of :class:`support.optimizeService.OptimizationService`.
+'''
+import unittest
+
+import pandas as pd
+
+from support.optimizeService import OptimizationService
+from support.synthetic import SyntheticPrices
+
+
+class ServiceMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = SyntheticPrices(300)
+        self.codes = self.generator.codes(4)
+        self.clock = [0.0]
+
+    def service(self, today):
+        self.clock[0] = pd.Timestamp(today).timestamp()
+        return OptimizationService(fetch=self.generator, fresh_for=3600, now=lambda: self.clock[0])
+
+    def sources(self, service, later):
+        first = service.optimize(self.codes, self.generator.start, self.generator.end)['source']
+        self.clock[0] += later
+        return first, service.optimize(self.codes, self.generator.start, self.generator.end)['source']
+
+    def test_past_ranges_stay_memoised(self):
+        service = self.service(pd.Timestamp(self.generator.end) + pd.Timedelta(days=30))
+        self.assertEqual(self.sources(service, 10 * 86400), ('computed', 'memo'))
+
+    def test_ranges_ending_today_expire(self):
+        service = self.service(pd.Timestamp(self.generator.end) + pd.Timedelta(hours=12))
+        self.assertEqual(self.sources(service, 60), ('computed', 'memo'))
+        self.clock[0] += 3600
+        answer = service.optimize(self.codes, self.generator.start, self.generator.end)
+        self.assertEqual(answer['source'], 'computed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Tests of the active-set QP backend against SLSQP.
+'''
+import unittest
+
+import numpy as np
+
+from support.optimizer import min_risk_weights, qp_weights, slsqp_weights
+
+
+def random_cov(num_stocks, days, seed):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (days, 1))
+    returns = factor * rng.uniform(0.2, 1.5, num_stocks) + rng.normal(0, 0.01, (days, num_stocks))
+    return np.cov(returns, rowvar=False)
+
+
+class QPTest(unittest.TestCase):
+
+    def assertMatchesSLSQP(self, cov):
+        qp = qp_weights(cov)
+        slsqp = slsqp_weights(cov)
+        self.assertTrue(slsqp.success)
+        self.assertAlmostEqual(qp.x.sum(), 1.0, places=12)
+        self.assertGreaterEqual(qp.x.min(), 0.0)
+        self.assertLessEqual(qp.fun, slsqp.fun + 1e-8)
+        self.assertAlmostEqual(qp.fun, slsqp.fun, delta=1e-4 * slsqp.fun)  # SLSQP stops a little short
+
+        # optimality: equal marginal variance on the held assets, no less elsewhere
+        grad = 2 * cov @ qp.x
+        held = qp.x > 0
+        budget = grad[held].mean()
+        np.testing.assert_allclose(grad[held], budget, rtol=1e-8)
+        self.assertTrue(np.all(grad[~held] >= budget * (1 - 1e-8)))
+        return qp
+
+    def test_closed_form_when_every_weight_is_positive(self):
+        cov = np.diag([0.04, 0.09, 0.16]) / 250
+        qp = self.assertMatchesSLSQP(cov)
+        self.assertEqual(qp.message, 'closed form')
+        np.testing.assert_allclose(qp.x, (1 / np.diag(cov)) / (1 / np.diag(cov)).sum())
+
+    def test_active_set_matches_slsqp(self):
+        for seed in range(5):
+            qp = self.assertMatchesSLSQP(random_cov(30, 500, seed))
+            self.assertEqual(qp.message, 'active set')
+            self.assertLess(np.sum(qp.x > 0), 30)
+
+    def test_warm_start_reaches_the_same_optimum(self):
+        cov = random_cov(20, 400, 7)
+        cold = qp_weights(cov)
+        warm = qp_weights(cov, x0=np.full(20, 1 / 20))
+        np.testing.assert_allclose(warm.x, cold.x, atol=1e-9)
+
+    def test_singular_covariance_falls_back_to_slsqp(self):
+        returns = np.random.default_rng(0).normal(0, 0.01, (200, 3))
+        cov = np.cov(np.column_stack([returns, returns[:, 0]]), rowvar=False)
+        result = min_risk_weights(cov)
+        self.assertAlmostEqual(result.x.sum(), 1.0, places=6)
+        self.assertGreaterEqual(result.x.min(), -1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
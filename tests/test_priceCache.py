@@ -0,0 +1,120 @@
+'''
+Offline tests of :class:`support.priceCache.PriceCache` with a fake fetcher.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from support.priceCache import PriceCache
+
+
+class FakeFetcher(object):
+
+    def __init__(self):
+        self.calls = []
+        self.empty = 0  # next calls answered without rows
+
+    def __call__(self, ticker, start_date, end_date):
+        self.calls.append((ticker, str(start_date), str(end_date)))
+        if self.empty:
+            self.empty -= 1
+            return pd.DataFrame({'Close': []}, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+        index = pd.date_range(start_date, end_date, freq='D', inclusive='left', name='Date')
+        return pd.DataFrame({'Close': range(1, len(index) + 1)}, index=index, dtype=float)
+
+
+class PriceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        self.fetch = FakeFetcher()
+
+    def cache(self, **kwargs):
+        cache = PriceCache(self.cache_dir, fetch=self.fetch, **kwargs)
+        self.addCleanup(cache.flush)
+        return cache
+
+    def test_hit_after_miss(self):
+        cache = self.cache()
+        first = cache.get('AAA', '2020-01-01', '2020-02-01')
+        second = cache.get('AAA', '2020-01-05', '2020-01-20')
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertEqual(len(self.fetch.calls), 1)
+        expected = first.loc['2020-01-05':'2020-01-19']
+        self.assertEqual(list(second.index), list(expected.index))
+        self.assertEqual(second['Close'].tolist(), expected['Close'].tolist())
+
+    def test_head_and_tail_top_up(self):
+        cache = self.cache()
+        cache.get('AAA', '2020-01-10', '2020-01-20')
+        frame = cache.get('AAA', '2020-01-05', '2020-01-25')
+        self.assertEqual(self.fetch.calls[1:], [('AAA', '2020-01-05', '2020-01-10'),
+                                                ('AAA', '2020-01-20', '2020-01-25')])
+        self.assertEqual(list(frame.index), list(pd.date_range('2020-01-05', '2020-01-24')))
+        cache.get('AAA', '2020-01-06', '2020-01-24')
+        self.assertEqual(len(self.fetch.calls), 3)
+        self.assertEqual(cache.hits, 1)
+
+    def test_stale_tail_is_fetched_again(self):
+        clock = [pd.Timestamp('2020-01-20 12:00').timestamp()]
+        cache = self.cache(stale_after=3600, now=lambda: clock[0])
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(len(self.fetch.calls), 1)
+
+        clock[0] += 3601
+        frame = cache.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(self.fetch.calls[1], ('AAA', '2020-01-20', '2020-02-01'))
+        self.assertEqual(len(frame), 31)
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(len(self.fetch.calls), 2)
+
+    def test_empty_answer_is_not_covered(self):
+        cache = self.cache()
+        self.fetch.empty = 1
+        self.assertEqual(len(cache.get('AAA', '2020-01-01', '2020-02-01')), 0)
+        self.assertNotIn('AAA', cache._manifest)
+        self.assertEqual(len(cache.get('AAA', '2020-01-01', '2020-02-01')), 31)
+
+        self.fetch.empty = 1
+        cache.get('AAA', '2020-01-01', '2020-02-10')
+        self.assertEqual(cache._manifest['AAA']['end'], pd.Timestamp('2020-02-01').isoformat())
+        self.assertEqual(len(cache.get('AAA', '2020-01-01', '2020-02-10')), 40)
+        self.assertEqual(self.fetch.calls[-1], ('AAA', '2020-02-01', '2020-02-10'))
+
+    def test_eviction_saves_manifest_before_deleting(self):
+        cache = self.cache()
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        cache.flush()
+        cache.max_bytes = 1
+        cache.get('BBB', '2020-01-01', '2020-02-01')  # evicts AAA; the exit flush never happens
+
+        reopened = self.cache()
+        self.assertNotIn('AAA', reopened._manifest)
+        frame = reopened.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(len(frame), 31)
+
+    def test_missing_file_is_a_miss(self):
+        cache = self.cache()
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        os.remove(cache._file_path('AAA'))
+        frame = cache.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(len(frame), 31)
+        self.assertEqual((cache.misses, cache.hits), (2, 0))
+
+    def test_unreadable_file_is_a_miss(self):
+        cache = self.cache()
+        cache.get('AAA', '2020-01-01', '2020-02-01')
+        with open(cache._file_path('AAA'), 'wb') as fh:
+            fh.write(b'not an npz file')
+        frame = cache.get('AAA', '2020-01-01', '2020-02-01')
+        self.assertEqual(len(frame), 31)
+        self.assertEqual(len(self.fetch.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+'''
+Tests of :class:`support.priceData.PortfolioData` on synthetic prices.
+'''
+import unittest
+
+import numpy as np
+
+from support.covariance import get_estimator
+from support.priceData import PortfolioData
+from support.synthetic import SyntheticPrices
+
+
+def synthetic_data(seed, num_stocks=5, days=300):
+    generator = SyntheticPrices(days, seed=seed)
+    return PortfolioData(generator.frame(generator.tickers(num_stocks)))
+
+
+class PortfolioDataTest(unittest.TestCase):
+
+    def test_sample_covariance_matches_dataframe_cov(self):
+        data = synthetic_data(0)
+        expected = data.prices.pct_change().iloc[1:].cov().to_numpy()
+        np.testing.assert_allclose(data.covariance().matrix, expected)
+        np.testing.assert_allclose(data.covariance('sample').matrix, data.cov)
+
+    def test_same_range_different_prices_is_not_memoised(self):
+        first, second = synthetic_data(1), synthetic_data(2)
+        self.assertEqual(first.dataset_key[:4], second.dataset_key[:4])
+        self.assertNotEqual(first.dataset_key, second.dataset_key)
+        for name in ('ledoit-wolf', 'ewma'):
+            np.testing.assert_allclose(second.covariance(name).matrix,
+                                       get_estimator(name).estimate(second.returns).matrix)
+
+
+if __name__ == '__main__':
+    unittest.main()
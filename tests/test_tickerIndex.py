@@ -0,0 +1,56 @@
+'''
+Tests of :class:`support.tickerIndex.TickerIndex` against a brute-force
+substring search.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import tickerIndex
+from support.tickerIndex import TickerIndex, Universe
+from support.universeStore import load_universe
+
+CSV = 'bsecode,nsecode,compname\n' + ''.join(
+    '%d,%s%d,%s %s Ltd\n' % (500000 + i, code, i, name, kind)
+    for i, (code, name, kind) in enumerate(
+        (code, name, kind)
+        for code, name in (('TATA', 'Tata Motors'), ('INFY', 'Infosys'), ('HDFC', 'Hdfc Bank'),
+                           ('REL', 'Reliance Industries'), ('SBI', 'State Bank of India'))
+        for kind in ('Equity', 'Preference', 'Limited Partners')
+        for _ in range(40)))
+
+
+class TickerIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.csv_path = os.path.join(self.directory, 'Equity.csv')
+        with open(self.csv_path, 'w') as fh:
+            fh.write(CSV)
+
+    def indexes(self):
+        universe = Universe.from_csv(self.csv_path)
+        yield TickerIndex(universe)
+        yield load_universe(self.csv_path, os.path.join(self.directory, 'universe.bin'))[1]
+
+    def check(self, queries):
+        for index in self.indexes():
+            texts = [bytes(text) for text in index.texts]
+            for query in queries:
+                expected = [row for row, text in enumerate(texts) if query.lower().encode() in text]
+                self.assertEqual(index.contains(query).tolist(), expected, query)
+
+    def test_contains_matches_brute_force(self):
+        self.check(['t', 'ta', 'ltd', ' ltd', 'bank', 'bank of', 'motors ltd', 'infy1', 'd 5', 'xyz', 'd\n5'])
+
+    def test_unselective_queries_scan_the_joined_texts(self):
+        original = tickerIndex.SCAN_ABOVE
+        tickerIndex.SCAN_ABOVE = 0
+        self.addCleanup(setattr, tickerIndex, 'SCAN_ABOVE', original)
+        self.check([' ltd', 'ltd', 'bank of', 'motors ltd', 'infy1', 'd 5', 'xyz', '0,'])
+
+
+if __name__ == '__main__':
+    unittest.main()